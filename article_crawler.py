@@ -1,35 +1,356 @@
+import functools
 import logging
 import re
+import multiprocessing
 import threading
-from concurrent.futures import wait, FIRST_COMPLETED
-from concurrent.futures.thread import ThreadPoolExecutor
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from queue import Queue
-from time import sleep
-from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
-from courlan import validate_url, scrub_url, clean_url, is_external
-from playwright.sync_api import sync_playwright
-from article_parser import parse_html, remove_irrelevant_html_elements
+from time import perf_counter
+from urllib.parse import urlparse
+from article_parser import parse_html, parse_and_clean, HtmlDocument, pending_table_text, resolve_table
+from base_etl_item import BaseETLItem
 from constant import PROJECT_PATH
-from factory import mongo_client
+from crawl_metrics import default_metrics
+from crawl_scheduler import CrawlScheduler
+from frontier import PriorityFrontier
+from host_scheduler import HostScheduler
+from near_duplicates import LINK, item_text
+from recrawl import RECRAWL_FIELDS, content_hash
+from resource_blocking import ResourceBlockProfile
+from table_extractor import TableExtractor
+from url_filter import DEFAULT_LINK_EXCLUDES, UrlFilter
+from url_scoring import UrlScorer
+from factory import get_mongo_client
+from sinks import MongoSink, QueueSink
 
 logging.basicConfig(level=logging.INFO)
 
+BROWSER_LAUNCH_OPTIONS = {
+    "headless": True,
+    "args": ['--disable-blink-features=AutomationControlled'],  # 防止被检测
+}
+BROWSER_CONTEXT_OPTIONS = {
+    "viewport": {"width": 1920, "height": 1080},
+    "user_agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/120.0.0.0 Safari/537.36",
+}
+
+
+# 页面需要执行 JS 才能渲染正文的常见标记
+SPA_MARKERS = [
+    '<div id="root"></div>',
+    '<div id="app"></div>',
+    '<div id="__next"></div>',
+    '<div id="__nuxt"></div>',
+    'enable javascript to run this app',
+    'you need to enable javascript',
+    'please enable javascript',
+]
+# 估算可见文本长度时去掉的脚本、样式块和标签，比 trafilatura 抽取正文便宜得多
+NON_TEXT_BLOCKS = re.compile(r'<(script|style|noscript|template)\b.*?</\1\s*>', re.S | re.I)
+TAGS = re.compile(r'<[^>]*>')
+
+
+# 按视口高度滚动，每次滚动后等待懒加载请求结束，页面高度不再增长且已到底部时停止
+ADAPTIVE_SCROLL_SCRIPT = """
+async ({maxScrolls, settleTimeout, quietInterval}) => {
+    const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+    const resourceCount = () => performance.getEntriesByType('resource').length;
+    const pageHeight = () => document.body ? document.body.scrollHeight : 0;
+    let lastHeight = pageHeight();
+    let scrolls = 0;
+    while (scrolls < maxScrolls) {
+        window.scrollBy(0, window.innerHeight);
+        scrolls += 1;
+        const deadline = Date.now() + settleTimeout;
+        let count = resourceCount();
+        await sleep(quietInterval);
+        while (resourceCount() !== count && Date.now() < deadline) {
+            count = resourceCount();
+            await sleep(quietInterval);
+        }
+        const height = pageHeight();
+        if (height === lastHeight && window.scrollY + window.innerHeight >= height) {
+            break;
+        }
+        lastHeight = height;
+    }
+    return scrolls;
+}
+"""
+SCROLL_SETTLE_TIMEOUT = 1000  # 每次滚动后最多等待网络空闲的毫秒数
+SCROLL_QUIET_INTERVAL = 100  # 资源数量在该毫秒数内不变视为网络空闲
+
+NOT_MODIFIED = object()  # 条件请求返回 304 时 TieredFetcher.fetch 的返回值
+# 最多记录这么多个 URL 的入队时间：被有界前沿队列淘汰或由其他节点处理的 URL 不会在本节点出队
+MAX_QUEUE_WAIT_URLS = 10000
+
+
+@functools.lru_cache(maxsize=None)
+def load_stealth_script():
+    # 反爬插件只读取一次，所有浏览器上下文共用
+    with open(f"{PROJECT_PATH}/stealth.min.js", encoding="utf-8") as f:
+        return f.read()
+
 
 class PlaywrightInstance(threading.local):
-    def __init__(self):
-        self.playwright = sync_playwright().start()
-        print("Create playwright instance in Thread", threading.current_thread().name)
+    """
+    Thread-local Playwright driver that keeps a warm Chromium browser and context for each worker thread.
+    The context is recycled after `max_navigations` page loads, the browser is relaunched if it crashed.
+    Sync Playwright objects can only be used on the thread that created them, so each worker calls close() itself
+    before it exits.
+    """
 
-    def __del__(self):
-        self.playwright.stop()
-        print("Stop playwright instance in Thread", threading.current_thread().name)
+    def __init__(self, max_navigations=50, resource_profile=None, metrics=None):
+        self.max_navigations = max_navigations
+        self.resource_profile = resource_profile
+        self.metrics = metrics or default_metrics
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.navigations = 0
+
+    def new_page(self):
+        if self.playwright is None:
+            from playwright.sync_api import sync_playwright  # 导入较慢，线程第一次打开浏览器时才加载
+            self.playwright = sync_playwright().start()
+            logging.info(f"Create playwright instance in Thread {threading.current_thread().name}")
+        if self.browser is None or not self.browser.is_connected():
+            self.close_browser()
+            with self.metrics.time("browser_launch"):
+                self.browser = self.playwright.chromium.launch(**BROWSER_LAUNCH_OPTIONS)
+        if self.context is not None and self.navigations >= self.max_navigations:
+            self.close_context()
+        if self.context is None:
+            with self.metrics.time("browser_context"):
+                self.context = self.browser.new_context(**BROWSER_CONTEXT_OPTIONS)
+            # 添加反爬插件
+            self.context.add_init_script(script=load_stealth_script())
+            if self.resource_profile is not None:
+                self.context.route("**/*", self.resource_profile.handle_route)
+            self.navigations = 0
+        self.navigations += 1
+        return self.context.new_page()
+
+    def close_context(self):
+        if self.context is None:
+            return
+        try:
+            self.context.close()
+        except Exception as e:
+            logging.warning(f"Error closing browser context: {e}")
+        self.context = None
+
+    def close_browser(self):
+        self.close_context()
+        if self.browser is None:
+            return
+        try:
+            self.browser.close()
+        except Exception as e:
+            logging.warning(f"Error closing browser: {e}")
+        self.browser = None
+
+    def close(self):
+        """
+        Close the calling thread's browser and stop its Playwright driver.
+        """
+        if self.playwright is None:
+            return
+        self.close_browser()
+        try:
+            self.playwright.stop()
+        except Exception as e:
+            logging.warning(f"Error stopping playwright: {e}")
+        self.playwright = None
+        logging.info(f"Stop playwright instance in Thread {threading.current_thread().name}")
+
+
+class TieredFetcher:
+    """
+    Fetches a page with a pooled plain HTTP client first and escalates to the browser only when the response looks
+    like a JS shell: a tiny body, a known SPA marker, or little visible text and mostly scripts. An HTTP error, a
+    non-HTML response or a network error is a failed download (None), not retried in the browser.
+    The tier that worked is remembered per domain, `domain_rules` pins a domain to a tier up front.
+    With `validators` (the URL's previous ETag/Last-Modified), the HTTP tier sends a conditional request and returns
+    NOT_MODIFIED on a 304; the dict is updated in place with the validators of a fresh response.
+    """
+    HTTP = 'http'
+    BROWSER = 'browser'
+
+    def __init__(self, browser_fetch, request_timeout=60, mode='auto', domain_rules=None, pool_size=10,
+                 min_body_length=2048, min_text_length=200, host_scheduler=None, metrics=None):
+        self.browser_fetch = browser_fetch
+        self.metrics = metrics or default_metrics
+        self.host_scheduler = host_scheduler  # Receives response statuses for adaptive backoff
+        self.request_timeout = request_timeout
+        self.mode = mode  # auto, http or browser
+        self.domain_tiers = dict(domain_rules or {})
+        self.min_body_length = min_body_length
+        self.min_text_length = min_text_length
+
+        self.pool_size = pool_size
+        self.session = None  # requests.Session, created by the first HTTP fetch
+
+        self.lock = threading.Lock()
+        self.tier_stats = {tier: {"requests": 0, "hits": 0, "misses": 0, "errors": 0, "seconds": 0.0}
+                           for tier in (self.HTTP, self.BROWSER)}
+
+    def fetch(self, url, validators=None):
+        if self.use_http(url):
+            content = self.fetch_http(url, validators)
+            if self.accept_http(url, content):
+                return content
+        start = perf_counter()
+        content = self.browser_fetch(url)
+        self.record_browser(url, content, perf_counter() - start)
+        return content
+
+    def use_http(self, url):
+        if self.mode != 'auto':
+            return self.mode == self.HTTP
+        return self.domain_tiers.get(urlparse(url).netloc, self.HTTP) == self.HTTP
+
+    def http_session(self):
+        import requests  # 延迟导入，只用浏览器的爬取不需要
+        with self.lock:
+            if self.session is None:
+                # keep-alive 连接池，gzip/br 由 urllib3 自动协商和解压
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['User-Agent'] = BROWSER_CONTEXT_OPTIONS['user_agent']
+                self.session = session
+            return self.session
+
+    def fetch_http(self, url, validators=None):
+        import requests
+        session = self.http_session()
+        start = perf_counter()
+        content = None
+        try:
+            response = session.get(url, timeout=self.request_timeout, headers=self.conditional_headers(validators))
+            content = self.read_response(url, response, validators)
+        except requests.RequestException as e:
+            self.http_failed(url, e, timed_out=isinstance(e, requests.Timeout))
+        self.record_http(start, content)
+        return content
+
+    def read_response(self, url, response, validators=None):
+        """
+        The HTML of a requests or httpx response, NOT_MODIFIED for a 304 to a conditional request, None otherwise.
+        """
+        if self.host_scheduler is not None:
+            self.host_scheduler.report(url, status=response.status_code)
+        if response.status_code == 304 and validators:
+            return NOT_MODIFIED
+        if validators is not None and response.status_code < 400:
+            validators.clear()
+            validators.update({key: response.headers[header] for key, header in
+                               (("etag", "ETag"), ("last_modified", "Last-Modified")) if header in response.headers})
+        if response.status_code >= 400:
+            logging.info(f"HTTP {response.status_code} for '{url}'")
+            return None
+        if 'html' not in response.headers.get('Content-Type', 'text/html'):
+            logging.info(f"Not an HTML page: '{url}' ({response.headers.get('Content-Type')})")
+            return None
+        if 'charset' not in response.headers.get('Content-Type', ''):
+            response.encoding = 'utf-8'
+        return response.text
+
+    def http_failed(self, url, error, timed_out=False):
+        if timed_out:
+            self.metrics.increment("crawler_timeouts_total", domain=urlparse(url).netloc, tier=self.HTTP)
+            if self.host_scheduler is not None:
+                self.host_scheduler.report(url, timed_out=True)
+        logging.info(f"HTTP fetch failed for '{url}': {error}")
+
+    def record_http(self, start, content):
+        seconds = perf_counter() - start
+        self.metrics.observe("http_fetch", seconds)
+        self.record(self.HTTP, seconds, content is not None)
+
+    @staticmethod
+    def conditional_headers(validators):
+        headers = {}
+        if validators:
+            if validators.get("etag"):
+                headers['If-None-Match'] = validators["etag"]
+            if validators.get("last_modified"):
+                headers['If-Modified-Since'] = validators["last_modified"]
+        return headers
+
+    def accept_http(self, url, content):
+        """
+        Whether the HTTP result stands. Only a JS shell goes to the browser: after an HTTP error or a network
+        failure (None) the browser would hit the same, possibly backing-off, host for the same answer.
+        """
+        if content is None or content is NOT_MODIFIED:
+            return True
+        if not self.needs_browser(content):
+            self.remember(url, self.HTTP)
+            return True
+        if self.mode == self.HTTP:
+            return True
+        with self.lock:
+            self.tier_stats[self.HTTP]["misses"] += 1
+        return False
+
+    def record_browser(self, url, content, seconds):
+        self.record(self.BROWSER, seconds, content is not None)
+        # 只有浏览器确实渲染出正文时才把该域名切换到浏览器
+        if content is not None and self.mode == 'auto' and not self.needs_browser(content):
+            self.remember(url, self.BROWSER)
+
+    def needs_browser(self, content):
+        if len(content) < self.min_body_length:
+            return True
+        lowered = content.lower()
+        if any(marker in lowered for marker in SPA_MARKERS):
+            return True
+        # 去掉脚本和标签后的可见文本很少，或者脚本占了页面的绝大部分
+        without_scripts = NON_TEXT_BLOCKS.sub(' ', content)
+        text_length = len(''.join(TAGS.sub(' ', without_scripts).split()))
+        if text_length < self.min_text_length:
+            return True
+        script_ratio = 1 - len(without_scripts) / len(content)
+        return script_ratio > 0.8 and text_length < self.min_text_length * 5
+
+    def remember(self, url, tier):
+        with self.lock:
+            self.domain_tiers[urlparse(url).netloc] = tier
+
+    def record(self, tier, seconds, hit):
+        with self.lock:
+            stats = self.tier_stats[tier]
+            stats["requests"] += 1
+            stats["seconds"] += seconds
+            stats["hits" if hit else "errors"] += 1
+
+    def stats(self):
+        with self.lock:
+            result = {}
+            for tier, stats in self.tier_stats.items():
+                requests_count = stats["requests"]
+                result[tier] = {
+                    "hits": stats["hits"],
+                    "misses": stats["misses"],
+                    "errors": stats["errors"],
+                    "avg_latency_seconds": round(stats["seconds"] / requests_count, 3) if requests_count else 0.0,
+                }
+            return result
 
 
 class ArticleCrawler:
     def __init__(self, start_url, max_pages=1, request_timeout=60, concurrency=1, crypto_only_same_domain=False,
-                 include_urls=None, exclude_urls=None, max_recursion_depth=2, url_min_length=15):
+                 include_urls=None, exclude_urls=None, max_recursion_depth=2, url_min_length=15,
+                 max_navigations_per_context=50, fetch_mode='auto', domain_fetch_rules=None, scroll_mode='adaptive',
+                 max_scrolls=25, domain_max_scrolls=None, resource_profile=None, parse_workers=0, parse_queue_size=None,
+                 frontier=None, host_scheduler=None, url_scorer=None, recrawl_policy=None,
+                 table_extractor=None, sinks=None, metrics=None, profiler=None, link_excludes=DEFAULT_LINK_EXCLUDES,
+                 near_duplicates=None):
         """
         Initializes the ArticleCrawler object.
 
@@ -39,183 +360,494 @@ class ArticleCrawler:
             request_timeout (int, optional): The maximum time to wait for a page to load, in seconds. Defaults to 60.
             concurrency (int, optional): The number of concurrent threads to use for crawling. Defaults to 1.
             crypto_only_same_domain (bool, optional): If True, only crawl pages from the same domain as the start_url. Defaults to False.
-            include_urls (str, optional): A regex pattern of URLs to include in the crawl. Defaults to None.
-            exclude_urls (str, optional): A regex pattern of URLs to exclude from the crawl. Defaults to None.
+            include_urls (str or list, optional): A regex pattern of URLs to include in the crawl, or a list of rules like 'ext:html', 'domain:example.com', 'glob:*/news/*' and regexes. Defaults to None.
+            exclude_urls (str or list, optional): A regex pattern or a list of rules of URLs to exclude from the crawl. Defaults to None.
             max_recursion_depth (int, optional): The maximum depth of recursion for the crawler. Defaults to 2.
             url_min_length (int, optional): The minimum length of a URL to be considered for crawling. Defaults to 15.
+            max_navigations_per_context (int, optional): The number of pages a worker's browser context loads before it is recycled. Defaults to 50.
+            fetch_mode (str, optional): 'auto' tries plain HTTP first and falls back to the browser when the page needs JS, 'http' or 'browser' force one tier. Defaults to 'auto'.
+            domain_fetch_rules (dict, optional): Maps a domain to the tier ('http' or 'browser') it always uses in 'auto' mode. Defaults to None.
+            scroll_mode (str, optional): 'adaptive' scrolls by viewport until the page height stops growing, 'fixed' always scrolls 10000px in 400px steps. Defaults to 'adaptive'.
+            max_scrolls (int, optional): The maximum number of viewport scrolls per page in 'adaptive' mode. Defaults to 25.
+            domain_max_scrolls (dict, optional): Per-domain overrides of max_scrolls. Defaults to None.
+            resource_profile (ResourceBlockProfile, optional): Which browser requests to abort, False disables blocking. Defaults to blocking images, media, fonts, stylesheets and known trackers.
+            parse_workers (int, optional): The number of processes that parse and clean pages, 0 parses on the download threads. Defaults to 0.
+            parse_queue_size (int, optional): The maximum number of pages waiting for a parse process before downloads block. Defaults to 4 * parse_workers.
+            frontier (optional): Where pending and visited URLs are kept, a SQLiteFrontier or MongoFrontier makes the crawl resumable by crawl ID. Defaults to an in-memory PriorityFrontier holding max_pages * 2 URLs.
+            host_scheduler (HostScheduler, optional): Per-host concurrency, rate limits, robots.txt crawl-delay and backoff, False disables it. Defaults to HostScheduler() with 4 concurrent requests and 4 requests/sec per host.
+            url_scorer (UrlScorer, optional): Scores how likely a link is an article, higher scored URLs are fetched first. Defaults to UrlScorer().
+            recrawl_policy (RecrawlPolicy, optional): Enables incremental recrawls: conditional requests, no parse or write for pages whose text hash is unchanged, and a per-URL next crawl time from its change rate. Defaults to None, every page is downloaded, parsed and written.
+            table_extractor (TableExtractor, optional): Runs the cached LLM extraction of table pages off the crawl threads, False extracts tables inline while parsing. Defaults to TableExtractor() with 4 workers and a cache in the ai_qa.llm_cache collection when a MongoSink is used, in memory otherwise.
+            sinks (list, optional): Where raw pages and parsed items are written, e.g. MongoSink, JsonlSink or CallbackSink. Defaults to [MongoSink()], the crawler_raw_data and crawler_extract_data collections.
+            metrics (InMemoryMetrics, optional): Receives per-stage timings, per-URL timing records and per-domain outcome counters. Defaults to the process-wide crawl_metrics.default_metrics, served by /metrics.
+            profiler (CrawlProfiler, optional): Profiles the crawl threads with cProfile and/or tracemalloc and logs the top entries when the crawl ends. Defaults to None.
+            link_excludes (UrlRules or list, optional): Rules of extracted links that are never queued. Defaults to DEFAULT_LINK_EXCLUDES, image, media, asset and archive extensions and YouTube links.
+            near_duplicates (NearDuplicateDetector, optional): Skips parsed items whose SimHash is close to an item stored before, or links them in its `related`, before cleaning, LLM table extraction and writing; an item is fingerprinted once all sinks wrote it. Defaults to None, every item is stored.
         """
 
-        self.tls = PlaywrightInstance()  # Instance of Playwright for web scraping
+        self.metrics = metrics or default_metrics  # Stage timings and outcome counters
+        self.profiler = profiler  # Optional cProfile/tracemalloc hook per crawl
+        if resource_profile is None:
+            resource_profile = ResourceBlockProfile()
+        self.resource_profile = resource_profile or None  # Requests aborted by the browser, None when disabled
+        self.tls = PlaywrightInstance(max_navigations_per_context, self.resource_profile, self.metrics)  # Warm browser per worker thread
         self.start_url = start_url  # The starting URL for the crawler
         self.max_pages = max_pages  # The maximum number of pages to crawl
         self.request_timeout = request_timeout  # The maximum time to wait for a page to load, in seconds
         self.concurrency = concurrency  # The number of concurrent threads to use for crawling
         self.crypto_only_same_domain = crypto_only_same_domain  # If True, only crawl pages from the same domain as the start_url
-        self.include_urls = include_urls  # A regex pattern of URLs to include in the crawl
-        self.exclude_urls = exclude_urls  # A regex pattern of URLs to exclude from the crawl
+        self.include_urls = include_urls  # A regex pattern or rules of URLs to include in the crawl
+        self.exclude_urls = exclude_urls  # A regex pattern or rules of URLs to exclude from the crawl
+        self.link_filter = UrlFilter(include=include_urls, exclude=link_excludes)  # Compiled once, checks every extracted link
+        self.exclude_filter = UrlFilter(exclude=exclude_urls) if exclude_urls is not None else None  # Pages saved but not parsed
         self.max_recursion_depth = max_recursion_depth  # The maximum depth of recursion for the crawler
         self.url_min_length = url_min_length  # The minimum length of a URL to be considered for crawling
+        self.scroll_mode = scroll_mode  # adaptive or fixed lazy-load scrolling
+        self.max_scrolls = max_scrolls  # The maximum number of viewport scrolls per page
+        self.domain_max_scrolls = domain_max_scrolls or {}  # Per-domain overrides of max_scrolls
+        self.parse_workers = parse_workers  # The number of parse processes, 0 parses inline
+        self.parse_queue_size = parse_queue_size or parse_workers * 4  # Pages waiting for a parse process
+        self.parse_pool = None  # ProcessPoolExecutor of the parse stage while a crawl runs
+        self.parse_slots = None  # Bounds the parse queue, downloads block when it is full
 
-        self.visited_urls = set()  # A set of URLs that have already been visited
-        self.url_queue = Queue()  # A queue of URLs to be visited
+        self.url_scorer = url_scorer or UrlScorer()  # Article-likelihood score of queued URLs
+        if frontier is None:
+            frontier = PriorityFrontier(max_size=max_pages * 2)
+        self.frontier = frontier  # Pending (url, depth) items and visited URLs
+        if host_scheduler is None:
+            host_scheduler = HostScheduler()
+        self.host_scheduler = host_scheduler or None  # Per-host politeness, None when disabled
+        self.scheduler = CrawlScheduler(concurrency, self.frontier, self.host_scheduler)  # Hands frontier items to the worker threads
         self.success_page_count = 0  # The number of pages that have been successfully crawled
+        self.fetched_page_count = 0  # The number of pages downloaded in this run
+        self.enqueued_at = OrderedDict()  # url -> time it was queued in this run, for the queue wait timing
+        self.recrawl_policy = recrawl_policy  # Incremental recrawl, None downloads and parses every page
+        self.unchanged_page_count = 0  # Pages skipped in this run because they did not change
         self.lock = threading.Lock()  # A lock for thread-safe operations
-        self.raw_data_collection = mongo_client["ai_qa"]["crawler_raw_data"]  # MongoDB collection for storing raw data
+        if sinks is None:
+            sinks = [MongoSink(metrics=self.metrics)]
+        self.sinks = list(sinks)  # Outputs for raw pages and parsed items
+        if table_extractor is None:
+            # 只有写 MongoDB 的爬取才使用 ai_qa.llm_cache，否则缓存在内存中，不创建 MongoClient
+            mongo_sink = any(isinstance(sink, MongoSink) for sink in self.sinks)
+            cache_collection = get_mongo_client()["ai_qa"]["llm_cache"] if mongo_sink else None
+            table_extractor = TableExtractor(cache_collection, metrics=self.metrics)
+        self.table_extractor = table_extractor or None  # LLM table extraction workers, None extracts inline
+        self.near_duplicates = near_duplicates  # SimHash index of stored items, None stores every item
+        self.fetcher = TieredFetcher(self.download_with_browser, request_timeout=request_timeout, mode=fetch_mode,
+                                     domain_rules=domain_fetch_rules, pool_size=concurrency,
+                                     host_scheduler=self.host_scheduler, metrics=self.metrics)  # HTTP first, browser when needed
+
+    @property
+    def raw_data_collection(self):
+        # MongoDB collection for storing raw data, read by incremental recrawls; the client is created on first use
+        return get_mongo_client()["ai_qa"]["crawler_raw_data"]
+
+    @property
+    def extract_data_collection(self):
+        # MongoDB collection for parsed items
+        return get_mongo_client()["ai_qa"]["crawler_extract_data"]
 
     def run(self):
-        futures = []
-        self.url_queue.put((self.start_url, 1))
-        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
-            while self.success_page_count < self.max_pages:
-                try:
-                    current_url, depth = self.url_queue.get_nowait()
-                except:
-                    current_url, depth = None, 0
-                if current_url:
-                    future = executor.submit(self.process_single_url, current_url, depth)
-                    futures.append(future)
-                    continue
-                done, not_done = wait(futures, timeout=3, return_when=FIRST_COMPLETED)
-                if len(futures) == 0:
-                    break
-                for future in done:
-                    future.result()
-                    futures.remove(future)
-                sleep(5)
+        self.queue_url(self.start_url, 1)
+        self.seed_due_urls()
+        self.open_stages()
+        handler = self.process_single_url
+        if self.profiler is not None:
+            self.profiler.start()
+            handler = self.profiler.profiled(handler)
+        try:
+            self.scheduler.run(handler, teardown=self.tls.close)
+        finally:
+            self.close_stages()
+            self.enqueued_at.clear()  # 停止时仍在排队的 URL
+            self.log_crawl_stats()
+            if self.profiler is not None:
+                self.profiler.stop()
+
+    def log_crawl_stats(self):
+        logging.info(f"Fetch tiers: {self.fetcher.stats()}")
+        if self.resource_profile is not None:
+            logging.info(f"Blocked browser requests: {self.resource_profile.stats()}")
+        articles_per_page = self.success_page_count / self.fetched_page_count if self.fetched_page_count else 0.0
+        logging.info(f"Articles per fetched page: {articles_per_page:.3f} "
+                     f"({self.success_page_count} articles, {self.fetched_page_count} pages fetched)")
+        if self.recrawl_policy is not None:
+            logging.info(f"Unchanged pages skipped: {self.unchanged_page_count}")
+        if self.table_extractor is not None:
+            logging.info(f"Table extraction: {self.table_extractor.stats()}")
+        logging.info(f"Link filter: {self.link_filter.stats()}")
+        if self.near_duplicates is not None:
+            logging.info(f"Near duplicates: {self.near_duplicates.stats()}")
+        if self.exclude_filter is not None:
+            logging.info(f"Exclude filter: {self.exclude_filter.stats()}")
+
+    def seed_due_urls(self):
+        """
+        Queue the previously crawled URLs of the start URL's host whose next crawl time has passed.
+        """
+        if self.recrawl_policy is None:
+            return
+        host = urlparse(self.start_url).netloc
+        self.raw_data_collection.create_index("next_crawl_at")
+        cursor = self.raw_data_collection.find(
+            {"url": {"$regex": f"^https?://{re.escape(host)}/"}, "next_crawl_at": {"$lte": datetime.utcnow()}},
+            projection={"_id": 0, "url": 1}).sort("next_crawl_at", 1).limit(self.max_pages * 2)
+        for doc in cursor:
+            if doc["url"] != self.start_url:
+                self.queue_url(doc["url"], 2, self.url_scorer.score(doc["url"], 2))
+
+    def queue_url(self, url, depth, score=0.0):
+        if not self.scheduler.put((url, depth, score)):
+            return
+        with self.lock:
+            self.enqueued_at[url] = perf_counter()
+            if len(self.enqueued_at) > MAX_QUEUE_WAIT_URLS:
+                self.enqueued_at.popitem(last=False)
 
     def process_single_url(self, url, depth):
-        try:
-            if url in self.visited_urls or self.success_page_count >= self.max_pages or depth > self.max_recursion_depth:
+        with self.metrics.page(url):
+            self.observe_queue_wait(url)
+            try:
+                if self.should_skip_url(url, depth):
+                    return
+                record = self.load_recrawl_record(url, depth)
+                if record is not None and not self.recrawl_policy.is_due(record):
+                    logging.info(f"Skip {url}, next crawl at {record['next_crawl_at']}")
+                    self.record_outcome(url, "not_due")
+                    return
+                logging.info(f"Processing {url}, Success crawled: {self.success_page_count}, "
+                             f"Total crawled: {self.frontier.visited_count()}")
+                validators = self.recrawl_policy.validators(record) if self.recrawl_policy is not None else None
+                content = self.download_pages(url, validators)
+                if content is None:
+                    self.record_outcome(url, "failed")
+                    return
+                self.handle_page(url, depth, content, record, validators)
+            except Exception as e:
+                logging.error(e)
+                self.record_outcome(url, "error")
+                raise e
+
+    def observe_queue_wait(self, url):
+        with self.lock:
+            enqueued_at = self.enqueued_at.pop(url, None)
+        if enqueued_at is not None:
+            self.metrics.observe("queue_wait", perf_counter() - enqueued_at)
+        self.metrics.set_gauge("crawler_frontier_size", self.scheduler.qsize())
+
+    def record_outcome(self, url, outcome):
+        self.metrics.increment("crawler_pages_total", domain=urlparse(url).netloc, outcome=outcome)
+
+    def should_skip_url(self, url, depth):
+        return self.frontier.is_visited(url) or self.success_page_count >= self.max_pages or depth > self.max_recursion_depth
+
+    def load_recrawl_record(self, url, depth):
+        """
+        The URL's stored recrawl fields in incremental mode, None otherwise. The start URL is always fetched in full
+        because its links are how due pages are found.
+        """
+        if self.recrawl_policy is None or depth <= 1:
+            return None
+        return self.raw_data_collection.find_one({"url": url}, projection=RECRAWL_FIELDS)
+
+    def handle_page(self, url, depth, content, record=None, validators=None):
+        if content is NOT_MODIFIED:
+            self.skip_unchanged_page(url, record, validators, "not_modified")
+            return
+        # 整个页面只解析一次，清理、链接提取和正文解析共用同一棵树
+        with self.metrics.time("boilerplate_removal"):
+            document = HtmlDocument(content).remove_irrelevant_elements()
+        with self.metrics.time("link_extraction"):
+            links = self.extract_links(html=document, url=url)
+            for link, anchor_text in links:
+                self.add_queue_urls(link, depth + 1, anchor_text)
+        if self.recrawl_policy is not None:
+            page_hash = content_hash(document.text)
+            if not self.recrawl_policy.is_changed(record, page_hash):
+                self.skip_unchanged_page(url, record, validators, "unchanged")
                 return
-            logging.info(f"Processing {url}, Success crawled: {self.success_page_count}, "
-                         f"Total crawled: {len(self.visited_urls)}")
-            content = self.download_pages(url)
-            if content is None:
+            recrawl_state = {**self.recrawl_policy.next_state(record, changed=True), **(validators or {}),
+                             "content_hash": page_hash}
+            self.save_raw_html(url, document.html, recrawl_state)
+        else:
+            self.save_raw_html(url, document.html)
+        self.record_outcome(url, "success")
+        if self.is_exclude_url(url):
+            return
+        if self.parse_pool is None:
+            with self.metrics.time("trafilatura"):
+                doc = parse_html(url, document, extract_tables=self.table_extractor is None)
+            self.save_item(doc)
+            return
+        # 解析队列已满时阻塞下载线程（背压）
+        self.parse_slots.acquire()
+        try:
+            future = self.parse_pool.submit(parse_and_clean, url, document.html, self.table_extractor is None)
+        except Exception:
+            self.parse_slots.release()
+            raise
+        future.add_done_callback(functools.partial(self.on_page_parsed, url))
+
+    def skip_unchanged_page(self, url, record, validators, outcome):
+        # 内容未变化：只更新下次爬取时间，不解析也不写入正文
+        logging.info(f"Unchanged since last crawl, skip parsing: {url}")
+        self.record_outcome(url, outcome)
+        with self.lock:
+            self.unchanged_page_count += 1
+        recrawl_state = {**self.recrawl_policy.next_state(record, changed=False), **(validators or {})}
+        self.save_raw_html(url, None, recrawl_state)
+
+    def iter_items(self, include_raw=False, buffer_size=100):
+        """
+        Run the crawl in a background thread and yield each BaseETLItem as soon as it is saved, and each RawPage too
+        with `include_raw`. At most `buffer_size` results are buffered, the crawl waits while the buffer is full.
+        Closing the generator early stops the crawl.
+        """
+        sink = QueueSink(buffer_size, include_raw)
+        self.sinks.append(sink)
+        errors = []
+
+        def crawl():
+            try:
+                self.run()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                sink.put(QueueSink.END)
+
+        thread = threading.Thread(target=crawl, name="ArticleCrawler-iter", daemon=True)
+        thread.start()
+        try:
+            while (result := sink.queue.get()) is not QueueSink.END:
+                yield result
+            thread.join()
+            if errors:
+                raise errors[0]
+        finally:
+            if thread.is_alive():
+                # 调用方提前结束迭代：停止爬取并丢弃剩余结果
+                sink.cancel()
+                self.scheduler.stop()
+                thread.join()
+            self.sinks.remove(sink)
+
+    async def aiter_items(self, include_raw=False, buffer_size=100):
+        """
+        Async iterator version of iter_items, the crawl runs outside the caller's event loop.
+        """
+        import asyncio  # 只有异步迭代时才需要
+        items = self.iter_items(include_raw, buffer_size)
+        done = object()
+        try:
+            while (result := await asyncio.to_thread(next, items, done)) is not done:
+                yield result
+        finally:
+            await asyncio.to_thread(items.close)
+
+    def open_stages(self):
+        for sink in self.sinks:
+            sink.open()
+        if self.near_duplicates is not None:
+            self.near_duplicates.open()
+        if self.parse_workers <= 0:
+            return
+        # 浏览器线程已启动，使用 spawn 而不是 fork 创建解析进程
+        self.parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers,
+                                              mp_context=multiprocessing.get_context('spawn'))
+        self.parse_slots = threading.BoundedSemaphore(self.parse_queue_size)
+
+    def close_stages(self):
+        # 先等解析和表格提取完成，再把写入缓冲全部刷入 MongoDB
+        if self.parse_pool is not None:
+            self.parse_pool.shutdown(wait=True)
+            self.parse_pool = None
+        if self.table_extractor is not None:
+            self.table_extractor.close()
+        if self.near_duplicates is not None:
+            self.near_duplicates.close()
+        for sink in self.sinks:
+            sink.close()
+
+    def on_page_parsed(self, url, future):
+        self.parse_slots.release()
+        try:
+            data, timings = future.result()
+            for stage, seconds in timings.items():
+                self.metrics.observe(stage, seconds)
+            if data is not None:
+                self.save_item(BaseETLItem.from_dict(data), cleaned=True)
+        except Exception as e:
+            logging.error(f"Error parsing URL '{url}': {e}")
+
+    def save_item(self, doc, cleaned=False):
+        fingerprint = None
+        if self.near_duplicates is not None:
+            with self.metrics.time("fingerprint"):
+                fingerprint = self.near_duplicates.fingerprint(item_text(doc))
+            if fingerprint is not None and self.is_near_duplicate(doc, fingerprint):
                 return
-            content = remove_irrelevant_html_elements(content)
-            links = self.extract_links(html=content, url=url)
-            for link in links:
-                self.add_queue_urls(link, depth + 1)
-            self.save_raw_html(url, content)
-            if self.is_exclude_url(url):
+        self.store_item(doc, cleaned, fingerprint)
+
+    def is_near_duplicate(self, doc, fingerprint):
+        with self.metrics.time("near_duplicate_lookup"):
+            original = self.near_duplicates.find(doc.website_url, fingerprint)
+        if original is None:
+            return False
+        self.metrics.increment("crawler_near_duplicates_total", domain=urlparse(doc.website_url).netloc)
+        logging.info(f"'{doc.website_url}' is a near duplicate of '{original}'")
+        if self.near_duplicates.action == LINK:
+            for sink in self.sinks:
+                sink.link_related(original, doc.website_url)
+        return True
+
+    def store_item(self, doc, cleaned=False, fingerprint=None):
+        table_text = pending_table_text(doc)
+        if table_text is not None:
+            # 表格交给 TableExtractor 异步提取，完成后再保存
+            future = self.table_extractor.submit(table_text)
+            future.add_done_callback(functools.partial(self.on_table_extracted, doc, fingerprint))
+            return
+        if not cleaned:
+            try:
+                with self.metrics.time("clean"):
+                    doc.verify()
+                    doc.clean()
+            except Exception as e:
+                logging.error(f'{doc.website_url} verify error: {e}')
                 return
-            doc = parse_html(url, content)
-            # 保存解析后的数据
-            result = doc.update_one()
-            if result is not None:
-                self.increase_sites_count()
+        # 保存解析后的数据，所有输出都成功才计数
+        if all([sink.write_item(doc) for sink in self.sinks]):
+            self.increase_sites_count()
+            self.url_scorer.record_article(doc.website_url)
+            # 保存成功后才记录指纹，校验或写入失败的页面不会让之后的副本被当作重复
+            if fingerprint is not None:
+                self.near_duplicates.add(doc.website_url, fingerprint)
+
+    def on_table_extracted(self, doc, fingerprint, future):
+        try:
+            self.store_item(resolve_table(doc, future.result()), fingerprint=fingerprint)
         except Exception as e:
-            logging.error(e)
-            raise e
+            logging.error(f"Error saving table page '{doc.website_url}': {e}")
 
-    def download_pages(self, current_url):
-        browser = None
-        context = None
-        page = None
+    def download_pages(self, current_url, validators=None):
         try:
-            browser = self.tls.playwright.chromium.launch(
-                headless=True,
-                args=['--disable-blink-features=AutomationControlled']  # 防止被检测
-            )
-            context = browser.new_context(
-                viewport={"width": 1920, "height": 1080},
-                user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 "
-                           "Safari/537.36"
-            )
-            # 添加反爬插件
-            context.add_init_script(path=f"{PROJECT_PATH}/stealth.min.js")
+            return self.fetcher.fetch(current_url, validators)
+        finally:
+            self.add_visited_url(current_url)
 
-            page = context.new_page()
+    def download_with_browser(self, current_url):
+        page = None
+        try:
+            page = self.tls.new_page()
 
-            page.goto(current_url, timeout=self.request_timeout * 1000, wait_until='domcontentloaded')
+            with self.metrics.time("navigation"):
+                response = page.goto(current_url, timeout=self.request_timeout * 1000, wait_until='domcontentloaded')
+            self.report_response(current_url, status=response.status if response is not None else None)
 
-            scroll_height = 10000  # 替换为您想要的滚动高度
-            scroll_height_unit = 400  # 替换为您想要的滚动高度单位
-            current_height = 0
-            for i in range(0, scroll_height, scroll_height_unit):
-                current_height += scroll_height_unit
-                # 滚动到指定高度
-                page.evaluate(f"window.scrollTo(0, {current_height});")
-                # 等待一段时间
-                page.wait_for_timeout(200)
+            with self.metrics.time("scroll"):
+                if self.scroll_mode == 'adaptive':
+                    page.evaluate(ADAPTIVE_SCROLL_SCRIPT, self.adaptive_scroll_options(current_url))
+                else:
+                    scroll_height = 10000  # 替换为您想要的滚动高度
+                    scroll_height_unit = 400  # 替换为您想要的滚动高度单位
+                    current_height = 0
+                    for i in range(0, scroll_height, scroll_height_unit):
+                        current_height += scroll_height_unit
+                        # 滚动到指定高度
+                        page.evaluate(f"window.scrollTo(0, {current_height});")
+                        # 等待一段时间
+                        page.wait_for_timeout(200)
 
             content = page.content()
             return content
         except Exception as e:
             if str(e).__contains__('Timeout'):
                 logging.error(f"Timeout downloading URL '{current_url}': {e}")
+                self.report_response(current_url, timed_out=True)
                 return None
             logging.error(f"Error downloading URL '{current_url}': {e}")
+            # 浏览器或上下文可能已崩溃，下次请求时重新创建
+            self.tls.close_context()
             raise e
         finally:
-            self.add_visited_url(current_url)
             if page is not None:
-                page.close()
-            if context is not None:
-                context.close()
-            if browser is not None:
-                browser.close()
-
-    def save_raw_html(self, url, content):
-        doc = {
-            "url": url,
-            "content": content,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow(),
+                try:
+                    page.close()
+                except Exception as e:
+                    logging.warning(f"Error closing page '{current_url}': {e}")
+
+    def report_response(self, url, status=None, timed_out=False):
+        if timed_out:
+            self.metrics.increment("crawler_timeouts_total", domain=urlparse(url).netloc, tier=TieredFetcher.BROWSER)
+        if self.host_scheduler is not None:
+            self.host_scheduler.report(url, status=status, timed_out=timed_out)
+
+    def adaptive_scroll_options(self, url):
+        return {
+            "maxScrolls": self.domain_max_scrolls.get(urlparse(url).netloc, self.max_scrolls),
+            "settleTimeout": SCROLL_SETTLE_TIMEOUT,
+            "quietInterval": SCROLL_QUIET_INTERVAL,
         }
-        self.raw_data_collection.update_one(filter={"url": url}, update={"$set": doc},
-                                            upsert=True)
+
+    def save_raw_html(self, url, content, recrawl_state=None):
+        """
+        Write the raw HTML of a URL with its recrawl fields to every sink, a None `content` only updates the recrawl
+        fields.
+        """
+        for sink in self.sinks:
+            sink.write_raw(url, content, recrawl_state)
 
     def extract_links(self, url, html):
-        soup = BeautifulSoup(html, 'html.parser')
-        urls = []
-        for link in soup.find_all('a'):
-            href: str = link.get('href')
-            if href is None:
-                continue
-            if href.startswith('/'):
-                href = urljoin(url, href)
+        """
+        Return the crawlable links of a page as (url, anchor text) pairs, keeping the longest anchor text per URL.
+        """
+        from courlan import validate_url, scrub_url, clean_url  # 导入较慢（语言代码表），解析出链接时才加载
+        document = html if isinstance(html, HtmlDocument) else HtmlDocument(html)
+        links = {}
+        for href, anchor_text in document.links(url):
             if not validate_url(href)[0]:
                 continue
-            if href.__contains__('youtube.com') or href.__contains__('png') or href.__contains__('jpg'):
-                continue
             href = scrub_url(href)
             href = clean_url(href)
-            urls.append(href)
+            # 规则作用于清理后的 URL，与入队和去重时的 URL 一致
+            if href is None or not self.link_filter.allows(href):
+                continue
+            if len(anchor_text) >= len(links.get(href, '')):
+                links[href] = anchor_text
+        return list(links.items())
 
-        urls = list(set(urls))
-        urls.sort(key=lambda x: len(x), reverse=True)
-        return urls
+    def is_external(self, url):
+        from courlan import is_external
+        return is_external(url, self.start_url)
 
-    def add_queue_urls(self, url, depth):
-        if self.success_page_count >= self.max_pages or url in self.visited_urls:
+    def add_queue_urls(self, url, depth, anchor_text=''):
+        if self.success_page_count >= self.max_pages:
             return
-        if self.url_queue.qsize() >= self.max_pages * 2:
+        # 有界的优先队列会淘汰低分 URL，其他队列超过上限时直接丢弃
+        if not self.frontier.bounded and self.scheduler.qsize() >= self.max_pages * 2:
             return
-        if self.crypto_only_same_domain and is_external(url, self.start_url):
+        if self.crypto_only_same_domain and self.is_external(url):
             return
-        if self.include_urls is not None:
-            url_pattern = re.compile(self.include_urls)
-            if not url_pattern.match(url):
-                return
         # path长度小于15，大概率不是文章
         url_obj = urlparse(url)
         if url_obj.path is None or len(url_obj.path) < self.url_min_length:
             return
-        self.url_queue.put((url, depth), block=False)
+        self.queue_url(url, depth, self.url_scorer.score(url, depth, anchor_text))
 
     def is_exclude_url(self, url):
-        if self.exclude_urls is None:
+        if self.exclude_filter is None:
             return False
-        black_pattern = re.compile(self.exclude_urls)
-        if black_pattern.match(url):
-            return True
-        return False
+        return not self.exclude_filter.allows(url)
 
     def increase_sites_count(self):
         with self.lock:
             self.success_page_count += 1
+            if self.success_page_count >= self.max_pages:
+                self.scheduler.stop()
 
     def add_visited_url(self, url):
+        self.frontier.mark_visited(url)
+        self.url_scorer.record_fetch(url)
         with self.lock:
-            self.visited_urls.add(url)
\ No newline at end of file
+            self.fetched_page_count += 1
\ No newline at end of file
@@ -1,27 +1,125 @@
 import json
 import logging
 from datetime import datetime
-import trafilatura
-from bs4 import BeautifulSoup
+from time import perf_counter
+from urllib.parse import urljoin
+import lxml.html
+from lxml import etree
 from base_etl_item import BaseETLItem
 from util.openai_util import chat_response_dict
 
+# 需要移除的标签、role 属性以及跳转/弹窗元素
+IRRELEVANT_ELEMENTS_XPATH = etree.XPath(
+    "//nav | //footer | //script | //style | //noscript | //svg | //aside | //header"
+    " | //*[@role='alert' or @role='banner' or @role='dialog' or @role='alertdialog']"
+    " | //*[@role='region' and contains(translate(@aria-label, 'SKIP', 'skip'), 'skip')]"
+    " | //*[@aria-modal='true']"
+)
+ANCHORS_XPATH = etree.XPath("//a[@href]")
+TABLE_ROWS_XPATH = etree.XPath("count(//tr[count(td | th) >= 2])")
+# 已解码的页面按 UTF-8 字节重新解析，忽略 <?xml ... encoding=...?> 声明中的编码
+UTF8_HTML_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+PENDING_TABLE = 'pending_table'  # 表格页面等待 TableExtractor 提取时的 contents 类型
+TABLE_MIN_TEXT_LENGTH = 200  # 短页面（导航页、错误页等）不按表格处理
+TABLE_MIN_ROWS = 5  # 至少有这么多行（两个以上单元格）的 <tr> 才算表格页面
+CLAUSE_SEPARATORS = (',', '，', '、')  # 正文中常见的逗号，包括中文全角逗号和顿号
+
+
+class HtmlDocument:
+    """
+    An HTML page parsed once into an lxml tree. Boilerplate removal, link extraction, text extraction, table
+    detection and trafilatura all work on this tree; text and serialised HTML are cached until the tree changes.
+    trafilatura may modify the tree, so read `html` before handing the document to parse_html.
+    """
+
+    def __init__(self, html: str):
+        self.tree = parse_document(html)
+        self._text = None
+        self._html = None
+
+    def remove_irrelevant_elements(self):
+        for element in IRRELEVANT_ELEMENTS_XPATH(self.tree):
+            element.drop_tree()
+        self._text = None
+        self._html = None
+        return self
+
+    def links(self, base_url: str):
+        """
+        Yield (href, anchor text) for every <a href>, root-relative hrefs are resolved against `base_url`.
+        """
+        for anchor in ANCHORS_XPATH(self.tree):
+            href = anchor.get('href')
+            if href.startswith('/'):
+                href = urljoin(base_url, href)
+            yield href, anchor.text_content().strip()
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.tree.text_content()
+        return self._text
+
+    @property
+    def html(self) -> str:
+        if self._html is None:
+            self._html = lxml.html.tostring(self.tree, encoding='unicode')
+        return self._html
+
+    def is_table(self) -> bool:
+        """
+        A page is a table page when its text has few commas for its length and it has at least TABLE_MIN_ROWS table
+        rows, only then is it worth an LLM extraction.
+        """
+        return text_is_table(self.text) and TABLE_ROWS_XPATH(self.tree) >= TABLE_MIN_ROWS
 
-def parse_html(url: str, content: str):
-    extracted_data = trafilatura.bare_extraction(filecontent=content, include_comments=True, include_images=True)
+
+def parse_document(html: str):
+    """
+    Parse an HTML string into an lxml tree; a page lxml cannot parse (whitespace or comments only) is an empty
+    document rather than an error that would stop the crawl.
+    """
+    if not html or not html.strip():
+        html = '<html></html>'
+    try:
+        try:
+            return lxml.html.document_fromstring(html)
+        except ValueError:
+            # str 中带有编码声明时 lxml 拒绝解析
+            return lxml.html.document_fromstring(html.encode('utf-8'), parser=UTF8_HTML_PARSER)
+    except etree.ParserError:
+        return lxml.html.document_fromstring('<html></html>')
+
+
+def parse_html(url: str, content, extract_tables: bool = True):
+    """
+    Parse a page into a BaseETLItem, `content` is an HTML string or an HtmlDocument from the crawler.
+    With `extract_tables=False` a table page is not sent to the LLM here, its contents are a single PENDING_TABLE
+    entry for the caller to resolve with resolve_table().
+    """
+    import trafilatura  # 导入较慢，只在解析页面时加载
+
+    document = content if isinstance(content, HtmlDocument) else HtmlDocument(content)
+    # trafilatura 可能修改传入的树，先计算需要的文本
+    page_text = document.text
+    is_table = document.is_table()
+    extracted_data = trafilatura.bare_extraction(filecontent=document.tree, include_comments=True,
+                                                 include_images=True)
     if extracted_data is None:
-        text = html_to_txt(content)
         doc = BaseETLItem()
         doc.website = url
         doc.website_url = url
-        doc.contents = [{"type": "text", "content": text}]
-        return [doc]
+        doc.created_at = datetime.utcnow()
+        doc.updated_at = datetime.utcnow()
+        doc.contents = [{"type": "text", "content": page_text}]
+        return doc
 
     title = extracted_data.get('title', '')
     author = extracted_data.get('author', '')
     text = extracted_data.get('text', '')
     if text == '' or len(text) < 5:
-        text = html_to_txt(content)
+        text = page_text
     description = extracted_data.get('description', '')
     published_date = extracted_data.get('date', '')
     language = extracted_data.get('language', '')
@@ -39,8 +137,12 @@ def parse_html(url: str, content: str):
     doc.updated_at = datetime.utcnow()
     doc.published_at = published_date
 
-    if html_is_table(content):
-        table_data = parse_table(content)
+    if is_table and not extract_tables:
+        doc.contents = [{"type": PENDING_TABLE, "content": page_text, "fallback": text}]
+        return doc
+
+    if is_table:
+        table_data = parse_table(page_text)
         if table_data and len(table_data) > 0:
             doc.contents = [{"type": "table", "content": table_data}]
 
@@ -50,25 +152,65 @@ def parse_html(url: str, content: str):
     return doc
 
 
-def parse_table(html):
+def parse_and_clean(url: str, html: str, extract_tables: bool = True):
+    """
+    Parse-stage entry point for the process pool: parse, verify and clean a page. Returns the picklable item dict, or
+    None if the page has no valid content, and the seconds spent per stage.
+    """
+    start = perf_counter()
+    doc = parse_html(url, html, extract_tables)
+    parsed = perf_counter()
+    timings = {"trafilatura": parsed - start}
+    try:
+        doc.verify()
+    except ValueError as e:
+        logging.error(e)
+        return None, timings
+    doc.clean()
+    timings["clean"] = perf_counter() - parsed
+    return doc.doc_to_dict(), timings
+
+
+def parse_table(text):
     try:
-        html = html_to_txt(html)
-        return extract_json_data(html)
+        return extract_json_data(text)
     except Exception as e:
         logging.error(f"Error parsing table: {e}")
         return None
 
 
-def extract_json_data(html):
-    try:
-        content = f"""Given a string containing HTML content, please help me extract the JSON data.
+def pending_table_text(doc):
+    """
+    The page text of a PENDING_TABLE item, None if the item has no table waiting for extraction.
+    """
+    if doc.contents and doc.contents[0].get("type") == PENDING_TABLE:
+        return doc.contents[0]["content"]
+    return None
+
+
+def resolve_table(doc, table_data):
+    # 提取失败时退回正文文本
+    fallback = doc.contents[0]["fallback"]
+    if table_data:
+        doc.contents = [{"type": "table", "content": table_data}]
+    else:
+        doc.contents = [{"type": "text", "content": fallback}]
+    return doc
+
+
+def table_prompt(html):
+    return f"""Given a string containing HTML content, please help me extract the JSON data.
 If there is table data in HTML, please help me extract the JSON data of the table from it. Do not lose any data or include any HTML tags. Try to retain the key value of the original content and do not merge similar keys privately.
 Here is my input:
 {html}
 The returned data structure must be, and the extracted data must be in an array
 {{"data":[]}}
         """
-        result = chat_response_dict(content)
+
+
+def extract_json_data(html):
+    try:
+        result = chat_response_dict(table_prompt(html))
         return json.dumps(result)
     except Exception as e:
         logging.error(f"Error extracting JSON data from HTML: {e}")
@@ -76,44 +218,26 @@ The returned data structure must be, and the extracted data must be in an array
 
 
 def html_to_txt(input_html):
-    soup = BeautifulSoup(input_html, 'html.parser')
     # 只保留文本内容
-    return soup.get_text()
+    return HtmlDocument(input_html).text
 
 
 def remove_irrelevant_html_elements(html: str) -> str:
-    soup = BeautifulSoup(html, 'html.parser')
-
-    # List of tags to remove
-    tags_to_remove = ['nav', 'footer', 'script', 'style', 'noscript', 'svg', 'aside', 'header']
-
-    # Remove specified tags
-    for tag in tags_to_remove:
-        for t in soup.find_all(tag):
-            t.extract()
-
-    # List of roles to remove
-    roles_to_remove = ['alert', 'banner', 'dialog', 'alertdialog']
+    return HtmlDocument(html).remove_irrelevant_elements().html
 
-    # Remove elements with specified roles
-    for role in roles_to_remove:
-        for t in soup.select(f'[role="{role}"]'):
-            t.extract()
 
-    # Remove elements with specified attributes
-    for t in soup.select('[role="region"][aria-label*="skip" i], [aria-modal="true"]'):
-        t.extract()
-
-    return str(soup)
+def html_is_table(html: str):
+    return HtmlDocument(html).is_table()
 
 
-def html_is_table(html: str):
-    html = html_to_txt(html)
-    # text 中逗号和句号的数量
-    nums_comma = html.count(',')
-    html_len = len(html)
-    threshold = html_len * 0.001
+def text_is_table(text: str):
+    # text 中逗号的数量
+    nums_comma = sum(text.count(separator) for separator in CLAUSE_SEPARATORS)
+    text_len = len(text)
+    threshold = text_len * 0.001
     # 向上取整
     threshold = int(threshold)
-    # 如果文本长度大于 50 个字符并且逗号和句号的数量大于 5 个，那么就不是表格
-    return not (len(html) > 50 and nums_comma > threshold)
+    # 太短的页面不是表格；否则逗号数量超过阈值的是正文，不是表格
+    if len(text.strip()) < TABLE_MIN_TEXT_LENGTH:
+        return False
+    return nums_comma <= threshold
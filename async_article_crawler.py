@@ -0,0 +1,293 @@
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures.thread import ThreadPoolExecutor
+from time import perf_counter
+
+import httpx
+from playwright.async_api import async_playwright
+
+from crawl_metrics import default_metrics
+
+from article_crawler import ArticleCrawler, BROWSER_LAUNCH_OPTIONS, BROWSER_CONTEXT_OPTIONS, ADAPTIVE_SCROLL_SCRIPT, \
+    load_stealth_script
+
+FRONTIER_THREADS = 4  # SQLite/MongoDB 前沿队列的阻塞调用在这些线程上执行，不占用事件循环
+
+
+class AsyncBrowserPool:
+    """
+    A single Chromium browser shared by all in-flight pages of an event loop.
+    After `max_navigations` pages a fresh context is opened, the retired one is closed once its last page is done.
+    """
+
+    def __init__(self, playwright, max_navigations=50, resource_profile=None, metrics=None):
+        self.playwright = playwright
+        self.max_navigations = max_navigations
+        self.resource_profile = resource_profile
+        self.metrics = metrics or default_metrics
+        self.browser = None
+        self.context = None
+        self.navigations = 0
+        self.open_pages = {}
+        self.lock = asyncio.Lock()
+
+    async def new_page(self):
+        async with self.lock:
+            if self.browser is None or not self.browser.is_connected():
+                with self.metrics.time("browser_launch"):
+                    self.browser = await self.playwright.chromium.launch(**BROWSER_LAUNCH_OPTIONS)
+                self.context = None
+                self.open_pages = {}
+            if self.context is None or self.navigations >= self.max_navigations:
+                with self.metrics.time("browser_context"):
+                    self.context = await self.browser.new_context(**BROWSER_CONTEXT_OPTIONS)
+                # 添加反爬插件
+                await self.context.add_init_script(script=load_stealth_script())
+                if self.resource_profile is not None:
+                    await self.context.route("**/*", self.resource_profile.handle_route_async)
+                self.open_pages[self.context] = 0
+                self.navigations = 0
+            self.navigations += 1
+            context = self.context
+            self.open_pages[context] += 1
+        return await context.new_page()
+
+    async def close_page(self, page):
+        context = page.context
+        try:
+            await page.close()
+        except Exception as e:
+            logging.warning(f"Error closing page: {e}")
+        async with self.lock:
+            if context not in self.open_pages:
+                return
+            self.open_pages[context] -= 1
+            if context is self.context or self.open_pages[context] > 0:
+                return
+            del self.open_pages[context]
+        try:
+            await context.close()
+        except Exception as e:
+            logging.warning(f"Error closing browser context: {e}")
+
+    async def reset_context(self):
+        async with self.lock:
+            # 当前上下文可能已崩溃，下次请求时重新创建
+            self.context = None
+
+    async def close(self):
+        if self.browser is not None:
+            await self.browser.close()
+            self.browser = None
+
+
+class AsyncArticleCrawler(ArticleCrawler):
+    """
+    ArticleCrawler driven by playwright.async_api: one event loop keeps up to `concurrency` pages in flight.
+    Takes the same constructor options as ArticleCrawler and writes the same MongoDB documents. The HTTP tier uses an
+    httpx.AsyncClient with `concurrency` pooled connections, frontier calls (blocking SQLite or MongoDB I/O with a
+    durable frontier) run on a small dedicated thread pool, and the parsing and writing of each page runs in the
+    loop's default thread pool. As in the thread engine, a task is only started for a URL whose host may be
+    requested now, URLs of busy hosts stay parked in the CrawlScheduler so they never hold a task slot.
+    """
+
+    def __init__(self, start_url, concurrency=100, **kwargs):
+        super().__init__(start_url, concurrency=concurrency, **kwargs)
+        self.max_navigations_per_context = kwargs.get('max_navigations_per_context', 50)
+        self.browser_pool = None
+        self.semaphore = None
+        self.http_client = None  # httpx.AsyncClient of the HTTP tier while a crawl runs
+        self.frontier_executor = None  # Threads for blocking frontier calls while a crawl runs
+        self.handling_tasks = set()  # Tasks whose page is being handled on a thread
+
+    def run(self):
+        if self.profiler is None:
+            asyncio.run(self.run_async())
+            return
+        # 所有任务都在事件循环线程上运行，只需剖析这一个线程
+        self.profiler.start()
+        try:
+            with self.profiler.enabled():
+                asyncio.run(self.run_async())
+        finally:
+            self.profiler.stop()
+
+    async def run_async(self):
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.frontier_executor = ThreadPoolExecutor(max_workers=FRONTIER_THREADS, thread_name_prefix="frontier")
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        self.http_client = httpx.AsyncClient(limits=limits, timeout=self.request_timeout, follow_redirects=True,
+                                             headers={'User-Agent': BROWSER_CONTEXT_OPTIONS['user_agent']})
+        tasks = set()
+        try:
+            await self.in_frontier_thread(self.queue_url, self.start_url, 1)
+            await asyncio.to_thread(self.seed_due_urls)
+            self.open_stages()
+            async with async_playwright() as playwright:
+                self.browser_pool = AsyncBrowserPool(playwright, self.max_navigations_per_context,
+                                                     self.resource_profile, self.metrics)
+                try:
+                    while not self.scheduler.stopped:
+                        # 新链接由 handle_page 在任务结束前放入队列，因此每次有任务完成后重新取队列；
+                        # 最多取 2 * concurrency 个任务，不把整个共享前沿队列都租给本节点
+                        items, delay = await self.in_frontier_thread(self.pop_items,
+                                                                     self.concurrency * 2 - len(tasks))
+                        for current_url, depth in items:
+                            tasks.add(asyncio.create_task(self.process_single_url_async(current_url, depth)))
+                        if len(tasks) == 0:
+                            if delay is None:
+                                break
+                            # 待处理的 URL 都属于繁忙或冷却中的主机
+                            await asyncio.sleep(delay)
+                            continue
+                        # 主机的冷却时间到了也要重新取队列
+                        done, tasks = await asyncio.wait(tasks, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            task.result()
+                finally:
+                    await self.finish_tasks(tasks)
+                    await self.browser_pool.close()
+                    await asyncio.to_thread(self.close_stages)
+                    self.enqueued_at.clear()
+                    self.log_crawl_stats()
+        finally:
+            await self.http_client.aclose()
+            self.frontier_executor.shutdown(wait=True)
+
+    async def in_frontier_thread(self, function, *args):
+        # 与 asyncio.to_thread 相同，带上当前上下文，但使用专用线程池，不与页面解析争抢默认线程池
+        call = functools.partial(contextvars.copy_context().run, function, *args)
+        return await asyncio.get_running_loop().run_in_executor(self.frontier_executor, call)
+
+    async def finish_tasks(self, tasks):
+        """
+        Cancel the tasks still downloading and wait for the ones handling their page: handle_page keeps running on
+        its thread when its task is cancelled, so the sinks and stages may only be closed once it is done.
+        """
+        for task in tasks:
+            if task not in self.handling_tasks:
+                task.cancel()
+        # 页面处理中的错误已由 process_url_async 记录
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def pop_items(self, limit):
+        """
+        Up to `limit` items whose host may be requested now, and the seconds until a parked host may be ready.
+        """
+        items = []
+        delay = None
+        while len(items) < limit:
+            item, delay = self.scheduler.get_nowait()
+            if item is None:
+                break
+            items.append(item)
+        return items, delay
+
+    async def process_single_url_async(self, url, depth):
+        try:
+            await self.process_url_async(url, depth)
+        finally:
+            if self.host_scheduler is not None:
+                # 主机的请求名额由 CrawlScheduler.next_item 取得
+                self.host_scheduler.release(self.host_scheduler.host_of(url))
+
+    async def process_url_async(self, url, depth):
+        with self.metrics.page(url):
+            await self.in_frontier_thread(self.observe_queue_wait, url)
+            try:
+                if await self.in_frontier_thread(self.should_skip_url, url, depth):
+                    return
+                record = await asyncio.to_thread(self.load_recrawl_record, url, depth)
+                if record is not None and not self.recrawl_policy.is_due(record):
+                    logging.info(f"Skip {url}, next crawl at {record['next_crawl_at']}")
+                    self.record_outcome(url, "not_due")
+                    return
+                validators = self.recrawl_policy.validators(record) if self.recrawl_policy is not None else None
+                content = await self.download_politely(url, validators)
+                if content is None:
+                    self.record_outcome(url, "failed")
+                    return
+                # to_thread 会带上当前上下文，页面解析的阶段耗时计入该 URL
+                task = asyncio.current_task()
+                self.handling_tasks.add(task)
+                try:
+                    await asyncio.to_thread(self.handle_page, url, depth, content, record, validators)
+                finally:
+                    self.handling_tasks.discard(task)
+            except Exception as e:
+                logging.error(e)
+                self.record_outcome(url, "error")
+                raise e
+
+    async def download_politely(self, url, validators=None):
+        if self.host_scheduler is not None:
+            # 第一次请求主机时先读取 robots.txt，请求名额已在出队时取得
+            await asyncio.to_thread(self.host_scheduler.load_robots, url)
+        return await self.download_with_semaphore(url, validators)
+
+    async def download_with_semaphore(self, url, validators=None):
+        async with self.semaphore:
+            logging.info(f"Processing {url}, Success crawled: {self.success_page_count}, "
+                         f"Total crawled: {self.frontier.visited_count()}")
+            return await self.download_pages_async(url, validators)
+
+    async def download_pages_async(self, current_url, validators=None):
+        try:
+            if self.fetcher.use_http(current_url):
+                content = await self.fetch_http_async(current_url, validators)
+                if self.fetcher.accept_http(current_url, content):
+                    return content
+            start = perf_counter()
+            content = await self.download_with_browser_async(current_url)
+            self.fetcher.record_browser(current_url, content, perf_counter() - start)
+            return content
+        finally:
+            await self.in_frontier_thread(self.add_visited_url, current_url)
+
+    async def fetch_http_async(self, url, validators=None):
+        start = perf_counter()
+        content = None
+        try:
+            response = await self.http_client.get(url, headers=self.fetcher.conditional_headers(validators))
+            content = self.fetcher.read_response(url, response, validators)
+        except httpx.HTTPError as e:
+            self.fetcher.http_failed(url, e, timed_out=isinstance(e, httpx.TimeoutException))
+        self.fetcher.record_http(start, content)
+        return content
+
+    async def download_with_browser_async(self, current_url):
+        page = None
+        try:
+            page = await self.browser_pool.new_page()
+
+            with self.metrics.time("navigation"):
+                response = await page.goto(current_url, timeout=self.request_timeout * 1000,
+                                           wait_until='domcontentloaded')
+            self.report_response(current_url, status=response.status if response is not None else None)
+
+            with self.metrics.time("scroll"):
+                if self.scroll_mode == 'adaptive':
+                    await page.evaluate(ADAPTIVE_SCROLL_SCRIPT, self.adaptive_scroll_options(current_url))
+                else:
+                    scroll_height = 10000
+                    scroll_height_unit = 400
+                    current_height = 0
+                    for i in range(0, scroll_height, scroll_height_unit):
+                        current_height += scroll_height_unit
+                        await page.evaluate(f"window.scrollTo(0, {current_height});")
+                        await page.wait_for_timeout(200)
+
+            return await page.content()
+        except Exception as e:
+            if str(e).__contains__('Timeout'):
+                logging.error(f"Timeout downloading URL '{current_url}': {e}")
+                self.report_response(current_url, timed_out=True)
+                return None
+            logging.error(f"Error downloading URL '{current_url}': {e}")
+            await self.browser_pool.reset_context()
+            raise e
+        finally:
+            if page is not None:
+                await self.browser_pool.close_page(page)
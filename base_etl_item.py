@@ -1,50 +1,38 @@
 import logging
 import re
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from typing import Any, Optional
 from urllib.parse import urlparse
-from dateutil.parser import parser
-from unstructured.cleaners.core import clean
-from factory import mongo_client
 
 
+@dataclass(slots=True, eq=False)
 class BaseETLItem:
-    def __init__(self):
-        self.subtype = None
-        self.created_at = None
-        self.updated_at = None
-        self.name = None
-        self.website = None
-        self.website_url = None
-        self.headline = None
-        self.subheadline = ''
-        self.description = None
-        self.tags = []
-        self.related = []
-        self.contents = None
-        self.author = None
-        self.published_at = None
-        self.source = None
-        self.language = None
-        self.collection = mongo_client["ai_qa"]["crawler_extract_data"]
+    """
+    A parsed article, a plain record without I/O: MongoSink and the other sinks persist it. `__slots__` keeps each
+    item small, which matters when thousands wait in the parse and write queues.
+    """
+    subtype: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    name: Optional[str] = None
+    website: Optional[str] = None
+    website_url: Optional[str] = None
+    headline: Optional[str] = None
+    subheadline: str = ''
+    description: Optional[str] = None
+    tags: list = field(default_factory=list)
+    related: list = field(default_factory=list)
+    contents: Optional[list] = None
+    author: Any = None
+    published_at: Any = None
+    source: Optional[str] = None
+    language: Optional[str] = None
 
-    def update_one(self):
-        try:
-            self.verify()
-            self.clean()
-
-            # Try to get the document from the database
-            doc = self.collection.find_one({"website_url": self.website_url})
-
-            # If the document exists, get its created_at
-            if doc is not None:
-                self.created_at = doc.get('created_at')
-
-            doc = self.collection.update_one(filter={"website_url": self.website_url},
-                                             update={"$set": self.doc_to_dict()},
-                                             upsert=True)
-            logging.info(f'update_one success: {self.website_url} {self.headline} {self.published_at}')
-            return doc
-        except Exception as e:
-            logging.error(f'{self.website_url} update_one error: {e}')
+    @classmethod
+    def from_dict(cls, data):
+        names = {item_field.name for item_field in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in names})
 
     def verify(self):
         fields_to_check = [self.website, self.website_url, self.contents, self.created_at, self.updated_at]
@@ -56,6 +44,10 @@ class BaseETLItem:
             raise ValueError(f"{self.website_url} contents can't be empty")
 
     def clean(self):
+        # unstructured 和 dateutil 导入较慢，只在清洗时加载
+        from dateutil.parser import parser
+        from unstructured.cleaners.core import clean
+
         try:
             contents = self.contents
             for content in contents:
@@ -0,0 +1,72 @@
+"""
+Compare pages/sec of a browser launched per URL against the warm per-thread browser of PlaywrightInstance.
+
+    python -m benchmark.bench_browser_pool --pages 50
+"""
+import argparse
+import time
+
+from playwright.sync_api import sync_playwright
+
+from article_crawler import PlaywrightInstance, load_stealth_script
+from benchmark.fixture_server import start_fixture_server
+
+
+def fetch_with_launch(playwright, url):
+    # 旧的实现：每个 URL 都启动浏览器、创建上下文并注入反爬插件
+    browser = playwright.chromium.launch(headless=True, args=['--disable-blink-features=AutomationControlled'])
+    context = browser.new_context(viewport={"width": 1920, "height": 1080})
+    context.add_init_script(script=load_stealth_script())
+    page = context.new_page()
+    try:
+        page.goto(url, wait_until='domcontentloaded')
+        return page.content()
+    finally:
+        page.close()
+        context.close()
+        browser.close()
+
+
+def fetch_with_pool(instance, url):
+    page = instance.new_page()
+    try:
+        page.goto(url, wait_until='domcontentloaded')
+        return page.content()
+    finally:
+        page.close()
+
+
+def measure(name, fetch, urls):
+    start = time.perf_counter()
+    for url in urls:
+        fetch(url)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<16} {len(urls)} pages in {elapsed:.2f}s, {len(urls) / elapsed:.2f} pages/sec")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--pages", type=int, default=30)
+    arg_parser.add_argument("--max-navigations", type=int, default=50)
+    args = arg_parser.parse_args()
+
+    server = start_fixture_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base_url}/article/{i}" for i in range(args.pages)]
+
+    playwright = sync_playwright().start()
+    try:
+        measure("launch per url", lambda url: fetch_with_launch(playwright, url), urls)
+    finally:
+        playwright.stop()
+
+    instance = PlaywrightInstance(args.max_navigations)
+    try:
+        measure("warm browser", lambda url: fetch_with_pool(instance, url), urls)
+    finally:
+        instance.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Crawl the local fixture site end to end with ArticleCrawler at several concurrency levels and report pages/sec,
+p50/p99 per-page latency, CPU time and peak RSS, to catch performance regressions offline. The site mixes article,
+listing, table and SPA pages; table pages go to a local fake OpenAI server and items are written to mongomock, or to
+a local MongoDB with --mongo-url. Each level runs in its own process so CPU and RSS are not shared between runs.
+
+    python -m benchmark.bench_crawl --pages 500 --fanout 5 --latency 0.05 --concurrency 1,4,8
+    python -m benchmark.bench_crawl --fetch-mode http --output results.json
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import resource
+import statistics
+import threading
+import time
+
+from benchmark.fake_openai_server import start_fake_openai_server
+from benchmark.fixture_server import SiteHandler, start_fixture_server
+
+DATABASE = "crawl_benchmark"
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def mongo_database(mongo_url):
+    if mongo_url:
+        import pymongo
+        client = pymongo.MongoClient(mongo_url)
+        client.drop_database(DATABASE)
+        return client[DATABASE]
+    import mongomock
+    return mongomock.MongoClient()[DATABASE]
+
+
+def run_crawl(concurrency, args, site_url, openai_url, results):
+    from openai import OpenAI
+
+    from article_crawler import ArticleCrawler
+    from crawl_metrics import InMemoryMetrics
+    from sinks import MongoSink
+    from table_extractor import TableExtractor
+
+    # article_crawler 在导入时把日志级别设为 INFO
+    logging.getLogger().setLevel(logging.WARNING)
+    latencies = []
+    lock = threading.Lock()
+
+    class BenchmarkCrawler(ArticleCrawler):
+        def process_single_url(self, url, depth):
+            start = time.perf_counter()
+            try:
+                return super().process_single_url(url, depth)
+            finally:
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+
+    database = mongo_database(args.mongo_url)
+    metrics = InMemoryMetrics()
+    client = OpenAI(api_key="fixture", base_url=openai_url, max_retries=0)
+    crawler = BenchmarkCrawler(
+        start_url=site_url, max_pages=args.max_pages or args.pages, concurrency=concurrency,
+        max_recursion_depth=args.pages, fetch_mode=args.fetch_mode, parse_workers=args.parse_workers,
+        host_scheduler=None if args.politeness else False,
+        table_extractor=TableExtractor(database["llm_cache"], client=client, metrics=metrics),
+        sinks=[MongoSink(database["crawler_raw_data"], database["crawler_extract_data"], metrics=metrics)],
+        metrics=metrics)
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    crawler.run()
+    elapsed = time.perf_counter() - start
+    cpu_seconds = time.process_time() - cpu_start
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    results[concurrency] = {
+        "concurrency": concurrency,
+        "pages": crawler.fetched_page_count,
+        "items": database["crawler_extract_data"].count_documents({}),
+        "seconds": elapsed,
+        "pages_per_sec": crawler.fetched_page_count / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "cpu_seconds": cpu_seconds,
+        "children_cpu_seconds": children.ru_utime + children.ru_stime,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "children_max_rss_mb": children.ru_maxrss / 1024,
+        "fetch_tiers": crawler.fetcher.stats(),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--pages", type=int, default=500, help="size of the fixture site")
+    arg_parser.add_argument("--fanout", type=int, default=5, help="links per article page, listings have twice as many")
+    arg_parser.add_argument("--latency", type=float, default=0.05, help="seconds before the fixture site responds")
+    arg_parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds before the fake OpenAI responds")
+    arg_parser.add_argument("--concurrency", default="1,4,8", help="comma separated concurrency levels")
+    arg_parser.add_argument("--max-pages", type=int, default=None, help="items to crawl, defaults to --pages")
+    arg_parser.add_argument("--fetch-mode", default="auto", choices=["auto", "http", "browser"])
+    arg_parser.add_argument("--parse-workers", type=int, default=0)
+    arg_parser.add_argument("--politeness", action="store_true", help="keep the default per-host rate limit")
+    arg_parser.add_argument("--mongo-url", help="local MongoDB instead of mongomock, the benchmark database is dropped")
+    arg_parser.add_argument("--output", help="also write the results as JSON to this path")
+    args = arg_parser.parse_args()
+
+    SiteHandler.size = args.pages
+    SiteHandler.fanout = args.fanout
+    SiteHandler.latency = args.latency
+    site_server = start_fixture_server(SiteHandler)
+    openai_server = start_fake_openai_server(args.llm_latency)
+    site_url = f"http://127.0.0.1:{site_server.server_address[1]}/category/listing-0/latest"
+    openai_url = f"http://127.0.0.1:{openai_server.server_address[1]}/v1"
+
+    # 每个并发级别在独立的进程中运行，CPU 和峰值 RSS 互不影响
+    context = multiprocessing.get_context("spawn")
+    manager = context.Manager()
+    results = manager.dict()
+    for concurrency in [int(level) for level in args.concurrency.split(",")]:
+        process = context.Process(target=run_crawl, args=(concurrency, args, site_url, openai_url, results))
+        process.start()
+        process.join()
+    site_server.shutdown()
+    openai_server.shutdown()
+
+    print(f"{args.pages} page site, fanout {args.fanout}, latency {args.latency}s, fetch mode {args.fetch_mode}")
+    for concurrency in sorted(results.keys()):
+        result = results[concurrency]
+        print(f"concurrency {concurrency:<3} {result['pages']} pages, {result['items']} items in "
+              f"{result['seconds']:.2f}s, {result['pages_per_sec']:.2f} pages/sec, p50 {result['p50_ms']:.0f} ms, "
+              f"p99 {result['p99_ms']:.0f} ms, cpu {result['cpu_seconds']:.2f}s "
+              f"(+{result['children_cpu_seconds']:.2f}s children), max rss {result['max_rss_mb']:.0f} MB "
+              f"(children {result['children_max_rss_mb']:.0f} MB)")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump([results[concurrency] for concurrency in sorted(results.keys())], f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
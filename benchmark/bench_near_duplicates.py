@@ -0,0 +1,104 @@
+"""
+Throughput of the SimHash fingerprinting stage: a per-bit Python loop against the bytes.translate vote of
+near_duplicates.simhash, then NearDuplicateDetector.check with its in-memory index and, if mongomock is installed,
+a persisted one. A share of the articles are syndicated copies with small edits; reports how many are caught.
+
+    python -m benchmark.bench_near_duplicates --articles 5000 --duplicates 0.3
+"""
+import argparse
+import random
+import time
+from hashlib import blake2b
+
+from benchmark.corpus import sentence
+from near_duplicates import NearDuplicateDetector, hamming_distance, simhash, tokenize
+
+
+def generate_articles(count, duplicates, paragraphs=12):
+    """
+    Return (url, text, original_url) triples, original_url is None for unique articles.
+    """
+    rng = random.Random(7)
+    articles = []
+    for i in range(count):
+        url = f"https://news{i % 20}.example.com/2024/article-{i}"
+        if articles and rng.random() < duplicates:
+            original_url, text, _ = rng.choice([article for article in articles if article[2] is None])
+            # 转载：改一句话，加上来源说明
+            sentences = text.split(". ")
+            sentences[rng.randrange(len(sentences))] = sentence(rng).rstrip(".")
+            text = ". ".join(sentences) + f"\nThis article first appeared on {original_url}."
+            articles.append((url, text, original_url))
+            continue
+        text = "\n".join(" ".join(sentence(rng) for _ in range(5)) for _ in range(paragraphs))
+        articles.append((url, text, None))
+    return articles
+
+
+def simhash_per_bit(tokens, shingle_size=3):
+    # 常见写法：对每个 shingle 的每一位逐个投票
+    votes = [0] * 64
+    for i in range(max(1, len(tokens) - shingle_size + 1)):
+        value = int.from_bytes(blake2b(" ".join(tokens[i:i + shingle_size]).encode("utf-8"), digest_size=8).digest(),
+                               "big")
+        for bit in range(64):
+            votes[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if votes[bit] > 0)
+
+
+def measure_fingerprints(name, fingerprint, texts):
+    tokens = [tokenize(text) for text in texts]
+    start = time.perf_counter()
+    for article_tokens in tokens:
+        fingerprint(article_tokens)
+    elapsed = time.perf_counter() - start
+    megabytes = sum(len(text.encode("utf-8")) for text in texts) / 1024 / 1024
+    print(f"{name:<16} {len(texts) / elapsed:8.0f} articles/sec, {megabytes / elapsed:6.2f} MB/sec")
+
+
+def measure_detector(name, detector, articles):
+    start = time.perf_counter()
+    found = {url: detector.check(url, text) for url, text, _ in articles}
+    elapsed = time.perf_counter() - start
+    detector.close()
+    planted = [(url, original) for url, _, original in articles if original is not None]
+    caught = sum(1 for url, original in planted if found[url] is not None)
+    false_positives = sum(1 for url, _, original in articles if original is None and found[url] is not None)
+    print(f"{name:<16} {len(articles) / elapsed:8.0f} checks/sec, {caught} of {len(planted)} duplicates caught, "
+          f"{false_positives} false positives, {detector.stats()}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--articles", type=int, default=5000)
+    arg_parser.add_argument("--duplicates", type=float, default=0.3)
+    arg_parser.add_argument("--max-distance", type=int, default=6)
+    args = arg_parser.parse_args()
+
+    articles = generate_articles(args.articles, args.duplicates)
+    texts = [text for _, text, _ in articles]
+    print(f"{len(articles)} articles, {sum(len(tokenize(text)) for text in texts) / len(texts):.0f} tokens each")
+    measure_fingerprints("per-bit loop", simhash_per_bit, texts)
+    measure_fingerprints("translate vote", simhash, texts)
+
+    # 转载副本与原文的汉明距离，用于选择 max_distance
+    fingerprints = {url: simhash(tokenize(text)) for url, text, _ in articles}
+    distances = sorted(hamming_distance(fingerprints[url], fingerprints[original])
+                       for url, _, original in articles if original is not None)
+    if distances:
+        print(f"duplicate distance p50 {distances[len(distances) // 2]} bits, "
+              f"p90 {distances[len(distances) * 9 // 10]} bits, max {distances[-1]} bits")
+
+    measure_detector("memory index", NearDuplicateDetector(max_distance=args.max_distance), articles)
+    try:
+        import mongomock
+    except ImportError:
+        return
+    collection = mongomock.MongoClient()["ai_qa"]["crawler_fingerprints"]
+    detector = NearDuplicateDetector(collection, max_distance=args.max_distance)
+    detector.open()
+    measure_detector("mongomock index", detector, articles)
+
+
+if __name__ == '__main__':
+    main()
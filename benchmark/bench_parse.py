@@ -0,0 +1,118 @@
+"""
+Parse CPU time and peak Python heap per page for the old BeautifulSoup pipeline, which parsed every page 4-5 times,
+against the single-parse HtmlDocument pipeline. Each pipeline runs in its own process so peak RSS is comparable.
+LLM table extraction is disabled for both runs.
+
+    python -m benchmark.bench_parse --pages 200
+    python -m benchmark.bench_parse --fixtures /path/to/saved/html
+"""
+import argparse
+import glob
+import multiprocessing
+import resource
+import time
+import tracemalloc
+from urllib.parse import urljoin
+
+import trafilatura
+from bs4 import BeautifulSoup
+
+import article_parser
+from article_parser import HtmlDocument
+from benchmark.corpus import generate_pages
+
+BASE_URL = "https://fixture.local/article"
+
+
+def legacy_remove_irrelevant_html_elements(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in ['nav', 'footer', 'script', 'style', 'noscript', 'svg', 'aside', 'header']:
+        for t in soup.find_all(tag):
+            t.extract()
+    for role in ['alert', 'banner', 'dialog', 'alertdialog']:
+        for t in soup.select(f'[role="{role}"]'):
+            t.extract()
+    for t in soup.select('[role="region"][aria-label*="skip" i], [aria-modal="true"]'):
+        t.extract()
+    return str(soup)
+
+
+def legacy_html_to_txt(html):
+    return BeautifulSoup(html, 'html.parser').get_text()
+
+
+def legacy_pipeline(html):
+    content = legacy_remove_irrelevant_html_elements(html)
+    soup = BeautifulSoup(content, 'html.parser')
+    links = [urljoin(BASE_URL, a.get('href')) for a in soup.find_all('a') if a.get('href')]
+    trafilatura.bare_extraction(filecontent=content, include_comments=True, include_images=True)
+    text = legacy_html_to_txt(content)
+    is_table = article_parser.text_is_table(text)
+    if is_table:
+        legacy_html_to_txt(content)
+    return links
+
+
+def single_parse_pipeline(html):
+    document = HtmlDocument(html).remove_irrelevant_elements()
+    links = list(document.links(BASE_URL))
+    raw_html = document.html  # 保存原始 HTML 时的序列化
+    article_parser.parse_html(BASE_URL, document)
+    return links, raw_html
+
+
+PIPELINES = {
+    "legacy": legacy_pipeline,
+    "single-parse": single_parse_pipeline,
+}
+
+
+def run_pipeline(name, pages, results):
+    # 基准测试不调用 LLM
+    article_parser.parse_table = lambda text: None
+    pipeline = PIPELINES[name]
+    peaks = []
+    cpu_start = time.process_time()
+    for html in pages:
+        tracemalloc.start()
+        pipeline(html)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    cpu_seconds = time.process_time() - cpu_start
+    results[name] = {
+        "cpu_ms_per_page": cpu_seconds * 1000 / len(pages),
+        "peak_heap_kb_per_page": sum(peaks) / len(peaks) / 1024,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def load_fixtures(path):
+    pages = []
+    for file_name in sorted(glob.glob(f"{path}/*.html")):
+        with open(file_name, encoding="utf-8", errors="replace") as f:
+            pages.append(f.read())
+    return pages
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--pages", type=int, default=200)
+    arg_parser.add_argument("--fixtures", help="directory of saved *.html pages, generated pages are used if omitted")
+    args = arg_parser.parse_args()
+
+    pages = load_fixtures(args.fixtures) if args.fixtures else generate_pages(args.pages)
+    manager = multiprocessing.Manager()
+    results = manager.dict()
+    for name in PIPELINES:
+        process = multiprocessing.Process(target=run_pipeline, args=(name, pages, results))
+        process.start()
+        process.join()
+
+    print(f"{len(pages)} pages")
+    for name, result in results.items():
+        print(f"{name:<14} cpu {result['cpu_ms_per_page']:.2f} ms/page, "
+              f"peak heap {result['peak_heap_kb_per_page']:.0f} KB/page, max rss {result['max_rss_mb']:.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
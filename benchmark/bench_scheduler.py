@@ -0,0 +1,99 @@
+"""
+Compare the old sleep(5) polling loop of ArticleCrawler.run with CrawlScheduler on the local fixture site.
+Pages are fetched with urllib so the numbers show scheduling overhead and worker idle time, not browser cost.
+
+    python -m benchmark.bench_scheduler --workers 8 --depth 4 --latency 0.2
+"""
+import argparse
+import re
+import threading
+import time
+import urllib.request
+from concurrent.futures import wait, FIRST_COMPLETED
+from concurrent.futures.thread import ThreadPoolExecutor
+from queue import Queue
+
+from benchmark.fixture_server import FixtureHandler, start_fixture_server
+from crawl_scheduler import CrawlScheduler
+
+
+class FixtureCrawl:
+    def __init__(self, base_url, max_depth, put):
+        self.base_url = base_url
+        self.max_depth = max_depth
+        self.put = put
+        self.pages = 0
+        self.lock = threading.Lock()
+
+    def process(self, url, depth):
+        with urllib.request.urlopen(url) as response:
+            html = response.read().decode("utf-8")
+        with self.lock:
+            self.pages += 1
+        if depth >= self.max_depth:
+            return
+        for href in re.findall(r'href="(/article/\d+)"', html):
+            self.put((self.base_url + href, depth + 1))
+
+
+def run_polling(base_url, workers, max_depth):
+    # 旧的 run() 循环：非阻塞取队列，等待 3 秒后固定 sleep(5)
+    url_queue = Queue()
+    crawl = FixtureCrawl(base_url, max_depth, url_queue.put)
+    url_queue.put((f"{base_url}/article/0", 1))
+    futures = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            try:
+                current_url, depth = url_queue.get_nowait()
+            except Exception:
+                current_url, depth = None, 0
+            if current_url:
+                futures.append(executor.submit(crawl.process, current_url, depth))
+                continue
+            done, not_done = wait(futures, timeout=3, return_when=FIRST_COMPLETED)
+            if len(futures) == 0:
+                break
+            for future in done:
+                future.result()
+                futures.remove(future)
+            time.sleep(5)
+    return crawl.pages
+
+
+def run_scheduler(base_url, workers, max_depth):
+    scheduler = CrawlScheduler(workers)
+    crawl = FixtureCrawl(base_url, max_depth, scheduler.put)
+    scheduler.put((f"{base_url}/article/0", 1))
+    scheduler.run(crawl.process)
+    return crawl.pages, scheduler.stats()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--workers", type=int, default=8)
+    arg_parser.add_argument("--depth", type=int, default=4)
+    arg_parser.add_argument("--fanout", type=int, default=3)
+    arg_parser.add_argument("--latency", type=float, default=0.2)
+    args = arg_parser.parse_args()
+
+    FixtureHandler.fanout = args.fanout
+    FixtureHandler.latency = args.latency
+    server = start_fixture_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    start = time.perf_counter()
+    pages = run_polling(base_url, args.workers, args.depth)
+    elapsed = time.perf_counter() - start
+    print(f"polling loop   {pages} pages in {elapsed:.2f}s, {pages / elapsed:.2f} pages/sec")
+
+    start = time.perf_counter()
+    pages, stats = run_scheduler(base_url, args.workers, args.depth)
+    elapsed = time.perf_counter() - start
+    print(f"scheduler      {pages} pages in {elapsed:.2f}s, {pages / elapsed:.2f} pages/sec, "
+          f"worker idle {stats['idle_seconds']:.2f}s ({stats['idle_ratio']:.0%})")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
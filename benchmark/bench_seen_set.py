@@ -0,0 +1,69 @@
+"""
+Memory per million URLs and lookups/sec of a plain set of URL strings, HashedSeenSet and BloomSeenSet.
+
+    python -m benchmark.bench_seen_set --urls 1000000
+"""
+import argparse
+import time
+import tracemalloc
+
+from seen_urls import HashedSeenSet, BloomSeenSet
+
+
+class StringSet:
+    # 原来的实现：保存完整的 URL 字符串
+    def __init__(self):
+        self.urls = set()
+
+    def add(self, url):
+        if url in self.urls:
+            return False
+        self.urls.add(url)
+        return True
+
+    def __contains__(self, url):
+        return url in self.urls
+
+
+def generate_urls(count):
+    for i in range(count):
+        yield f"https://news{i % 50}.example.com/2024/{i % 12 + 1:02d}/{i % 28 + 1:02d}/article-slug-number-{i}"
+
+
+def measure(name, factory, count):
+    # URL 字符串在统计内存时生成，原来的实现需要为它们付出内存
+    tracemalloc.start()
+    seen = factory()
+    for url in generate_urls(count):
+        seen.add(url)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    seen = factory()
+    start = time.perf_counter()
+    for url in generate_urls(count):
+        seen.add(url)
+    add_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hits = sum(1 for url in generate_urls(count) if url in seen)
+    lookup_seconds = time.perf_counter() - start
+
+    per_million = memory / count * 1_000_000 / 1024 / 1024
+    print(f"{name:<12} {per_million:8.1f} MB per million URLs, {count / add_seconds:10.0f} adds/sec, "
+          f"{count / lookup_seconds:10.0f} lookups/sec, {hits} hits")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--urls", type=int, default=1_000_000)
+    arg_parser.add_argument("--error-rate", type=float, default=0.001)
+    args = arg_parser.parse_args()
+
+    measure("string set", StringSet, args.urls)
+    measure("hashed", HashedSeenSet, args.urls)
+    measure("bloom", lambda: BloomSeenSet(capacity=args.urls, error_rate=args.error_rate), args.urls)
+
+
+if __name__ == '__main__':
+    main()
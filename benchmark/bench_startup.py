@@ -0,0 +1,86 @@
+"""
+Import time of the crawler modules, the heavy packages and clients they load, and memory per BaseETLItem. Each
+measurement runs in a fresh interpreter. Pass another checkout with --baseline to compare, e.g. one created with
+`git worktree add /tmp/baseline <commit>`.
+
+    python -m benchmark.bench_startup --runs 5
+    python -m benchmark.bench_startup --baseline /tmp/baseline
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+MODULES = ["base_etl_item", "article_parser", "sinks", "table_extractor", "article_crawler"]
+HEAVY_PACKAGES = ["pymongo", "openai", "unstructured", "trafilatura", "dateutil", "requests", "playwright"]
+
+IMPORT_SNIPPET = """
+import json, sys, threading, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "threads": threading.active_count(),
+                  "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+# 与 parse_html 产出的条目相同的字段
+ITEM_SNIPPET = """
+import json, tracemalloc
+from datetime import datetime
+from base_etl_item import BaseETLItem
+items = []
+tracemalloc.start()
+for i in range({count}):
+    item = BaseETLItem()
+    item.website = item.website_url = f"https://news.example.com/2024/article-{{i}}"
+    item.headline = "headline"
+    item.author = "author"
+    item.created_at = item.updated_at = datetime.utcnow()
+    item.contents = [{{"type": "text", "content": "text"}}]
+    items.append(item)
+print(json.dumps({{"bytes": tracemalloc.get_traced_memory()[0] / {count}}}))
+"""
+
+
+def run_snippet(path, snippet):
+    result = subprocess.run([sys.executable, "-c", snippet], cwd=path, capture_output=True, text=True,
+                            env={**os.environ, "PYTHONPATH": path})
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure(path, runs, items):
+    for module in MODULES:
+        samples = [run_snippet(path, IMPORT_SNIPPET.format(module=module, heavy=HEAVY_PACKAGES)) for _ in range(runs)]
+        if "error" in samples[0]:
+            print(f"  import {module:<16} {samples[0]['error']}")
+            continue
+        seconds = statistics.median(sample["seconds"] for sample in samples)
+        print(f"  import {module:<16} {seconds * 1000:8.1f} ms, {samples[0]['threads']} threads, "
+              f"loads {', '.join(samples[0]['loaded']) or 'none'}")
+    result = run_snippet(path, ITEM_SNIPPET.format(count=items))
+    if "error" in result:
+        print(f"  BaseETLItem              {result['error']}")
+    else:
+        print(f"  BaseETLItem              {result['bytes']:8.0f} bytes per item")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per module, the median is shown")
+    arg_parser.add_argument("--items", type=int, default=100_000)
+    arg_parser.add_argument("--baseline", help="another checkout of the repository to compare with")
+    args = arg_parser.parse_args()
+
+    current = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    checkouts = [("baseline", os.path.abspath(args.baseline))] if args.baseline else []
+    for name, path in checkouts + [("current", current)]:
+        print(f"{name}: {path}")
+        measure(path, args.runs, args.items)
+
+
+if __name__ == '__main__':
+    main()
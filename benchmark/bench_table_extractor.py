@@ -0,0 +1,94 @@
+"""
+Compare inline LLM table extraction on the crawl threads with TableExtractor against a local fake OpenAI server.
+A share of the table pages repeat, as listing and price tables do across a site. Reports LLM calls, wall time and
+how long crawl threads were blocked.
+
+    python -m benchmark.bench_table_extractor --pages 200 --threads 8 --duplicates 0.5 --latency 0.5
+"""
+import argparse
+import random
+import time
+from concurrent.futures.thread import ThreadPoolExecutor
+
+from openai import OpenAI
+
+from benchmark.corpus import table_page
+from benchmark.fake_openai_server import FakeOpenAIHandler, start_fake_openai_server
+from article_parser import HtmlDocument, table_prompt
+from table_extractor import TableExtractor
+from util.openai_util import chat_response_dict
+
+
+def table_texts(pages, duplicates):
+    rng = random.Random(7)
+    unique = max(1, int(pages * (1 - duplicates)))
+    texts = [HtmlDocument(table_page(page_id, seed=page_id)).text for page_id in range(unique)]
+    return [texts[i] if i < unique else rng.choice(texts) for i in range(pages)]
+
+
+def run_inline(texts, threads, client):
+    blocked = []
+
+    def extract(text):
+        start = time.perf_counter()
+        chat_response_dict(table_prompt(text), client=client)
+        blocked.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(extract, texts))
+    return sum(blocked)
+
+
+def run_extractor(texts, threads, client, workers, cache_collection):
+    extractor = TableExtractor(cache_collection, max_workers=workers, client=client)
+    blocked = []
+    futures = []
+
+    def submit(text):
+        start = time.perf_counter()
+        futures.append(extractor.submit(text))
+        blocked.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(submit, texts))
+    extractor.close()
+    assert all(future.result() is not None for future in futures)
+    return sum(blocked), extractor.stats()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--pages", type=int, default=200)
+    arg_parser.add_argument("--threads", type=int, default=8)
+    arg_parser.add_argument("--workers", type=int, default=4)
+    arg_parser.add_argument("--duplicates", type=float, default=0.5)
+    arg_parser.add_argument("--latency", type=float, default=0.5)
+    args = arg_parser.parse_args()
+
+    server = start_fake_openai_server(args.latency)
+    client = OpenAI(api_key="fixture", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1", max_retries=0)
+    texts = table_texts(args.pages, args.duplicates)
+
+    start = time.perf_counter()
+    blocked = run_inline(texts, args.threads, client)
+    elapsed = time.perf_counter() - start
+    print(f"inline          {FakeOpenAIHandler.calls} LLM calls in {elapsed:.2f}s, "
+          f"crawl threads blocked {blocked:.2f}s")
+
+    try:
+        import mongomock
+        cache_collection = mongomock.MongoClient()["ai_qa"]["llm_cache"]
+    except ImportError:
+        cache_collection = None
+    for run in ("cold cache", "warm cache") if cache_collection is not None else ("memory cache",):
+        FakeOpenAIHandler.calls = 0
+        start = time.perf_counter()
+        blocked, stats = run_extractor(texts, args.threads, client, args.workers, cache_collection)
+        elapsed = time.perf_counter() - start
+        print(f"{run:15} {FakeOpenAIHandler.calls} LLM calls in {elapsed:.2f}s, "
+              f"crawl threads blocked {blocked:.2f}s, {stats}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Links/sec of the old link checks, substring tests for youtube.com, png and jpg plus re.compile of include_urls and
+exclude_urls per call, against a UrlFilter compiled once. Also counts article links the substring tests dropped.
+
+    python -m benchmark.bench_url_filter --links 500000
+"""
+import argparse
+import random
+import re
+import time
+
+from url_filter import DEFAULT_LINK_EXCLUDES, UrlFilter, UrlRules
+
+INCLUDE_URLS = r'https://(www\.)?news\d+\.example\.com/'
+EXCLUDE_RULES = ['glob:*/tag/*', 'glob:*/author/*', r'https://[^/]+/(login|signup|cart)']
+
+
+def generate_links(count):
+    rng = random.Random(7)
+    links = []
+    for i in range(count):
+        host = f"https://news{i % 50}.example.com"
+        kind = rng.random()
+        if kind < 0.5:
+            links.append(f"{host}/2024/{i % 12 + 1:02d}/article-slug-number-{i}")
+        elif kind < 0.55:
+            # 标题里含 png/jpg 的文章，旧的子串检查会丢弃
+            links.append(f"{host}/2024/{i % 12 + 1:02d}/png-vs-jpg-image-formats-{i}")
+        elif kind < 0.7:
+            links.append(f"{host}/static/images/photo-{i}.{rng.choice(['png', 'jpg', 'webp', 'svg'])}")
+        elif kind < 0.75:
+            links.append(f"https://www.youtube.com/watch?v={i}")
+        elif kind < 0.85:
+            links.append(f"{host}/tag/{rng.choice(['defi', 'nft', 'layer2'])}/{i}")
+        elif kind < 0.9:
+            links.append(f"{host}/login?next=/2024/{i}")
+        else:
+            links.append(f"https://other{i % 20}.example.org/2024/article-{i}")
+    return links
+
+
+def legacy_allows(url):
+    if url.__contains__('youtube.com') or url.__contains__('png') or url.__contains__('jpg'):
+        return False
+    if not re.compile(INCLUDE_URLS).match(url):
+        return False
+    # 旧的 exclude_urls 只能是一个正则
+    exclude_pattern = r'.*/tag/.*|.*/author/.*|https://[^/]+/(login|signup|cart)'
+    return not re.compile(exclude_pattern).match(url)
+
+
+def measure(name, allows, links):
+    start = time.perf_counter()
+    allowed = [url for url in links if allows(url)]
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12} {len(links) / elapsed:10.0f} links/sec, {len(allowed)} allowed")
+    return allowed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--links", type=int, default=500_000)
+    args = arg_parser.parse_args()
+
+    links = generate_links(args.links)
+    legacy = measure("legacy", legacy_allows, links)
+    url_filter = UrlFilter(include=INCLUDE_URLS, exclude=DEFAULT_LINK_EXCLUDES | UrlRules.parse(EXCLUDE_RULES))
+    compiled = measure("url filter", url_filter.allows, links)
+
+    dropped = set(compiled) - set(legacy)
+    print(f"article links dropped by the substring checks: {len(dropped)}")
+    print(f"rejections: {url_filter.stats()['rejected_by_rule']}")
+
+
+if __name__ == '__main__':
+    main()
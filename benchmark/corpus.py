@@ -0,0 +1,131 @@
+import random
+
+WORDS = ("crawler article market token chain protocol yield liquidity report analysis price network "
+         "update release research governance proposal community developer security audit").split()
+
+
+def sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def article_page(page_id, links=(), paragraphs=20, seed=None):
+    rng = random.Random(page_id if seed is None else seed)
+    body = "\n".join(f"<p>{' '.join(sentence(rng) for _ in range(5))}</p>" for _ in range(paragraphs))
+    link_items = "".join(f'<li><a href="{href}">{text}</a></li>' for href, text in links)
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<title>Article {page_id}</title>
+<meta name="author" content="Author {page_id % 7}">
+<meta property="article:published_time" content="2024-01-{page_id % 28 + 1:02d}">
+<style>body {{ font-family: sans-serif; }}</style>
+<script>window.analytics = {{ page: {page_id} }};</script>
+</head>
+<body>
+<header><a href="/">Home</a></header>
+<nav><ul><li><a href="/news">News</a></li><li><a href="/about">About</a></li></ul></nav>
+<div role="banner">Subscribe to our newsletter</div>
+<article>
+<h1>Article {page_id}: {sentence(rng, 6)}</h1>
+{body}
+</article>
+<aside><ul>{link_items}</ul></aside>
+<footer>Copyright fixture</footer>
+<svg width="10" height="10"><circle cx="5" cy="5" r="4"/></svg>
+</body>
+</html>"""
+
+
+def table_page(page_id, rows=50, seed=None):
+    rng = random.Random(page_id if seed is None else seed)
+    body = "".join(f"<tr><td>{rng.choice(WORDS)}</td><td>{rng.randint(1, 10000)}</td><td>{rng.random():.4f}</td></tr>"
+                   for _ in range(rows))
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head><title>Table {page_id}</title></head>
+<body>
+<nav><a href="/">Home</a></nav>
+<table><thead><tr><th>Pool</th><th>TVL</th><th>APY</th></tr></thead><tbody>{body}</tbody></table>
+</body>
+</html>"""
+
+
+def listing_page(page_id, links):
+    link_items = "".join(f'<li><a href="{href}">{text}</a></li>' for href, text in links)
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head><title>Listing {page_id}</title></head>
+<body>
+<nav><a href="/">Home</a></nav>
+<h1>Latest articles, page {page_id}</h1>
+<ul>{link_items}</ul>
+<footer>Copyright fixture</footer>
+</body>
+</html>"""
+
+
+def spa_page(page_id, paragraphs=10, seed=None):
+    # 正文由 JS 渲染，HTTP 抓取只能拿到空的 #root
+    rng = random.Random(page_id if seed is None else seed)
+    body = "".join(f"<p>{' '.join(sentence(rng) for _ in range(5))}</p>" for _ in range(paragraphs))
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head><title>App {page_id}</title></head>
+<body>
+<div id="root"></div>
+<noscript>You need to enable JavaScript to run this app.</noscript>
+<script>document.getElementById("root").innerHTML = {body!r};</script>
+</body>
+</html>"""
+
+
+SITE_PATHS = {
+    "listing": "/category/listing-{page_id}/latest",
+    "table": "/data/table-{page_id}/overview",
+    "spa": "/app/spa-{page_id}/dashboard",
+    "article": "/2024/01/article-{page_id}-fixture-slug",
+}
+
+
+def site_page_type(page_id):
+    """
+    Page types of the fixture site: every tenth page a listing, every tenth a table, every tenth an SPA shell.
+    """
+    return {0: "listing", 4: "table", 7: "spa"}.get(page_id % 10, "article")
+
+
+def site_path(page_id):
+    return SITE_PATHS[site_page_type(page_id)].format(page_id=page_id)
+
+
+def site_page(page_id, size, fanout=5):
+    """
+    Return the HTML of page `page_id` of a `size` page fixture site. Page n links to pages n * fanout + 1 to
+    n * fanout + fanout, wrapping around, so a crawl from page 0 reaches every page; listings link to twice as many.
+    """
+    page_type = site_page_type(page_id)
+    if page_type == "table":
+        return table_page(page_id)
+    if page_type == "spa":
+        return spa_page(page_id)
+    count = fanout * 2 if page_type == "listing" else fanout
+    links = [(site_path(child), f"Article {child}")
+             for child in ((page_id * fanout + k) % size for k in range(1, count + 1))]
+    if page_type == "listing":
+        return listing_page(page_id, links)
+    return article_page(page_id, links)
+
+
+def generate_pages(count, links_per_page=20):
+    """
+    Return `count` HTML pages, every fifth one a table page, the rest articles linking to other articles.
+    """
+    pages = []
+    for page_id in range(count):
+        if page_id % 5 == 4:
+            pages.append(table_page(page_id))
+            continue
+        links = [(f"/2024/01/article-{(page_id + k) % count}-fixture-slug", f"Article {(page_id + k) % count}")
+                 for k in range(1, links_per_page + 1)]
+        pages.append(article_page(page_id, links))
+    return pages
@@ -0,0 +1,48 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+from benchmark.fixture_server import start_fixture_server
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """
+    Answers POST /v1/chat/completions with a fixed JSON table after `latency` seconds and counts the calls.
+    Point an OpenAI client (or `openai_base_url` in the config) at http://127.0.0.1:<port>/v1.
+    """
+    latency = 0.5
+    calls = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with self.lock:
+            FakeOpenAIHandler.calls += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        content = json.dumps({"data": [{"name": "fixture", "value": len(json.dumps(request))}]})
+        body = json.dumps({
+            "id": "chatcmpl-fixture",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fixture"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_openai_server(latency=0.5):
+    FakeOpenAIHandler.latency = latency
+    FakeOpenAIHandler.calls = 0
+    return start_fixture_server(FakeOpenAIHandler)
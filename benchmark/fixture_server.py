@@ -0,0 +1,89 @@
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from benchmark.corpus import site_page
+
+ARTICLE_HTML = """<!DOCTYPE html>
+<html lang="en">
+<head><title>Fixture article {page_id}</title></head>
+<body>
+<nav><a href="/">Home</a></nav>
+<article>
+<h1>Fixture article {page_id}</h1>
+<p>{body}</p>
+</article>
+<ul>{links}</ul>
+<footer>fixture</footer>
+</body>
+</html>"""
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    Serves /article/<n> pages that link to their `fanout` children /article/<n * fanout + k>, after `latency` seconds.
+    """
+    fanout = 3
+    latency = 0.0
+
+    def do_GET(self):
+        match = re.search(r'/article/(\d+)', self.path)
+        page_id = int(match.group(1)) if match else 0
+        links = "".join(f'<li><a href="/article/{page_id * self.fanout + k}">Article {page_id * self.fanout + k}</a></li>'
+                        for k in range(1, self.fanout + 1))
+        body = ARTICLE_HTML.format(page_id=page_id, body="Lorem ipsum dolor sit amet. " * 200,
+                                   links=links).encode("utf-8")
+        if self.latency > 0:
+            time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """
+    Serves the `size` page fixture site of benchmark.corpus.site_page after `latency` seconds, 404 for other paths.
+    """
+    size = 1000
+    fanout = 5
+    latency = 0.0
+
+    def do_GET(self):
+        match = re.search(r'-(\d+)[-/]', self.path)
+        page_id = int(match.group(1)) if match else None
+        if page_id is None or page_id >= self.size:
+            self.send_error(404)
+            return
+        body = site_page(page_id, self.size, self.fanout).encode("utf-8")
+        if self.latency > 0:
+            time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer(ThreadingHTTPServer):
+    # 默认 backlog 为 5，并发连接多时会触发 1 秒的 SYN 重传
+    request_queue_size = 256
+    daemon_threads = True
+
+
+def start_fixture_server(handler=FixtureHandler, host="127.0.0.1", port=0):
+    """
+    Start a local HTTP server in a daemon thread and return it, `server.server_address` holds the bound port.
+    """
+    server = FixtureServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
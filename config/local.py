@@ -2,3 +2,4 @@ class LocalConfig(object):
     environment = 'local'
     mongodb_url = 'mongodb://localhost:27017/crawler'
     openai_api_key = ''
+    openai_base_url = None  # 为空时使用 OpenAI 官方地址，测试时可指向本地假服务
@@ -3,3 +3,4 @@ class ProductionConfig(object):
     environment = 'prod'
     mongodb_url = 'mongodb://mongodb:27017/crawler'
     openai_api_key = ''
+    openai_base_url = None
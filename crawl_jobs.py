@@ -0,0 +1,71 @@
+import uuid
+from datetime import datetime
+
+from pymongo import ASCENDING, ReturnDocument
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class CrawlJobQueue:
+    """
+    Crawl jobs in a MongoDB collection, shared by the Flask app and any number of crawl workers. A job holds the
+    ArticleCrawler arguments and the number of pages crawled across all workers; its URLs live in a shared
+    MongoFrontier under the job ID. Any pymongo-compatible collection works, e.g. mongomock on a single machine.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.collection.create_index([("status", ASCENDING), ("created_at", ASCENDING)])
+
+    def submit(self, params):
+        """
+        Queue a crawl with `params` as ArticleCrawler keyword arguments and return the job ID.
+        """
+        now = datetime.utcnow()
+        job_id = uuid.uuid4().hex
+        self.collection.insert_one({"_id": job_id, "params": params, "status": QUEUED, "pages_crawled": 0,
+                                    "workers": [], "created_at": now, "updated_at": now})
+        return job_id
+
+    def get(self, job_id):
+        return self.collection.find_one({"_id": job_id})
+
+    def next_job(self, worker_id):
+        """
+        Return the oldest queued or running job and mark it running. Jobs are not exclusive, every worker that picks
+        a running job leases URLs from the same frontier.
+        """
+        now = datetime.utcnow()
+        return self.collection.find_one_and_update(
+            {"status": {"$in": [QUEUED, RUNNING]}},
+            {"$set": {"status": RUNNING, "updated_at": now}, "$min": {"started_at": now},
+             "$addToSet": {"workers": worker_id}},
+            sort=[("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER)
+
+    def increment_pages(self, job_id):
+        """
+        Count one more crawled page for the job and return the job's total.
+        """
+        job = self.collection.find_one_and_update(
+            {"_id": job_id},
+            {"$inc": {"pages_crawled": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            projection={"pages_crawled": 1},
+            return_document=ReturnDocument.AFTER)
+        return job["pages_crawled"]
+
+    def status_counts(self):
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+        for row in self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+        return counts
+
+    def finish(self, job_id, status=DONE, error=None):
+        now = datetime.utcnow()
+        update = {"status": status, "finished_at": now, "updated_at": now}
+        if error is not None:
+            update["error"] = error
+        self.collection.update_one({"_id": job_id, "status": RUNNING}, {"$set": update})
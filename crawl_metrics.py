@@ -0,0 +1,243 @@
+import cProfile
+import contextvars
+import io
+import logging
+import pstats
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from time import perf_counter
+
+# 阶段耗时直方图的桶（秒）
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 当前 URL 的阶段耗时；线程和 asyncio 任务各有自己的上下文，asyncio.to_thread 会继承
+page_timings = contextvars.ContextVar("page_timings", default=None)
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class InMemoryMetrics:
+    """
+    Metrics sink that keeps counters, gauges and per-stage timing histograms in memory, and the stage timings of the
+    last `max_pages` URLs. snapshot() returns plain dicts for tests and logs.
+    """
+
+    def __init__(self, max_pages=1000, buckets=STAGE_BUCKETS):
+        self.buckets = buckets
+        self.counters = {}  # (name, labels) -> value
+        self.gauges = {}
+        self.histograms = {}  # (name, labels) -> [bucket counts..., count, sum]
+        self.pages = deque(maxlen=max_pages)  # (url, {stage: seconds})
+        self.lock = threading.Lock()
+
+    def increment(self, name, value=1, **labels):
+        key = (name, label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, label_key(labels))] = value
+
+    def observe(self, stage, seconds):
+        """
+        Record how long a stage took, and add it to the timings of the URL being processed in this context.
+        """
+        key = ("crawler_stage_seconds", (("stage", stage),))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-2] += 1
+            histogram[-1] += seconds
+        timings = page_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def time(self, stage):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, perf_counter() - start)
+
+    @contextmanager
+    def page(self, url):
+        """
+        Collect the stages observed while `url` is processed into one per-URL timing record.
+        """
+        timings = {}
+        token = page_timings.set(timings)
+        try:
+            yield timings
+        finally:
+            page_timings.reset(token)
+            with self.lock:
+                self.pages.append((url, timings))
+            logging.debug(f"Stage timings for {url}: {timings}")
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "stages": {dict(labels)["stage"]: {"count": histogram[-2], "sum": round(histogram[-1], 6)}
+                           for (_, labels), histogram in self.histograms.items()},
+                "pages": list(self.pages),
+            }
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+            self.pages.clear()
+
+
+class PrometheusMetrics(InMemoryMetrics):
+    """
+    InMemoryMetrics that renders in the Prometheus text exposition format, served by /metrics on the Flask app and
+    by crawl_worker.py --metrics-port.
+    """
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for kind, values in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted({name for name, _ in values}):
+                    lines.append(f"# TYPE {name} {kind}")
+                    for (metric, labels), value in values.items():
+                        if metric == name:
+                            lines.append(f"{name}{self.format_labels(labels)} {value}")
+            names = sorted({name for name, _ in self.histograms})
+            for name in names:
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), histogram in self.histograms.items():
+                    if metric != name:
+                        continue
+                    for bound, count in zip(self.buckets, histogram):
+                        lines.append(f"{name}_bucket{self.format_labels(labels + (('le', str(bound)),))} {count}")
+                    lines.append(f"{name}_bucket{self.format_labels(labels + (('le', '+Inf'),))} {histogram[-2]}")
+                    lines.append(f"{name}_count{self.format_labels(labels)} {histogram[-2]}")
+                    lines.append(f"{name}_sum{self.format_labels(labels)} {histogram[-1]}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def format_labels(labels):
+        if not labels:
+            return ""
+        values = ",".join(f'{key}="{escape_label(value)}"' for key, value in labels)
+        return "{" + values + "}"
+
+
+# 进程内默认的指标收集器，各组件未指定 metrics 时使用
+default_metrics = PrometheusMetrics()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def serve_metrics(metrics=default_metrics, port=9100, host="0.0.0.0"):
+    """
+    Serve `metrics.render()` on http://host:port/metrics from a daemon thread, for processes without the Flask app.
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+    return server
+
+
+class CrawlProfiler:
+    """
+    Optional per-crawl profiling: cProfile on every crawl thread, merged when the crawl ends, and tracemalloc
+    allocation growth. The top `top` entries are logged, `output_path` also gets the pstats dump.
+    """
+
+    def __init__(self, cpu=True, memory=False, output_path=None, top=25):
+        self.cpu = cpu
+        self.memory = memory
+        self.output_path = output_path
+        self.top = top
+        self.profiles = []
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.memory_start = None
+
+    def start(self):
+        self.profiles = []
+        self.local = threading.local()
+        if self.memory:
+            tracemalloc.start()
+            self.memory_start = tracemalloc.take_snapshot()
+
+    def thread_profile(self):
+        profile = getattr(self.local, "profile", None)
+        if profile is None:
+            profile = self.local.profile = cProfile.Profile()
+            with self.lock:
+                self.profiles.append(profile)
+        return profile
+
+    @contextmanager
+    def enabled(self):
+        if not self.cpu:
+            yield
+            return
+        profile = self.thread_profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # Python 3.12+ 同一时间只允许一个 profiler
+            logging.warning(f"cProfile not enabled on {threading.current_thread().name}: {e}")
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+
+    def profiled(self, func):
+        def wrapper(*args, **kwargs):
+            with self.enabled():
+                return func(*args, **kwargs)
+        return wrapper
+
+    def stop(self):
+        if self.cpu and self.profiles:
+            stream = io.StringIO()
+            stats = pstats.Stats(*self.profiles, stream=stream)
+            if self.output_path is not None:
+                stats.dump_stats(self.output_path)
+            stats.sort_stats("cumulative").print_stats(self.top)
+            logging.info(f"CPU profile of the crawl:\n{stream.getvalue()}")
+        if self.memory and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            top_stats = snapshot.compare_to(self.memory_start, "lineno")[:self.top]
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            logging.info(f"Memory growth of the crawl (current {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB):\n"
+                         + "\n".join(str(stat) for stat in top_stats))
@@ -0,0 +1,205 @@
+import heapq
+import itertools
+import logging
+import threading
+from concurrent.futures.thread import ThreadPoolExecutor
+from time import perf_counter
+
+from frontier import MemoryFrontier
+
+
+class CrawlScheduler:
+    """
+    Blocking work queue over a frontier, shared by a fixed set of worker threads.
+    Workers wait on a condition until work is queued, so links found by one page are handed to the next free worker
+    right away. The crawl ends once the frontier is empty and no item is in flight, or when stop() is called;
+    stopping leaves pending items in the frontier so a durable frontier can resume them. A frontier shared with other
+    nodes may still have leased URLs when it looks empty here, workers then wait for its retry_after() instead.
+    With a HostScheduler, items whose host is busy or cooling down are parked in a per-host heap by score (at most
+    `max_parked` in all) and workers take the highest-scored item of a ready host instead of waiting on one slow
+    domain. Each pick first moves the frontier's best item into the heaps, so a URL queued later with a higher score
+    still goes before parked lower-scored ones. Every URL popped from a frontier shared with other nodes is leased,
+    parked ones too, so with a leased frontier at most `workers` items are parked: the rest stay pending for other
+    nodes, and parked URLs are fetched long before their lease expires.
+    """
+
+    def __init__(self, workers=1, frontier=None, host_scheduler=None, max_parked=1000):
+        self.workers = workers
+        self.frontier = frontier if frontier is not None else MemoryFrontier()
+        self.host_scheduler = host_scheduler
+        if self.frontier.lease_timeout is not None:
+            # 暂存的 URL 也持有租约，不能把整个任务的 URL 都租到本节点
+            max_parked = min(max_parked, workers)
+        self.max_parked = max_parked
+        self.parked = {}  # host -> heap of (-score, seq, url, depth) items waiting for the host
+        self.parked_count = 0
+        self.sequence = itertools.count()  # 同分时先入先出
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.stopped = False
+        self.error = None
+
+        # 统计信息
+        self.processed = 0
+        self.idle_seconds = 0.0
+        self.busy_seconds = 0.0
+        self.elapsed_seconds = 0.0
+
+    def put(self, item):
+        with self.condition:
+            if self.stopped or not self.frontier.push(*item):
+                return False
+            self.condition.notify()
+            return True
+
+    def get_nowait(self):
+        """
+        next_item() without waiting or in-flight bookkeeping, for callers that track their own work (the asyncio
+        engine). With a HostScheduler the returned item's host slot is taken, the caller releases it when done.
+        """
+        with self.condition:
+            if self.stopped:
+                return None, None
+            return self.next_item()
+
+    def qsize(self):
+        return len(self.frontier) + self.parked_count
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+    def run(self, handler, teardown=None):
+        """
+        Call `handler(*item)` for every queued item on `workers` threads and block until the crawl is finished.
+        The first exception raised by a handler stops the crawl and is re-raised here. `teardown()` is called on
+        each worker thread before it exits, for per-thread resources such as a sync Playwright browser.
+        """
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for _ in range(self.workers):
+                executor.submit(self.work, handler, teardown)
+        self.elapsed_seconds = perf_counter() - start
+        logging.info(f"Crawl scheduler finished: {self.stats()}")
+        if self.error is not None:
+            raise self.error
+
+    def work(self, handler, teardown=None):
+        try:
+            self.work_items(handler)
+        finally:
+            if teardown is not None:
+                try:
+                    teardown()
+                except Exception as e:
+                    logging.warning(f"Error tearing down worker {threading.current_thread().name}: {e}")
+
+    def work_items(self, handler):
+        while True:
+            with self.condition:
+                idle_start = perf_counter()
+                item = None
+                while not self.stopped:
+                    item, delay = self.next_item()
+                    if item is not None:
+                        break
+                    if delay is None and self.in_flight == 0:
+                        # 共享的前沿队列中其他节点可能还持有租约，等租约过期或有新 URL 再查看
+                        delay = self.frontier.retry_after()
+                        if delay is None:
+                            # 队列为空且没有正在处理的任务，爬取结束
+                            self.stopped = True
+                            break
+                    self.condition.wait(timeout=delay)
+                self.idle_seconds += perf_counter() - idle_start
+                if item is None:
+                    self.condition.notify_all()
+                    return
+                self.in_flight += 1
+
+            host = None
+            start = perf_counter()
+            try:
+                if self.host_scheduler is not None:
+                    host = self.host_scheduler.host_of(item[0])
+                    self.host_scheduler.load_robots(item[0])
+                handler(*item)
+            except Exception as e:
+                with self.condition:
+                    if self.error is None:
+                        self.error = e
+                self.stop()
+            finally:
+                if host is not None:
+                    self.host_scheduler.release(host)
+                with self.condition:
+                    self.in_flight -= 1
+                    self.processed += 1
+                    self.busy_seconds += perf_counter() - start
+                    # 任务结束可能释放了主机的并发名额，也可能是最后一个任务
+                    self.condition.notify_all()
+
+    def next_item(self):
+        """
+        Return ((url, depth), None) for the next item that may run now, or (None, delay) where delay is the seconds
+        until a parked host may be ready, or None if nothing is pending. Called with the condition held.
+        """
+        if self.host_scheduler is None:
+            item = self.frontier.pop()
+            return (item[:2] if item is not None else None), None
+        # 先把前沿队列中分数最高的 URL 放入所属主机的堆，再在可请求的主机中选分数最高的
+        if self.parked_count < self.max_parked:
+            self.park(self.frontier.pop())
+        delay = None
+        busy = set()
+        for host in sorted(self.parked, key=lambda host: self.parked[host][0]):
+            wait = self.host_scheduler.try_acquire(host)
+            if wait == 0:
+                return self.unpark(host), None
+            busy.add(host)
+            delay = wait if delay is None else min(delay, wait)
+        # 所有主机都在忙：继续取 URL，直到找到一个可请求的主机
+        while self.parked_count < self.max_parked:
+            host = self.park(self.frontier.pop())
+            if host is None:
+                break
+            if host in busy:
+                continue
+            wait = self.host_scheduler.try_acquire(host)
+            if wait == 0:
+                return self.unpark(host), None
+            busy.add(host)
+            delay = wait if delay is None else min(delay, wait)
+        return None, delay
+
+    def park(self, item):
+        """
+        Park a (url, depth, score) frontier item under its host and return the host, None for no item.
+        """
+        if item is None:
+            return None
+        url, depth, score = item
+        host = self.host_scheduler.host_of(url)
+        heapq.heappush(self.parked.setdefault(host, []), (-score, next(self.sequence), url, depth))
+        self.parked_count += 1
+        return host
+
+    def unpark(self, host):
+        items = self.parked[host]
+        _, _, url, depth = heapq.heappop(items)
+        self.parked_count -= 1
+        if not items:
+            del self.parked[host]
+        return url, depth
+
+    def stats(self):
+        capacity = self.workers * self.elapsed_seconds
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "busy_seconds": round(self.busy_seconds, 3),
+            "idle_seconds": round(self.idle_seconds, 3),
+            "idle_ratio": round(self.idle_seconds / capacity, 3) if capacity > 0 else 0.0,
+        }
@@ -0,0 +1,101 @@
+import argparse
+import logging
+import os
+import socket
+import time
+
+from article_crawler import ArticleCrawler
+from crawl_jobs import CrawlJobQueue, DONE, FAILED
+from crawl_metrics import serve_metrics
+from factory import get_mongo_client
+from frontier import MongoFrontier
+
+
+class JobCrawler(ArticleCrawler):
+    """
+    ArticleCrawler for one job of the shared queue: URLs are leased from the job's MongoFrontier, and `max_pages`
+    counts the pages the job has crawled on all workers. A page that fails is logged and skipped, it does not fail
+    the job.
+    """
+
+    def __init__(self, job, jobs, frontier, **kwargs):
+        super().__init__(frontier=frontier, **job["params"], **kwargs)
+        self.job_id = job["_id"]
+        self.jobs = jobs
+        self.success_page_count = job.get("pages_crawled", 0)
+
+    def process_single_url(self, url, depth):
+        # 单个页面出错不应让其他节点共享的任务失败，记录后继续；未标记为已访问的 URL 在租约过期后会被重新处理
+        try:
+            super().process_single_url(url, depth)
+        except Exception as e:
+            logging.error(f"Job {self.job_id}: error crawling {url}: {e}")
+
+    def increase_sites_count(self):
+        pages = self.jobs.increment_pages(self.job_id)
+        with self.lock:
+            self.success_page_count = max(self.success_page_count, pages)
+        if pages >= self.max_pages:
+            self.scheduler.stop()
+
+
+class CrawlWorker:
+    """
+    Takes jobs from a CrawlJobQueue and crawls them until none are left, then polls for new ones. Run as many
+    workers on as many machines as needed, they share each job's frontier through URL leases; a worker stays on its
+    job until every URL is visited, waiting for other workers' leases to expire rather than leaving early.
+    """
+
+    def __init__(self, jobs, frontier_collection, worker_id=None, concurrency=4, lease_timeout=300,
+                 poll_interval=5.0):
+        self.jobs = jobs
+        self.frontier_collection = frontier_collection
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.concurrency = concurrency
+        self.lease_timeout = lease_timeout  # 必须大于单个页面的最长处理时间
+        self.poll_interval = poll_interval
+
+    def run(self):
+        logging.info(f"Crawl worker {self.worker_id} started")
+        while True:
+            job = self.jobs.next_job(self.worker_id)
+            if job is None:
+                time.sleep(self.poll_interval)
+                continue
+            self.run_job(job)
+
+    def run_job(self, job):
+        job_id = job["_id"]
+        logging.info(f"Worker {self.worker_id} crawling job {job_id}: {job['params']}")
+        frontier = MongoFrontier(self.frontier_collection, crawl_id=job_id, lease_timeout=self.lease_timeout)
+        crawler = JobCrawler(job, self.jobs, frontier, concurrency=self.concurrency)
+        try:
+            crawler.run()
+        except Exception as e:
+            logging.error(f"Job {job_id} failed on worker {self.worker_id}: {e}")
+            self.jobs.finish(job_id, FAILED, error=str(e))
+            return
+        if crawler.success_page_count >= crawler.max_pages or frontier.is_drained():
+            self.jobs.finish(job_id, DONE)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--concurrency", type=int, default=4)
+    arg_parser.add_argument("--lease-timeout", type=float, default=300)
+    arg_parser.add_argument("--poll-interval", type=float, default=5.0)
+    arg_parser.add_argument("--metrics-port", type=int, default=None, help="serve Prometheus metrics on this port")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.metrics_port is not None:
+        serve_metrics(port=args.metrics_port)
+    mongo_client = get_mongo_client()
+    jobs = CrawlJobQueue(mongo_client["ai_qa"]["crawl_jobs"])
+    worker = CrawlWorker(jobs, mongo_client["ai_qa"]["crawler_frontier"], concurrency=args.concurrency,
+                         lease_timeout=args.lease_timeout, poll_interval=args.poll_interval)
+    worker.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,15 @@
 import logging
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 
-from article_crawler import ArticleCrawler
+from crawl_jobs import CrawlJobQueue
+from crawl_metrics import default_metrics, PROMETHEUS_CONTENT_TYPE
+from factory import get_mongo_client
+from frontier import mongo_frontier_counts
 
 app = Flask(__name__)
+jobs = CrawlJobQueue(get_mongo_client()["ai_qa"]["crawl_jobs"])
+frontier_collection = get_mongo_client()["ai_qa"]["crawler_frontier"]
 
 
 @app.route('/')
@@ -21,18 +26,45 @@ def crawl():
 
     url = data['url']
     max_sites = data.get('max_sites', 50)
-    max_links_per_page = data.get('max_links_per_page', 10)
     timeout = data.get('timeout', 60)
     crawler_only_internal = data.get('crawler_only_internal', True)
 
-    logging.info(f'Processing {url} with max_sites={max_sites}, max_links_per_page={max_links_per_page}, '
-                     f'timeout={timeout}, crawler_only_internal={crawler_only_internal}')
+    logging.info(f'Queueing {url} with max_sites={max_sites}, timeout={timeout}, '
+                 f'crawler_only_internal={crawler_only_internal}')
 
-    crawler = ArticleCrawler(start_url=url, max_pages=max_sites, max_links_per_page=max_links_per_page,
-                             request_timeout=timeout, crypto_only_same_domain=crawler_only_internal)
-    crawler.run()
+    # 爬取由 crawl_worker 进程执行，请求立即返回任务 ID
+    job_id = jobs.submit({"start_url": url, "max_pages": max_sites, "request_timeout": timeout,
+                          "crypto_only_same_domain": crawler_only_internal})
 
-    return jsonify({'message': 'Crawling initiated successfully'}), 200
+    return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+
+
+@app.route('/crawl/<job_id>', methods=['GET'])
+def crawl_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    return jsonify({
+        'job_id': job['_id'],
+        'status': job['status'],
+        'params': job['params'],
+        'pages_crawled': job['pages_crawled'],
+        'urls': mongo_frontier_counts(frontier_collection, job_id),
+        'workers': job.get('workers', []),
+        'error': job.get('error'),
+        'created_at': job['created_at'],
+        'started_at': job.get('started_at'),
+        'finished_at': job.get('finished_at'),
+    }), 200
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # 爬取在 crawl_worker 进程中进行，这里只有任务数量；各 worker 用 --metrics-port 暴露自己的指标
+    for status, count in jobs.status_counts().items():
+        default_metrics.set_gauge("crawler_jobs", count, status=status)
+    return Response(default_metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
 
 
 if __name__ == '__main__':
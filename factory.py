@@ -1,8 +1,37 @@
-import pymongo
-from openai import OpenAI
+import threading
 
 from config import project_config
 
-mongo_client = pymongo.MongoClient(project_config.mongodb_url)
+_lock = threading.Lock()
+_clients = {}
 
-openai_client = OpenAI(api_key=project_config.openai_api_key)
\ No newline at end of file
+
+def get_mongo_client():
+    """
+    The shared MongoClient, created on first use so that importing a module does not open connections.
+    """
+    with _lock:
+        if "mongo" not in _clients:
+            import pymongo
+            _clients["mongo"] = pymongo.MongoClient(project_config.mongodb_url)
+        return _clients["mongo"]
+
+
+def get_openai_client():
+    """
+    The shared OpenAI client, created on first use; the openai package is only imported then.
+    """
+    with _lock:
+        if "openai" not in _clients:
+            from openai import OpenAI
+            _clients["openai"] = OpenAI(api_key=project_config.openai_api_key, base_url=project_config.openai_base_url)
+        return _clients["openai"]
+
+
+def __getattr__(name):
+    # 兼容 from factory import mongo_client 的旧写法，此时才创建客户端
+    if name == "mongo_client":
+        return get_mongo_client()
+    if name == "openai_client":
+        return get_openai_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
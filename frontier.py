@@ -0,0 +1,338 @@
+import bisect
+import itertools
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from time import monotonic
+
+from seen_urls import HashedSeenSet
+
+# pymongo.ASCENDING / DESCENDING，内存和 SQLite 队列不需要导入 pymongo
+ASCENDING = 1
+DESCENDING = -1
+
+PENDING = 0
+IN_PROGRESS = 1
+VISITED = 2
+
+
+class MemoryFrontier:
+    """
+    In-memory FIFO of pending (url, depth) items, lost when the process exits; the score is ignored and popped
+    items score 0. URLs are marked seen when they are pushed, `seen` can be a BloomSeenSet for multi-million URL
+    crawls. Every frontier's pop() returns (url, depth, score), or None when nothing is pending.
+    """
+    bounded = False
+    lease_timeout = None  # 弹出的 URL 不被租用，只有共享的 MongoFrontier 设置
+
+    def __init__(self, seen=None):
+        self.pending = deque()
+        self.seen = seen if seen is not None else HashedSeenSet()
+        self.visited = HashedSeenSet()
+        self.lock = threading.Lock()
+
+    def push(self, url, depth, score=0.0):
+        """
+        Queue the URL unless it was pushed before, return True if it was queued.
+        """
+        # 入队时原子地标记为已见，已排队但未访问的 URL 不会重复入队
+        if not self.seen.add(url):
+            return False
+        with self.lock:
+            self.pending.append((url, depth))
+        return True
+
+    def pop(self):
+        with self.lock:
+            if not self.pending:
+                return None
+            url, depth = self.pending.popleft()
+            return url, depth, 0.0
+
+    def mark_visited(self, url):
+        self.visited.add(url)
+
+    def is_visited(self, url):
+        return url in self.visited
+
+    def visited_count(self):
+        return len(self.visited)
+
+    def retry_after(self):
+        """
+        Seconds to wait before popping again when pop() found nothing but the crawl may not be over, None when it is.
+        """
+        return None
+
+    def __len__(self):
+        return len(self.pending)
+
+    def close(self):
+        pass
+
+
+class PriorityFrontier(MemoryFrontier):
+    """
+    In-memory frontier that pops the highest-scored URL first, FIFO among equal scores. With `max_size`, a push into
+    a full frontier evicts the lowest-scored item if the new URL scores higher, and is dropped otherwise; evicted
+    URLs stay seen.
+    """
+
+    def __init__(self, seen=None, max_size=None):
+        super().__init__(seen)
+        self.bounded = max_size is not None
+        self.max_size = max_size
+        self.pending = []  # (score, -seq, url, depth) sorted ascending, the best item is last
+        self.counter = itertools.count()
+
+    def push(self, url, depth, score=0.0):
+        with self.lock:
+            if self.max_size is not None and len(self.pending) >= self.max_size and score <= self.pending[0][0]:
+                return False
+        if not self.seen.add(url):
+            return False
+        with self.lock:
+            bisect.insort(self.pending, (score, -next(self.counter), url, depth))
+            if self.max_size is not None and len(self.pending) > self.max_size:
+                self.pending.pop(0)
+        return True
+
+    def pop(self):
+        with self.lock:
+            if not self.pending:
+                return None
+            score, _, url, depth = self.pending.pop()
+            return url, depth, score
+
+
+class SQLiteFrontier:
+    """
+    Durable frontier in a SQLite file. Pending URLs with their depth and the visited state survive a crash, creating
+    the frontier again with the same `crawl_id` resumes the crawl; URLs that were in progress are queued again.
+    The highest-scored pending URL is popped first. Only two counters are kept in memory.
+    """
+    bounded = False
+    lease_timeout = None
+
+    def __init__(self, path, crawl_id):
+        self.crawl_id = crawl_id
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                crawl_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                score REAL NOT NULL DEFAULT 0,
+                state INTEGER NOT NULL,
+                UNIQUE (crawl_id, url)
+            )""")
+        self.migrate()
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS frontier_state ON frontier (crawl_id, state, score DESC, seq)")
+        # 恢复爬取：上次未完成的 URL 重新排队
+        self.connection.execute("UPDATE frontier SET state = ? WHERE crawl_id = ? AND state = ?",
+                                (PENDING, crawl_id, IN_PROGRESS))
+        self.pending_count = self.count(PENDING)
+        self.visited_total = self.count(VISITED)
+
+    def migrate(self):
+        # 旧版本创建的表没有 score 列，其 frontier_state 索引也不含 score
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(frontier)")}
+        if "score" in columns:
+            return
+        with self.connection:
+            self.connection.execute("BEGIN")
+            self.connection.execute("ALTER TABLE frontier ADD COLUMN score REAL NOT NULL DEFAULT 0")
+            self.connection.execute("DROP INDEX IF EXISTS frontier_state")
+
+    def count(self, state):
+        row = self.connection.execute("SELECT COUNT(*) FROM frontier WHERE crawl_id = ? AND state = ?",
+                                      (self.crawl_id, state)).fetchone()
+        return row[0]
+
+    def push(self, url, depth, score=0.0):
+        with self.lock:
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO frontier (crawl_id, url, depth, score, state) VALUES (?, ?, ?, ?, ?)",
+                (self.crawl_id, url, depth, score, PENDING))
+            self.pending_count += cursor.rowcount
+            return cursor.rowcount > 0
+
+    def pop(self):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT seq, url, depth, score FROM frontier WHERE crawl_id = ? AND state = ? "
+                "ORDER BY score DESC, seq LIMIT 1",
+                (self.crawl_id, PENDING)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE frontier SET state = ? WHERE seq = ?", (IN_PROGRESS, row[0]))
+            self.pending_count -= 1
+            return row[1], row[2], row[3]
+
+    def mark_visited(self, url):
+        with self.lock:
+            cursor = self.connection.execute(
+                "INSERT INTO frontier (crawl_id, url, depth, state) VALUES (?, ?, 0, ?) "
+                "ON CONFLICT (crawl_id, url) DO UPDATE SET state = excluded.state WHERE state != excluded.state",
+                (self.crawl_id, url, VISITED))
+            self.visited_total += cursor.rowcount
+
+    def is_visited(self, url):
+        with self.lock:
+            row = self.connection.execute("SELECT state FROM frontier WHERE crawl_id = ? AND url = ?",
+                                          (self.crawl_id, url)).fetchone()
+        return row is not None and row[0] == VISITED
+
+    def visited_count(self):
+        return self.visited_total
+
+    def retry_after(self):
+        return None
+
+    def __len__(self):
+        return self.pending_count
+
+    def close(self):
+        self.connection.close()
+
+
+class MongoFrontier:
+    """
+    Durable frontier in a MongoDB collection, one document per (crawl_id, url). Creating the frontier again with the
+    same `crawl_id` resumes the crawl; URLs that were in progress are queued again. The highest-scored pending URL
+    is popped first. Only two counters are kept in memory.
+    With `lease_timeout` (seconds) the frontier can be shared by crawl workers on several nodes: a popped URL is
+    leased until it is marked visited, and a lease older than `lease_timeout` is handed out again, so a crashed
+    worker's URLs are not lost. The pending count then comes from the collection, cached for `count_ttl` seconds, and
+    when nothing is pending here but other nodes still hold leases, retry_after() says when to look again.
+    """
+    bounded = False
+
+    def __init__(self, collection, crawl_id, lease_timeout=None, count_ttl=1.0, max_retry_after=5.0):
+        self.collection = collection
+        self.crawl_id = crawl_id
+        self.lease_timeout = lease_timeout
+        self.count_ttl = count_ttl
+        self.max_retry_after = max_retry_after  # 其他节点随时可能加入新 URL，最多等待这么久再查看
+        self.counted_at = None  # monotonic() of the cached pending count in shared mode
+        self.lock = threading.Lock()
+        self.collection.create_index([("crawl_id", ASCENDING), ("url", ASCENDING)], unique=True)
+        self.collection.create_index([("crawl_id", ASCENDING), ("state", ASCENDING), ("score", DESCENDING),
+                                      ("_id", ASCENDING)])
+        if lease_timeout is None:
+            # 恢复爬取：上次未完成的 URL 重新排队；共享模式下由租约过期来回收
+            self.collection.update_many({"crawl_id": crawl_id, "state": IN_PROGRESS}, {"$set": {"state": PENDING}})
+        self.pending_count = self.collection.count_documents({"crawl_id": crawl_id, "state": PENDING})
+        self.visited_total = self.collection.count_documents({"crawl_id": crawl_id, "state": VISITED})
+
+    def push(self, url, depth, score=0.0):
+        from pymongo.errors import DuplicateKeyError
+        try:
+            result = self.collection.update_one(
+                {"crawl_id": self.crawl_id, "url": url},
+                {"$setOnInsert": {"depth": depth, "score": score, "state": PENDING, "created_at": datetime.utcnow()}},
+                upsert=True)
+        except DuplicateKeyError:
+            return False
+        if result.upserted_id is None:
+            return False
+        with self.lock:
+            self.pending_count += 1
+        return True
+
+    def pop(self):
+        now = datetime.utcnow()
+        update = {"state": IN_PROGRESS, "updated_at": now}
+        if self.lease_timeout is not None:
+            update["lease_until"] = now + timedelta(seconds=self.lease_timeout)
+        doc = self.collection.find_one_and_update(
+            self.pending_query(now),
+            {"$set": update},
+            sort=[("score", DESCENDING), ("_id", ASCENDING)],
+            return_document=True)  # ReturnDocument.AFTER
+        if doc is None:
+            return None
+        with self.lock:
+            self.pending_count -= 1
+        return doc["url"], doc["depth"], doc.get("score", 0.0)
+
+    def mark_visited(self, url):
+        from pymongo.errors import DuplicateKeyError
+        try:
+            result = self.collection.update_one(
+                {"crawl_id": self.crawl_id, "url": url, "state": {"$ne": VISITED}},
+                {"$set": {"state": VISITED, "updated_at": datetime.utcnow()}, "$setOnInsert": {"depth": 0}},
+                upsert=True)
+        except DuplicateKeyError:
+            # 已经是 visited 状态
+            return
+        if result.modified_count or result.upserted_id is not None:
+            with self.lock:
+                self.visited_total += 1
+
+    def is_visited(self, url):
+        return self.collection.count_documents({"crawl_id": self.crawl_id, "url": url, "state": VISITED},
+                                               limit=1) > 0
+
+    def visited_count(self):
+        return self.visited_total
+
+    def pending_query(self, now):
+        # 共享模式下租约已过期的 URL 也算待处理
+        if self.lease_timeout is None:
+            return {"crawl_id": self.crawl_id, "state": PENDING}
+        return {"crawl_id": self.crawl_id, "$or": [{"state": PENDING},
+                                                   {"state": IN_PROGRESS, "lease_until": {"$lt": now}}]}
+
+    def retry_after(self):
+        if self.lease_timeout is None:
+            return None
+        now = datetime.utcnow()
+        if self.collection.count_documents(self.pending_query(now), limit=1) > 0:
+            return 0.0
+        leased = self.collection.find_one({"crawl_id": self.crawl_id, "state": IN_PROGRESS},
+                                          projection={"lease_until": 1}, sort=[("lease_until", ASCENDING)])
+        if leased is None:
+            return None
+        # 等到最早的租约过期，或者其他节点加入新 URL
+        return min(self.max_retry_after, max(0.1, (leased["lease_until"] - now).total_seconds()))
+
+    def is_drained(self):
+        """
+        True when no URL of the crawl is pending or in progress on any node.
+        """
+        return self.collection.count_documents(
+            {"crawl_id": self.crawl_id, "state": {"$in": [PENDING, IN_PROGRESS]}}, limit=1) == 0
+
+    def __len__(self):
+        if self.lease_timeout is None:
+            return self.pending_count
+        # 其他节点也在入队和出队，本节点的计数没有意义，定期从集合中读取
+        with self.lock:
+            if self.counted_at is not None and monotonic() - self.counted_at < self.count_ttl:
+                return self.pending_count
+        count = self.collection.count_documents(self.pending_query(datetime.utcnow()))
+        with self.lock:
+            self.pending_count = count
+            self.counted_at = monotonic()
+        return count
+
+    def close(self):
+        pass
+
+
+def mongo_frontier_counts(collection, crawl_id):
+    """
+    Number of pending, in progress and visited URLs of a crawl in a MongoFrontier collection.
+    """
+    names = {PENDING: "pending", IN_PROGRESS: "in_progress", VISITED: "visited"}
+    counts = {name: 0 for name in names.values()}
+    for row in collection.aggregate([{"$match": {"crawl_id": crawl_id}},
+                                     {"$group": {"_id": "$state", "count": {"$sum": 1}}}]):
+        counts[names[row["_id"]]] = row["count"]
+    return counts
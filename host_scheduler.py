@@ -0,0 +1,147 @@
+import logging
+import threading
+from time import monotonic
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+THROTTLE_STATUS_CODES = {429, 503}
+
+
+class HostState:
+    def __init__(self, tokens):
+        self.active = 0  # 正在处理的请求数
+        self.tokens = tokens  # 令牌桶中剩余的令牌
+        self.refilled_at = monotonic()
+        self.crawl_delay = None  # robots.txt 中的 Crawl-delay（秒）
+        self.backoff = 0.0  # 当前退避时间（秒）
+        self.backoff_until = 0.0
+        self.robots_loaded = False
+        self.robots_lock = threading.Lock()
+
+
+class HostScheduler:
+    """
+    Per-host politeness: a concurrency limit and a token bucket per host, the robots.txt Crawl-delay / Request-rate
+    (robots.txt fetched once per host), and exponential backoff on 429/5xx/timeouts that decays again on success.
+    try_acquire() never blocks, so the crawl scheduler can move on to another host while one is cooling down.
+    Until a host's robots.txt is loaded it gets a single slot and no burst, the caller loads robots.txt with that
+    slot before its first request; with a Crawl-delay the host never bursts.
+    """
+
+    def __init__(self, max_per_host=4, requests_per_second=4.0, burst=4, max_backoff=300.0, respect_robots=True,
+                 user_agent='*', session=None, robots_timeout=10):
+        self.max_per_host = max_per_host
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_backoff = max_backoff
+        self.respect_robots = respect_robots
+        self.user_agent = user_agent
+        self.session = session  # 第一次读取 robots.txt 时创建
+        self.robots_timeout = robots_timeout
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url):
+        return urlparse(url).netloc
+
+    def state(self, host):
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = HostState(self.capacity(None))
+        return state
+
+    def capacity(self, state):
+        """
+        The most tokens the host's bucket holds: 1 while its robots.txt is not loaded yet or it has a Crawl-delay.
+        """
+        if self.respect_robots and (state is None or not state.robots_loaded):
+            return 1
+        if state is not None and state.crawl_delay:
+            return 1
+        return self.burst
+
+    def rate(self, state):
+        rate = self.requests_per_second
+        if state.crawl_delay:
+            rate = min(rate, 1 / state.crawl_delay)
+        return rate
+
+    def try_acquire(self, host):
+        """
+        Take a request slot for `host`. Return 0 if it was taken, otherwise the seconds until the host may be ready.
+        """
+        with self.lock:
+            state = self.state(host)
+            now = monotonic()
+            if now < state.backoff_until:
+                return state.backoff_until - now
+            rate = self.rate(state)
+            state.tokens = min(self.capacity(state), state.tokens + (now - state.refilled_at) * rate)
+            state.refilled_at = now
+            if state.tokens < 1:
+                return (1 - state.tokens) / rate
+            # robots.txt 加载完成前只允许一个请求，由它先加载 robots.txt
+            max_active = self.max_per_host if not self.respect_robots or state.robots_loaded else 1
+            if state.active >= max_active:
+                # 等待其他请求完成，release 时会唤醒调度器
+                return 1 / rate
+            state.tokens -= 1
+            state.active += 1
+            return 0.0
+
+    def release(self, host):
+        with self.lock:
+            state = self.state(host)
+            state.active = max(0, state.active - 1)
+
+    def report(self, url, status=None, timed_out=False):
+        """
+        Feed a response back: 429/5xx and timeouts double the host's backoff, anything else halves it.
+        """
+        throttled = timed_out or (status is not None and (status in THROTTLE_STATUS_CODES or status >= 500))
+        with self.lock:
+            state = self.state(self.host_of(url))
+            if throttled:
+                state.backoff = min(self.max_backoff, max(1.0, state.backoff * 2))
+                state.backoff_until = monotonic() + state.backoff
+                logging.info(f"Backing off {self.host_of(url)} for {state.backoff:.1f}s after "
+                             f"{'timeout' if timed_out else status}")
+            elif state.backoff > 0:
+                state.backoff = state.backoff / 2 if state.backoff > 1 else 0.0
+
+    def load_robots(self, url):
+        """
+        Fetch and cache robots.txt for the URL's host once, and apply its Crawl-delay / Request-rate.
+        """
+        if not self.respect_robots:
+            return
+        host = self.host_of(url)
+        with self.lock:
+            state = self.state(host)
+        if state.robots_loaded:
+            return
+        import requests  # 延迟导入，不读取 robots.txt 的爬取不需要
+        with state.robots_lock:
+            if state.robots_loaded:
+                return
+            with self.lock:
+                if self.session is None:
+                    self.session = requests.Session()
+            crawl_delay = None
+            parts = urlparse(url)
+            try:
+                response = self.session.get(f"{parts.scheme}://{host}/robots.txt", timeout=self.robots_timeout)
+                if response.status_code == 200:
+                    parser = RobotFileParser()
+                    parser.parse(response.text.splitlines())
+                    crawl_delay = parser.crawl_delay(self.user_agent)
+                    request_rate = parser.request_rate(self.user_agent)
+                    if request_rate is not None and request_rate.requests > 0:
+                        crawl_delay = max(crawl_delay or 0, request_rate.seconds / request_rate.requests)
+            except (requests.RequestException, ValueError) as e:
+                logging.info(f"Could not load robots.txt for {host}: {e}")
+            with self.lock:
+                state.crawl_delay = float(crawl_delay) if crawl_delay else None
+                state.robots_loaded = True
+                state.tokens = min(state.tokens, self.capacity(state))
@@ -0,0 +1,96 @@
+import logging
+import threading
+from queue import Queue, Empty
+from time import monotonic, perf_counter
+
+from crawl_metrics import default_metrics
+
+
+class BulkWriter:
+    """
+    Buffers upserts for one collection and writes them with `bulk_write` from a background thread, whenever
+    `batch_size` operations are buffered or `flush_interval` seconds have passed. close() flushes what is left.
+    Works with any pymongo-compatible collection, e.g. a mongomock collection in tests.
+    """
+
+    def __init__(self, collection, batch_size=100, flush_interval=1.0, max_queue_size=10000, metrics=None):
+        self.collection = collection
+        self.metrics = metrics or default_metrics
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = Queue(maxsize=max_queue_size)  # put 在队列满时阻塞，限制内存占用
+        self.closed = False
+
+        self.lock = threading.Lock()
+        self.flushes = 0
+        self.written_ops = 0
+        self.failed_ops = 0
+        self.flush_seconds = 0.0
+        self.last_flush_seconds = 0.0
+
+        self.thread = threading.Thread(target=self.run, name=f"BulkWriter-{collection.name}", daemon=True)
+        self.thread.start()
+
+    def update_one(self, filter, update, upsert=True):
+        if self.closed:
+            raise RuntimeError(f"BulkWriter for {self.collection.name} is closed")
+        from pymongo import UpdateOne  # 延迟导入，不写 MongoDB 的爬取不加载 pymongo
+        self.queue.put(UpdateOne(filter, update, upsert=upsert))
+
+    def run(self):
+        ops = []
+        deadline = monotonic() + self.flush_interval
+        while True:
+            try:
+                op = self.queue.get(timeout=max(deadline - monotonic(), 0))
+            except Empty:
+                op = False
+            if op is None:
+                self.flush(ops)
+                return
+            if op:
+                ops.append(op)
+            if len(ops) >= self.batch_size or monotonic() >= deadline:
+                self.flush(ops)
+                ops = []
+                deadline = monotonic() + self.flush_interval
+
+    def flush(self, ops):
+        if not ops:
+            return
+        from pymongo.errors import PyMongoError
+        start = perf_counter()
+        failed = 0
+        try:
+            self.collection.bulk_write(ops, ordered=False)
+        except PyMongoError as e:
+            details = getattr(e, 'details', None) or {}
+            failed = len(details.get('writeErrors', [])) or len(ops)
+            logging.error(f"bulk_write to {self.collection.name} failed for {failed} of {len(ops)} ops: {e}")
+        seconds = perf_counter() - start
+        self.metrics.observe(f"mongo_write_{self.collection.name}", seconds)
+        with self.lock:
+            self.flushes += 1
+            self.written_ops += len(ops) - failed
+            self.failed_ops += failed
+            self.flush_seconds += seconds
+            self.last_flush_seconds = seconds
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.thread.join()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "collection": self.collection.name,
+                "queue_depth": self.queue.qsize(),
+                "flushes": self.flushes,
+                "written_ops": self.written_ops,
+                "failed_ops": self.failed_ops,
+                "avg_flush_seconds": round(self.flush_seconds / self.flushes, 4) if self.flushes else 0.0,
+                "last_flush_seconds": round(self.last_flush_seconds, 4),
+            }
@@ -0,0 +1,69 @@
+import hashlib
+import re
+from datetime import datetime, timedelta
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# crawler_raw_data 中与增量爬取相关的字段
+RECRAWL_FIELDS = {"_id": 0, "etag": 1, "last_modified": 1, "content_hash": 1, "change_count": 1, "created_at": 1,
+                  "next_crawl_at": 1}
+
+
+def content_hash(text):
+    """
+    Hash of a page's visible text with whitespace collapsed, so re-serialised but identical pages compare equal.
+    """
+    normalized = WHITESPACE_PATTERN.sub(' ', text).strip()
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class RecrawlPolicy:
+    """
+    Decides when a URL is crawled again. The ETag/Last-Modified validators, a hash of the page text and the time of
+    the next crawl are stored on the URL's crawler_raw_data document. The recrawl interval is the expected time
+    between changes, estimated from the changes seen since the URL was first crawled and clamped to
+    [min_interval, max_interval].
+    """
+
+    def __init__(self, min_interval=timedelta(hours=1), max_interval=timedelta(days=30)):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+    @staticmethod
+    def validators(record):
+        """
+        The stored validators of a URL as a dict for TieredFetcher.fetch, which updates it from the response.
+        """
+        if record is None:
+            return {}
+        return {key: record[key] for key in ("etag", "last_modified") if record.get(key)}
+
+    @staticmethod
+    def is_due(record, now=None):
+        if record is None or record.get("next_crawl_at") is None:
+            return True
+        return record["next_crawl_at"] <= (now or datetime.utcnow())
+
+    @staticmethod
+    def is_changed(record, page_hash):
+        return record is None or record.get("content_hash") != page_hash
+
+    def next_state(self, record, changed, now=None):
+        """
+        Return the recrawl fields to $set after a URL was checked.
+        """
+        now = now or datetime.utcnow()
+        # 第一次记录哈希不算作一次变化
+        seen_before = record is not None and record.get("content_hash") is not None
+        change_count = (record or {}).get("change_count", 0) + (1 if changed and seen_before else 0)
+        first_crawled_at = (record or {}).get("created_at") or now
+
+        # 变化率 = (变化次数 + 1) / 观察时长，下次爬取间隔为预期的变化间隔
+        observed = (now - first_crawled_at).total_seconds() + self.min_interval.total_seconds()
+        interval = timedelta(seconds=observed / (change_count + 1))
+        interval = min(max(interval, self.min_interval), self.max_interval)
+
+        state = {"checked_at": now, "change_count": change_count, "next_crawl_at": now + interval}
+        if changed:
+            state["changed_at"] = now
+        return state
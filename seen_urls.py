@@ -0,0 +1,134 @@
+import hashlib
+import math
+import threading
+from array import array
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+
+def canonicalize_url(url):
+    """
+    scrub_url/clean_url plus a lower-cased scheme and host, no default port and no fragment.
+    """
+    from courlan import scrub_url, clean_url  # 导入较慢，第一次使用时才加载
+    url = clean_url(scrub_url(url)) or url
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if netloc.endswith(f":{DEFAULT_PORTS.get(scheme)}"):
+        netloc = netloc.rsplit(":", 1)[0]
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+def url_digest(url, digest_size=8):
+    return hashlib.blake2b(canonicalize_url(url).encode("utf-8"), digest_size=digest_size).digest()
+
+
+class HashedSeenSet:
+    """
+    Exact seen-set that stores a 64-bit hash of each canonical URL instead of the URL string, in an open-addressing
+    table of unsigned 64-bit slots (about 12-23 bytes per URL). Lookups take no lock: the table and its mask are
+    swapped together as one tuple when the table grows.
+    """
+
+    def __init__(self, initial_capacity=1024):
+        self.capacity = 1 << max(4, (initial_capacity - 1).bit_length())
+        self.table = array("Q", bytes(8 * self.capacity))
+        self.slots = (self.table, self.capacity - 1)  # 供无锁查询读取的 (table, mask) 快照
+        self.count = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(url):
+        # 0 表示空槽位
+        return int.from_bytes(url_digest(url), "big") or 1
+
+    def add(self, url):
+        """
+        Mark `url` as seen, return True if it was not seen before. Check and insert are atomic.
+        """
+        key = self.key(url)
+        with self.lock:
+            if not self.insert(self.table, self.capacity - 1, key):
+                return False
+            self.count += 1
+            if self.count * 10 > self.capacity * 7:
+                self.grow()
+            return True
+
+    @staticmethod
+    def insert(table, mask, key):
+        index = key & mask
+        while table[index]:
+            if table[index] == key:
+                return False
+            index = (index + 1) & mask
+        table[index] = key
+        return True
+
+    def grow(self):
+        capacity = self.capacity * 2
+        table = array("Q", bytes(8 * capacity))
+        for key in self.table:
+            if key:
+                self.insert(table, capacity - 1, key)
+        self.table = table
+        self.capacity = capacity
+        self.slots = (table, capacity - 1)
+
+    def __contains__(self, url):
+        key = self.key(url)
+        table, mask = self.slots
+        index = key & mask
+        while table[index]:
+            if table[index] == key:
+                return True
+            index = (index + 1) & mask
+        return False
+
+    def __len__(self):
+        return self.count
+
+
+class BloomSeenSet:
+    """
+    Bloom filter seen-set for multi-million URL crawls: fixed memory sized from `capacity` and `error_rate`.
+    A false positive makes a new URL look seen, so roughly `error_rate` of new URLs are skipped.
+    """
+
+    def __init__(self, capacity=10_000_000, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def positions(self, url):
+        # 双重哈希：由一个 128 位摘要派生 k 个位置
+        digest = url_digest(url, digest_size=16)
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, url):
+        """
+        Mark `url` as seen, return True if it was not seen before. Check and insert are atomic.
+        """
+        positions = self.positions(url)
+        with self.lock:
+            new = False
+            for position in positions:
+                byte, bit = divmod(position, 8)
+                if not self.bits[byte] & (1 << bit):
+                    self.bits[byte] |= 1 << bit
+                    new = True
+            if new:
+                self.count += 1
+            return new
+
+    def __contains__(self, url):
+        return all(self.bits[position // 8] & (1 << (position % 8)) for position in self.positions(url))
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,208 @@
+import json
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime
+from queue import Queue, Full
+
+from crawl_metrics import default_metrics
+from factory import get_mongo_client
+from mongo_writer import BulkWriter
+
+# 原始页面，include_raw 时由 ArticleCrawler.iter_items 产出
+RawPage = namedtuple("RawPage", ["url", "content"])
+
+
+class MongoSink:
+    """
+    Upserts raw HTML into crawler_raw_data (with the incremental recrawl fields) and parsed items into
+    crawler_extract_data, through background BulkWriters while a crawl runs and directly otherwise.
+    """
+
+    def __init__(self, raw_collection=None, item_collection=None, metrics=None):
+        if raw_collection is None or item_collection is None:
+            mongo_client = get_mongo_client()
+            raw_collection = raw_collection if raw_collection is not None else mongo_client["ai_qa"]["crawler_raw_data"]
+            item_collection = item_collection if item_collection is not None else mongo_client["ai_qa"]["crawler_extract_data"]
+        self.raw_collection = raw_collection
+        self.item_collection = item_collection
+        self.metrics = metrics or default_metrics
+        self.writers = {}
+
+    def open(self):
+        self.writers = {
+            "raw": BulkWriter(self.raw_collection, metrics=self.metrics),
+            "item": BulkWriter(self.item_collection, metrics=self.metrics),
+        }
+
+    def write_raw(self, url, content, recrawl_state=None):
+        """
+        A None `content` only updates the recrawl fields.
+        """
+        now = datetime.utcnow()
+        query = {"url": url}
+        fields = {"url": url, **(recrawl_state or {})}
+        if content is not None:
+            fields.update({"content": content, "updated_at": now})
+        update = {"$set": fields, "$setOnInsert": {"created_at": now}}
+        writer = self.writers.get("raw")
+        if writer is not None:
+            writer.update_one(filter=query, update=update)
+            return
+        with self.metrics.time(f"mongo_write_{self.raw_collection.name}"):
+            self.raw_collection.update_one(filter=query, update=update, upsert=True)
+
+    def write_item(self, doc):
+        """
+        Upsert a cleaned item by website_url. `created_at` is only written on insert, so no read is needed to keep
+        it, and `related` URLs are added to the stored ones.
+        """
+        data = doc.doc_to_dict()
+        query = {"website_url": doc.website_url}
+        # related 只追加，保留近似重复检测链接过来的 URL
+        update = {"$set": data, "$setOnInsert": {"created_at": data.pop("created_at")},
+                  "$addToSet": {"related": {"$each": data.pop("related") or []}}}
+        writer = self.writers.get("item")
+        try:
+            if writer is not None:
+                writer.update_one(filter=query, update=update)
+                return True
+            with self.metrics.time(f"mongo_write_{self.item_collection.name}"):
+                self.item_collection.update_one(filter=query, update=update, upsert=True)
+            logging.info(f'update_one success: {doc.website_url} {doc.headline} {doc.published_at}')
+            return True
+        except Exception as e:
+            logging.error(f'{doc.website_url} update_one error: {e}')
+            return False
+
+    def link_related(self, url, related_url):
+        """
+        Add `related_url`, a near duplicate that is not stored, to the `related` URLs of the item at `url`. The
+        original is only fingerprinted once written, so the update does not upsert an item with nothing but
+        `related`; with a BulkWriter it is queued on the same writer after the original's write.
+        """
+        query = {"website_url": url}
+        update = {"$addToSet": {"related": related_url}}
+        writer = self.writers.get("item")
+        if writer is not None:
+            writer.update_one(filter=query, update=update, upsert=False)
+            return
+        with self.metrics.time(f"mongo_write_{self.item_collection.name}"):
+            self.item_collection.update_one(filter=query, update=update, upsert=False)
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+            logging.info(f"Mongo writer: {writer.stats()}")
+        self.writers = {}
+
+
+class JsonlSink:
+    """
+    Appends each item as one JSON line to `path`, and raw pages to `raw_path` if it is given.
+    """
+
+    def __init__(self, path, raw_path=None):
+        self.path = path
+        self.raw_path = raw_path
+        self.files = {}
+        self.lock = threading.Lock()
+
+    def open(self):
+        self.files["item"] = open(self.path, "a", encoding="utf-8")
+        if self.raw_path is not None:
+            self.files["raw"] = open(self.raw_path, "a", encoding="utf-8")
+
+    def write_raw(self, url, content, recrawl_state=None):
+        if content is not None and "raw" in self.files:
+            self.write_line("raw", {"url": url, "content": content})
+
+    def write_item(self, doc):
+        self.write_line("item", doc.doc_to_dict())
+        return True
+
+    def link_related(self, url, related_url):
+        pass
+
+    def write_line(self, name, data):
+        line = json.dumps(data, ensure_ascii=False, default=str)
+        with self.lock:
+            self.files[name].write(line + "\n")
+
+    def close(self):
+        with self.lock:
+            for file in self.files.values():
+                file.close()
+            self.files = {}
+
+
+class CallbackSink:
+    """
+    Calls `on_item(doc)` for each item and `on_raw(url, content)` for each raw page, on the crawl and parse threads.
+    """
+
+    def __init__(self, on_item, on_raw=None):
+        self.on_item = on_item
+        self.on_raw = on_raw
+
+    def open(self):
+        pass
+
+    def write_raw(self, url, content, recrawl_state=None):
+        if content is not None and self.on_raw is not None:
+            self.on_raw(url, content)
+
+    def write_item(self, doc):
+        try:
+            self.on_item(doc)
+            return True
+        except Exception as e:
+            logging.error(f"Item callback failed for '{doc.website_url}': {e}")
+            return False
+
+    def link_related(self, url, related_url):
+        pass
+
+    def close(self):
+        pass
+
+
+class QueueSink:
+    """
+    Bounded queue behind ArticleCrawler.iter_items: writers block while the queue is full, so a slow consumer slows
+    the crawl down instead of buffering without limit. After cancel() further results are dropped.
+    """
+    END = object()
+
+    def __init__(self, max_size=100, include_raw=False):
+        self.queue = Queue(maxsize=max_size)
+        self.include_raw = include_raw
+        self.cancelled = False
+
+    def open(self):
+        pass
+
+    def write_raw(self, url, content, recrawl_state=None):
+        if content is not None and self.include_raw:
+            self.put(RawPage(url, content))
+
+    def write_item(self, doc):
+        self.put(doc)
+        return True
+
+    def link_related(self, url, related_url):
+        pass
+
+    def put(self, result):
+        while not self.cancelled:
+            try:
+                self.queue.put(result, timeout=0.5)
+                return
+            except Full:
+                continue
+
+    def cancel(self):
+        self.cancelled = True
+
+    def close(self):
+        pass
@@ -0,0 +1,158 @@
+import functools
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from datetime import datetime
+from time import perf_counter
+
+from article_parser import table_prompt
+from crawl_metrics import default_metrics
+from recrawl import content_hash
+from util.openai_util import chat_response_dict, JSON_CHAT_MODEL
+
+
+class TableExtractor:
+    """
+    Runs the LLM table extraction on a bounded pool of worker threads, so crawl threads only hand a page over.
+    Results are cached in a MongoDB collection, or in memory for this process without one, keyed by a hash of the
+    model and the whitespace-normalized prompt, and concurrent requests for the same text share one call. submit() blocks once `max_pending` extractions are
+    queued or running. `client` overrides the OpenAI client, e.g. one pointed at a local fake server.
+    """
+
+    def __init__(self, cache_collection=None, max_workers=4, max_pending=64, timeout=30.0, client=None,
+                 metrics=None):
+        self.cache_collection = cache_collection
+        self.memory_cache = {} if cache_collection is None else None  # cache key -> result without a collection
+        self.metrics = metrics or default_metrics
+        self.timeout = timeout
+        self.client = client
+        self.max_workers = max_workers
+        self.executor = None  # 第一次提交时创建，close() 后可再次使用
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.in_flight = {}  # cache key -> Future，相同文本的并发请求共用一次调用
+        self.lock = threading.Lock()
+
+        # 统计信息
+        self.cache_hits = 0
+        self.deduplicated = 0
+        self.llm_calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.llm_seconds = 0.0
+
+    @staticmethod
+    def cache_key(text):
+        return content_hash(f"{JSON_CHAT_MODEL}\n{table_prompt(text)}")
+
+    def submit(self, text) -> Future:
+        """
+        Return a Future of the table JSON string for `text`, or of None when the extraction failed.
+        """
+        key = self.cache_key(text)
+        with self.lock:
+            future = self.in_flight.get(key)
+        if future is not None:
+            self.count("deduplicated")
+            return future
+        self.slots.acquire()
+        with self.lock:
+            future = self.in_flight.get(key)
+            created = future is None
+            if created:
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                       thread_name_prefix="TableExtractor")
+                future = self.executor.submit(self.extract, key, text)
+                self.in_flight[key] = future
+        if not created:
+            self.slots.release()
+            self.count("deduplicated")
+            return future
+        # 回调可能立即执行，必须在锁外注册
+        future.add_done_callback(functools.partial(self.finish, key))
+        return future
+
+    def finish(self, key, future):
+        with self.lock:
+            self.in_flight.pop(key, None)
+        self.slots.release()
+
+    def count(self, outcome):
+        with self.lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+        self.metrics.increment("crawler_llm_requests_total", outcome=outcome)
+
+    def extract(self, key, text):
+        cached = self.load_cached(key)
+        if cached is not None:
+            self.count("cache_hits")
+            return cached
+
+        from openai import APITimeoutError  # 延迟导入，只有提取表格时才需要 openai
+        start = perf_counter()
+        try:
+            result = json.dumps(chat_response_dict(table_prompt(text), timeout=self.timeout, client=self.client))
+        except APITimeoutError as e:
+            logging.error(f"Table extraction timed out after {self.timeout}s: {e}")
+            self.count("timeouts")
+            return None
+        except Exception as e:
+            logging.error(f"Error extracting JSON data from HTML: {e}")
+            self.count("errors")
+            return None
+        finally:
+            seconds = perf_counter() - start
+            self.metrics.observe("llm", seconds)
+            with self.lock:
+                self.llm_calls += 1
+                self.llm_seconds += seconds
+        self.metrics.increment("crawler_llm_requests_total", outcome="completed")
+        self.save_cached(key, result)
+        return result
+
+    def load_cached(self, key):
+        if self.cache_collection is None:
+            with self.lock:
+                return self.memory_cache.get(key)
+        from pymongo.errors import PyMongoError
+        try:
+            doc = self.cache_collection.find_one({"_id": key}, projection={"result": 1})
+        except PyMongoError as e:
+            logging.warning(f"LLM cache lookup failed: {e}")
+            return None
+        return doc["result"] if doc is not None else None
+
+    def save_cached(self, key, result):
+        if self.cache_collection is None:
+            with self.lock:
+                self.memory_cache[key] = result
+            return
+        from pymongo.errors import PyMongoError
+        try:
+            self.cache_collection.update_one(
+                {"_id": key},
+                {"$setOnInsert": {"model": JSON_CHAT_MODEL, "result": result, "created_at": datetime.utcnow()}},
+                upsert=True)
+        except PyMongoError as e:
+            logging.warning(f"LLM cache write failed: {e}")
+
+    def close(self):
+        """
+        Wait for queued extractions and their callbacks to finish.
+        """
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "cache_hits": self.cache_hits,
+                "deduplicated": self.deduplicated,
+                "llm_calls": self.llm_calls,
+                "timeouts": self.timeouts,
+                "errors": self.errors,
+                "avg_llm_seconds": round(self.llm_seconds / self.llm_calls, 3) if self.llm_calls else 0.0,
+            }
@@ -0,0 +1,35 @@
+import article_crawler
+from article_crawler import ArticleCrawler
+from base_etl_item import BaseETLItem
+from crawl_metrics import InMemoryMetrics
+from near_duplicates import NearDuplicateDetector
+
+
+def test_enqueue_times_are_kept_for_the_latest_urls(monkeypatch):
+    monkeypatch.setattr(article_crawler, "MAX_QUEUE_WAIT_URLS", 100)
+    metrics = InMemoryMetrics()
+    crawler = ArticleCrawler("https://example.com/", max_pages=10, sinks=[], table_extractor=False, metrics=metrics)
+    for i in range(1000):
+        crawler.queue_url(f"https://example.com/{i}", 2, score=i)
+    # 有界前沿队列淘汰的 URL 不会出队，入队时间的记录数也有上限
+    assert len(crawler.frontier) == 20
+    assert len(crawler.enqueued_at) == 100
+
+    url, _, _ = crawler.frontier.pop()
+    crawler.observe_queue_wait(url)
+    assert metrics.snapshot()["stages"]["queue_wait"]["count"] == 1
+    assert url not in crawler.enqueued_at
+
+
+def test_each_item_is_fingerprinted_and_looked_up_once():
+    metrics = InMemoryMetrics()
+    crawler = ArticleCrawler("https://example.com/", max_pages=10, sinks=[], table_extractor=False, metrics=metrics,
+                             near_duplicates=NearDuplicateDetector(min_words=5))
+    text = "the same article text is published on two pages of the site"
+    for url in ("https://example.com/1", "https://example.com/2"):
+        crawler.save_item(BaseETLItem(website_url=url, contents=[{"type": "text", "content": text}]), cleaned=True)
+
+    stages = metrics.snapshot()["stages"]
+    assert stages["fingerprint"]["count"] == 2
+    assert stages["near_duplicate_lookup"]["count"] == 2
+    assert crawler.near_duplicates.stats()["duplicates"] == 1
@@ -0,0 +1,27 @@
+from article_parser import html_is_table, text_is_table
+
+
+def table_html(rows, cells=3):
+    body = "".join("<tr>" + "".join(f"<td>cell {row}-{cell} value</td>" for cell in range(cells)) + "</tr>"
+                   for row in range(rows))
+    return f"<html><body><table>{body}</table></body></html>"
+
+
+def test_prose_with_commas_is_not_a_table():
+    text = "The market rose today, traders said, as volumes picked up. " * 20
+    assert not text_is_table(text)
+
+
+def test_cjk_prose_with_full_width_commas_is_not_a_table():
+    text = "比特币今天上涨，交易量增加，分析师表示、市场情绪好转。" * 20
+    assert not text_is_table(text)
+
+
+def test_short_text_is_not_a_table():
+    assert not text_is_table("BTC 64000")
+
+
+def test_table_page_needs_enough_rows():
+    assert html_is_table(table_html(rows=20))
+    assert not html_is_table(table_html(rows=2) + "<p>" + "word " * 100 + "</p>")
+    assert not html_is_table(table_html(rows=20, cells=1))
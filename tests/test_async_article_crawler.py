@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("playwright")
+
+from async_article_crawler import AsyncArticleCrawler
+from host_scheduler import HostScheduler
+
+
+def test_pages_being_handled_finish_before_the_stages_close():
+    crawler = AsyncArticleCrawler("https://example.com/", concurrency=4, sinks=[], table_extractor=False,
+                                  host_scheduler=False)
+    for i in range(8):
+        crawler.scheduler.put((f"https://example.com/{i}", 2))
+    events = []
+    lock = threading.Lock()
+
+    async def download_politely(url, validators=None):
+        await asyncio.sleep(0.01)
+        return "<html></html>"
+
+    def handle_page(url, depth, content, record=None, validators=None):
+        crawler.scheduler.stop()
+        time.sleep(0.2)
+        with lock:
+            events.append("handled")
+
+    close_stages = crawler.close_stages
+
+    def close_stages_after_pages():
+        with lock:
+            events.append("closed")
+        close_stages()
+
+    crawler.download_politely = download_politely
+    crawler.handle_page = handle_page
+    crawler.close_stages = close_stages_after_pages
+    crawler.run()
+    # 停止时仍在下载的任务被取消，已在处理页面的任务先完成
+    assert events[-1] == "closed"
+    assert "handled" in events
+
+
+def test_urls_of_a_busy_host_do_not_hold_task_slots():
+    host_scheduler = HostScheduler(max_per_host=1, requests_per_second=1000, burst=1000, respect_robots=False)
+    crawler = AsyncArticleCrawler("https://a.example.com/0", max_pages=100, concurrency=2, sinks=[],
+                                  table_extractor=False, host_scheduler=host_scheduler)
+    for i in range(1, 7):
+        crawler.scheduler.put((f"https://a.example.com/{i}", 2))
+    for i in range(4):
+        crawler.scheduler.put((f"https://b.example.com/{i}", 2))
+    downloaded = []
+
+    async def download_pages_async(url, validators=None):
+        await asyncio.sleep(0.1 if url.startswith("https://a.") else 0.01)
+        downloaded.append(url)
+        return "<html></html>"
+
+    crawler.download_pages_async = download_pages_async
+    crawler.handle_page = lambda *args: None
+    crawler.run()
+    # a.example.com 的 URL 足以占满所有任务，但一次只能有一个请求，其间 b.example.com 的 URL 全部处理完
+    assert len(downloaded) == 11
+    assert all(url.startswith("https://b.") for url in downloaded[:4])
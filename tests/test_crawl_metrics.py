@@ -0,0 +1,80 @@
+import threading
+from urllib.request import urlopen
+
+import pytest
+
+from crawl_metrics import InMemoryMetrics, PrometheusMetrics, serve_metrics
+
+
+def test_counters_and_gauges_are_kept_per_label_set():
+    metrics = InMemoryMetrics()
+    metrics.increment("crawler_pages_total", domain="a.com", outcome="stored")
+    metrics.increment("crawler_pages_total", outcome="stored", domain="a.com")
+    metrics.increment("crawler_pages_total", 3, domain="b.com", outcome="failed")
+    metrics.set_gauge("crawler_queue_size", 7)
+    counters = metrics.snapshot()["counters"]
+    assert counters[("crawler_pages_total", (("domain", "a.com"), ("outcome", "stored")))] == 2
+    assert counters[("crawler_pages_total", (("domain", "b.com"), ("outcome", "failed")))] == 3
+    assert metrics.snapshot()["gauges"] == {("crawler_queue_size", ()): 7}
+
+
+def test_stage_timings_are_collected_per_page():
+    metrics = InMemoryMetrics(max_pages=2)
+    for url in ("https://a.com/1", "https://a.com/2", "https://a.com/3"):
+        with metrics.page(url) as timings:
+            metrics.observe("fetch", 0.2)
+            metrics.observe("fetch", 0.1)
+            with metrics.time("parse"):
+                pass
+        assert timings["fetch"] == pytest.approx(0.3)
+    snapshot = metrics.snapshot()
+    assert snapshot["stages"]["fetch"] == {"count": 6, "sum": pytest.approx(0.9)}
+    assert snapshot["stages"]["parse"]["count"] == 3
+    assert [url for url, _ in snapshot["pages"]] == ["https://a.com/2", "https://a.com/3"]
+
+    metrics.reset()
+    assert metrics.snapshot() == {"counters": {}, "gauges": {}, "stages": {}, "pages": []}
+
+
+def test_page_timings_do_not_leak_between_threads():
+    metrics = InMemoryMetrics()
+    other_thread_timings = []
+
+    def other_thread():
+        with metrics.page("https://b.com/") as timings:
+            metrics.observe("fetch", 1.0)
+            other_thread_timings.append(timings)
+
+    with metrics.page("https://a.com/") as timings:
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+        metrics.observe("parse", 0.5)
+    assert timings == {"parse": 0.5}
+    assert other_thread_timings == [{"fetch": 1.0}]
+
+
+def test_prometheus_rendering():
+    metrics = PrometheusMetrics(buckets=(0.1, 1.0))
+    metrics.increment("crawler_pages_total", domain='a"b.com', outcome="stored")
+    metrics.observe("fetch", 0.5)
+    lines = metrics.render().splitlines()
+    assert "# TYPE crawler_pages_total counter" in lines
+    assert 'crawler_pages_total{domain="a\\"b.com",outcome="stored"} 1' in lines
+    assert "# TYPE crawler_stage_seconds histogram" in lines
+    assert 'crawler_stage_seconds_bucket{stage="fetch",le="0.1"} 0' in lines
+    assert 'crawler_stage_seconds_bucket{stage="fetch",le="1.0"} 1' in lines
+    assert 'crawler_stage_seconds_bucket{stage="fetch",le="+Inf"} 1' in lines
+    assert 'crawler_stage_seconds_count{stage="fetch"} 1' in lines
+
+
+def test_serve_metrics():
+    metrics = PrometheusMetrics()
+    metrics.increment("crawler_pages_total", outcome="stored")
+    server = serve_metrics(metrics, port=0, host="127.0.0.1")
+    try:
+        with urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=5) as response:
+            body = response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+    assert 'crawler_pages_total{outcome="stored"} 1' in body
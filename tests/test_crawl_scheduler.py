@@ -0,0 +1,175 @@
+import threading
+
+import mongomock
+import pytest
+
+from crawl_scheduler import CrawlScheduler
+from frontier import MemoryFrontier, MongoFrontier, PriorityFrontier, mongo_frontier_counts
+from host_scheduler import HostScheduler
+
+
+class LockedCollection:
+    """
+    Serializes calls to a mongomock collection, which unlike MongoDB is not safe to update from several threads.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.collection, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            with self.lock:
+                return attribute(*args, **kwargs)
+        return call
+
+
+def shared_collection():
+    return LockedCollection(mongomock.MongoClient()["ai_qa"]["crawler_frontier"])
+
+
+def test_run_returns_when_nothing_is_queued():
+    scheduler = CrawlScheduler(workers=4)
+    scheduler.run(lambda url, depth: None)
+    assert scheduler.processed == 0
+
+
+def test_run_waits_for_items_queued_by_handlers():
+    scheduler = CrawlScheduler(workers=4)
+    seen = []
+    lock = threading.Lock()
+
+    def handler(url, depth):
+        with lock:
+            seen.append(url)
+        if depth < 3:
+            for i in range(3):
+                scheduler.put((f"{url}/{i}", depth + 1))
+
+    scheduler.put(("https://example.com", 1))
+    scheduler.run(handler)
+    # 1 + 3 + 9 个 URL
+    assert len(seen) == 13
+    assert scheduler.processed == 13
+    assert scheduler.qsize() == 0
+
+
+def test_stop_leaves_pending_items_in_the_frontier():
+    frontier = MemoryFrontier()
+    scheduler = CrawlScheduler(workers=1, frontier=frontier)
+    for i in range(5):
+        scheduler.put((f"https://example.com/{i}", 1))
+
+    def handler(url, depth):
+        scheduler.stop()
+
+    scheduler.run(handler)
+    assert scheduler.processed == 1
+    assert len(frontier) == 4
+    assert not scheduler.put(("https://example.com/late", 1))
+
+
+def test_handler_error_stops_the_crawl_and_is_raised():
+    scheduler = CrawlScheduler(workers=2)
+    for i in range(10):
+        scheduler.put((f"https://example.com/{i}", 1))
+
+    def handler(url, depth):
+        raise RuntimeError(url)
+
+    with pytest.raises(RuntimeError):
+        scheduler.run(handler)
+    assert scheduler.processed < 10
+
+
+def test_teardown_runs_on_each_worker_thread():
+    scheduler = CrawlScheduler(workers=3)
+    scheduler.put(("https://example.com", 1))
+    threads = []
+    scheduler.run(lambda url, depth: None, teardown=lambda: threads.append(threading.current_thread()))
+    assert len(threads) == 3
+    assert threading.main_thread() not in threads
+
+
+def test_waits_for_urls_leased_by_another_node():
+    collection = shared_collection()
+    other_node = MongoFrontier(collection, crawl_id="crawl", lease_timeout=0.2)
+    other_node.push("https://example.com/a", 1)
+    other_node.push("https://example.com/b", 1)
+    leased, _, _ = other_node.pop()
+
+    frontier = MongoFrontier(collection, crawl_id="crawl", lease_timeout=0.2)
+    seen = []
+
+    def handler(url, depth):
+        seen.append(url)
+        frontier.mark_visited(url)
+
+    CrawlScheduler(workers=2, frontier=frontier).run(handler)
+    # 另一个节点的租约过期后才处理它租用的 URL，然后结束
+    assert sorted(seen) == ["https://example.com/a", "https://example.com/b"]
+    assert frontier.is_drained()
+
+
+def test_items_parked_for_a_host_keep_score_order():
+    host_scheduler = HostScheduler(max_per_host=1, requests_per_second=1000, burst=1000, respect_robots=False)
+    scheduler = CrawlScheduler(workers=1, frontier=PriorityFrontier(), host_scheduler=host_scheduler)
+    for i in range(3):
+        scheduler.put((f"https://a.example.com/low{i}", 1, 0.1 * (3 - i)))
+    order = []
+
+    def handler(url, depth):
+        order.append(url.rsplit("/", 1)[1])
+        if url.endswith("low0"):
+            # 后入队的高分 URL 排在已暂存的低分 URL 之前
+            scheduler.put(("https://a.example.com/high", 2, 1.0))
+
+    scheduler.run(handler)
+    assert order == ["low0", "high", "low1", "low2"]
+
+
+def test_a_node_parks_at_most_workers_leased_urls_behind_a_busy_host():
+    collection = shared_collection()
+    node_a = MongoFrontier(collection, crawl_id="crawl", lease_timeout=60)
+    for i in range(300):
+        node_a.push(f"https://example.com/{i}", 1)
+    host_scheduler = HostScheduler(max_per_host=1, requests_per_second=1000, burst=1000, respect_robots=False)
+    scheduler = CrawlScheduler(workers=2, frontier=node_a, host_scheduler=host_scheduler)
+    with scheduler.condition:
+        items = [scheduler.next_item()[0] for _ in range(5)]
+    # 只有第一个 URL 拿到了主机的名额，其余暂存的 URL 不超过 workers 个
+    assert items[0] is not None and items[1:] == [None] * 4
+    assert scheduler.parked_count == 2
+    assert mongo_frontier_counts(collection.collection, "crawl") == {"pending": 297, "in_progress": 3, "visited": 0}
+
+
+def test_two_nodes_share_a_single_host_crawl():
+    collection = shared_collection()
+    urls = [f"https://example.com/{i}" for i in range(40)]
+    for url in urls:
+        MongoFrontier(collection, crawl_id="crawl", lease_timeout=60).push(url, 1)
+    seen = []
+    lock = threading.Lock()
+
+    def run_node():
+        frontier = MongoFrontier(collection, crawl_id="crawl", lease_timeout=60)
+        host_scheduler = HostScheduler(max_per_host=1, requests_per_second=1000, burst=1000, respect_robots=False)
+
+        def handler(url, depth):
+            with lock:
+                seen.append(url)
+            frontier.mark_visited(url)
+
+        CrawlScheduler(workers=2, frontier=frontier, host_scheduler=host_scheduler).run(handler)
+
+    nodes = [threading.Thread(target=run_node) for _ in range(2)]
+    for node in nodes:
+        node.start()
+    for node in nodes:
+        node.join(timeout=30)
+    # 每个 URL 只被一个节点处理一次
+    assert sorted(seen) == sorted(urls)
@@ -0,0 +1,25 @@
+import mongomock
+
+from crawl_jobs import CrawlJobQueue
+from crawl_metrics import InMemoryMetrics
+from crawl_worker import JobCrawler
+from frontier import MongoFrontier
+from sinks import CallbackSink
+
+
+def test_a_failing_page_does_not_fail_the_job():
+    database = mongomock.MongoClient()["ai_qa"]
+    jobs = CrawlJobQueue(database["crawl_jobs"])
+    job = jobs.get(jobs.submit({"start_url": "https://example.com/", "max_pages": 5}))
+    frontier = MongoFrontier(database["crawler_frontier"], crawl_id=job["_id"], lease_timeout=60)
+    metrics = InMemoryMetrics()
+    crawler = JobCrawler(job, jobs, frontier, sinks=[CallbackSink(lambda doc: None)], table_extractor=False,
+                         metrics=metrics)
+
+    def download_pages(url, validators=None):
+        raise RuntimeError("connection reset")
+
+    crawler.download_pages = download_pages
+    crawler.process_single_url("https://example.com/2024/01/some-article", 1)
+    outcome = ("crawler_pages_total", (("domain", "example.com"), ("outcome", "error")))
+    assert metrics.snapshot()["counters"][outcome] == 1
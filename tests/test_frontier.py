@@ -0,0 +1,169 @@
+import sqlite3
+import time
+
+import mongomock
+import pytest
+
+from frontier import MemoryFrontier, MongoFrontier, PriorityFrontier, SQLiteFrontier
+
+
+def mongo_collection():
+    return mongomock.MongoClient()["ai_qa"]["crawler_frontier"]
+
+
+@pytest.fixture(params=["memory", "priority", "sqlite", "mongo"])
+def frontier(request, tmp_path):
+    if request.param == "memory":
+        return MemoryFrontier()
+    if request.param == "priority":
+        return PriorityFrontier()
+    if request.param == "sqlite":
+        frontier = SQLiteFrontier(str(tmp_path / "frontier.db"), crawl_id="crawl")
+        request.addfinalizer(frontier.close)
+        return frontier
+    return MongoFrontier(mongo_collection(), crawl_id="crawl")
+
+
+def test_push_pop_and_visited(frontier):
+    assert frontier.push("https://example.com/a", 1)
+    assert frontier.push("https://example.com/b", 2)
+    assert not frontier.push("https://example.com/a", 3)
+    assert len(frontier) == 2
+
+    popped = [frontier.pop(), frontier.pop()]
+    assert sorted(popped) == [("https://example.com/a", 1, 0.0), ("https://example.com/b", 2, 0.0)]
+    assert frontier.pop() is None
+    assert len(frontier) == 0
+
+    frontier.mark_visited("https://example.com/a")
+    frontier.mark_visited("https://example.com/a")
+    assert frontier.is_visited("https://example.com/a")
+    assert not frontier.is_visited("https://example.com/b")
+    assert frontier.visited_count() == 1
+    assert not frontier.push("https://example.com/a", 1)
+    assert frontier.retry_after() is None
+
+
+@pytest.mark.parametrize("frontier", ["priority", "sqlite", "mongo"], indirect=True)
+def test_pops_the_highest_score_first(frontier):
+    for name, score in [("low", 0.1), ("high", 0.9), ("mid", 0.5), ("high2", 0.9)]:
+        frontier.push(f"https://example.com/{name}", 1, score)
+    order = [frontier.pop()[0].rsplit("/", 1)[1] for _ in range(4)]
+    # 同分时先入先出
+    assert order == ["high", "high2", "mid", "low"]
+
+
+def test_bounded_priority_frontier_evicts_the_lowest_score():
+    frontier = PriorityFrontier(max_size=2)
+    frontier.push("https://example.com/a", 1, 0.5)
+    frontier.push("https://example.com/b", 1, 0.2)
+    assert frontier.push("https://example.com/c", 1, 0.8)
+    assert not frontier.push("https://example.com/d", 1, 0.1)
+    assert [frontier.pop()[0] for _ in range(2)] == ["https://example.com/c", "https://example.com/a"]
+
+
+def test_sqlite_frontier_migrates_a_table_without_score(tmp_path):
+    path = str(tmp_path / "frontier.db")
+    # 加入 score 列之前的表结构
+    connection = sqlite3.connect(path)
+    connection.execute("""
+        CREATE TABLE frontier (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            crawl_id TEXT NOT NULL,
+            url TEXT NOT NULL,
+            depth INTEGER NOT NULL,
+            state INTEGER NOT NULL,
+            UNIQUE (crawl_id, url)
+        )""")
+    connection.execute("CREATE INDEX frontier_state ON frontier (crawl_id, state, seq)")
+    connection.execute("INSERT INTO frontier (crawl_id, url, depth, state) VALUES (?, ?, 1, 0)",
+                       ("crawl", "https://example.com/old"))
+    connection.commit()
+    connection.close()
+
+    frontier = SQLiteFrontier(path, crawl_id="crawl")
+    assert len(frontier) == 1
+    frontier.push("https://example.com/new", 1, 0.5)
+    assert frontier.pop() == ("https://example.com/new", 1, 0.5)
+    assert frontier.pop() == ("https://example.com/old", 1, 0.0)
+    frontier.close()
+    SQLiteFrontier(path, crawl_id="crawl").close()
+
+
+def test_sqlite_frontier_resumes_a_crawl(tmp_path):
+    path = str(tmp_path / "frontier.db")
+    frontier = SQLiteFrontier(path, crawl_id="crawl")
+    for name in "abc":
+        frontier.push(f"https://example.com/{name}", 1)
+    url, _, _ = frontier.pop()
+    frontier.mark_visited(url)
+    in_progress, _, _ = frontier.pop()
+    frontier.close()
+
+    resumed = SQLiteFrontier(path, crawl_id="crawl")
+    # 上次未完成的 URL 重新排队
+    assert len(resumed) == 2
+    assert resumed.visited_count() == 1
+    assert resumed.is_visited(url)
+    assert in_progress in {resumed.pop()[0], resumed.pop()[0]}
+    assert not resumed.push(url, 1)
+    resumed.close()
+
+    other = SQLiteFrontier(path, crawl_id="other")
+    assert len(other) == 0
+    assert other.push(url, 1)
+    other.close()
+
+
+def test_mongo_frontier_resumes_a_crawl():
+    collection = mongo_collection()
+    frontier = MongoFrontier(collection, crawl_id="crawl")
+    for name in "abc":
+        frontier.push(f"https://example.com/{name}", 1)
+    url, _, _ = frontier.pop()
+    frontier.mark_visited(url)
+    in_progress, _, _ = frontier.pop()
+
+    resumed = MongoFrontier(collection, crawl_id="crawl")
+    assert len(resumed) == 2
+    assert resumed.visited_count() == 1
+    assert resumed.is_visited(url)
+    assert in_progress in {resumed.pop()[0], resumed.pop()[0]}
+    assert resumed.is_drained() is False
+    assert len(MongoFrontier(collection, crawl_id="other")) == 0
+
+
+def test_shared_frontier_hands_out_expired_leases_again():
+    collection = mongo_collection()
+    node_a = MongoFrontier(collection, crawl_id="crawl", lease_timeout=0.2, count_ttl=0)
+    node_b = MongoFrontier(collection, crawl_id="crawl", lease_timeout=0.2, count_ttl=0)
+    node_a.push("https://example.com/a", 1, 0.9)
+    node_a.push("https://example.com/b", 1, 0.1)
+    # 计数来自集合，包括其他节点入队的 URL
+    assert len(node_b) == 2
+
+    leased, _, _ = node_a.pop()
+    assert node_b.pop()[0] == "https://example.com/b"
+    node_b.mark_visited("https://example.com/b")
+    assert node_b.pop() is None
+    assert len(node_b) == 0
+    assert 0 < node_b.retry_after() <= 0.2
+
+    # node_a 崩溃，租约过期后由 node_b 处理
+    time.sleep(0.25)
+    assert len(node_b) == 1
+    assert node_b.retry_after() == 0
+    assert node_b.pop()[0] == leased
+    node_b.mark_visited(leased)
+    assert node_b.retry_after() is None
+    assert node_b.is_drained()
+
+
+def test_shared_frontier_does_not_requeue_other_nodes_urls():
+    collection = mongo_collection()
+    node_a = MongoFrontier(collection, crawl_id="crawl", lease_timeout=60)
+    node_a.push("https://example.com/a", 1)
+    node_a.pop()
+    node_b = MongoFrontier(collection, crawl_id="crawl", lease_timeout=60, max_retry_after=5)
+    assert node_b.pop() is None
+    assert node_b.retry_after() == 5
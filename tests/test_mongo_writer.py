@@ -0,0 +1,70 @@
+import time
+
+import mongomock
+import pytest
+from pymongo.errors import PyMongoError
+
+from mongo_writer import BulkWriter
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient()["ai_qa"]["bulk_writer_test"]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_flushes_full_batches_before_close(collection):
+    writer = BulkWriter(collection, batch_size=10, flush_interval=60)
+    for i in range(25):
+        writer.update_one({"_id": i}, {"$set": {"value": i}})
+    wait_for(lambda: collection.count_documents({}) == 20)
+    writer.close()
+    assert collection.count_documents({}) == 25
+    assert writer.stats()["flushes"] == 3
+    assert writer.stats()["written_ops"] == 25
+
+
+def test_flushes_after_the_interval(collection):
+    writer = BulkWriter(collection, batch_size=100, flush_interval=0.05)
+    writer.update_one({"_id": "a"}, {"$set": {"value": 1}})
+    wait_for(lambda: collection.count_documents({}) == 1)
+    writer.close()
+
+
+def test_close_flushes_and_rejects_later_writes(collection):
+    writer = BulkWriter(collection, batch_size=100, flush_interval=60)
+    writer.update_one({"_id": "a"}, {"$set": {"value": 1}})
+    writer.update_one({"_id": "a"}, {"$set": {"other": 2}})
+    writer.close()
+    writer.close()
+    assert collection.find_one({"_id": "a"}) == {"_id": "a", "value": 1, "other": 2}
+    with pytest.raises(RuntimeError):
+        writer.update_one({"_id": "b"}, {"$set": {"value": 1}})
+
+
+def test_update_without_upsert_does_not_insert(collection):
+    writer = BulkWriter(collection, flush_interval=60)
+    writer.update_one({"_id": "missing"}, {"$addToSet": {"related": "x"}}, upsert=False)
+    writer.close()
+    assert collection.count_documents({}) == 0
+
+
+def test_failed_bulk_write_is_counted():
+    class FailingCollection:
+        name = "failing"
+
+        def bulk_write(self, ops, ordered=True):
+            raise PyMongoError("down")
+
+    writer = BulkWriter(FailingCollection(), flush_interval=60)
+    for i in range(3):
+        writer.update_one({"_id": i}, {"$set": {"value": i}})
+    writer.close()
+    assert writer.stats()["failed_ops"] == 3
+    assert writer.stats()["written_ops"] == 0
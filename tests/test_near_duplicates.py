@@ -0,0 +1,77 @@
+import random
+
+import mongomock
+import pytest
+
+from near_duplicates import NearDuplicateDetector, hamming_distance, simhash, tokenize
+
+VOCABULARY = [f"word{i}" for i in range(500)]
+
+
+def article(seed, sentences=30):
+    rng = random.Random(seed)
+    return " ".join(" ".join(rng.choice(VOCABULARY) for _ in range(12)) + "." for _ in range(sentences))
+
+
+def fingerprint(text):
+    return simhash(tokenize(text))
+
+
+def test_distance_between_copies_and_unrelated_articles():
+    text = article(1)
+    sentences = text.split(". ")
+    edited = ". ".join(sentences[:10] + ["a changed sentence about something else entirely"] + sentences[11:])
+    assert hamming_distance(fingerprint(text), fingerprint(text)) == 0
+    assert hamming_distance(fingerprint(text), fingerprint(edited)) <= 6
+    for seed in range(2, 12):
+        assert hamming_distance(fingerprint(text), fingerprint(article(seed))) > 6
+
+
+def test_cjk_text_is_tokenized_per_character():
+    assert tokenize("比特币 Price 上涨") == ["比", "特", "币", "price", "上", "涨"]
+
+
+def test_find_does_not_index_until_add():
+    detector = NearDuplicateDetector()
+    text = article(1)
+    fp = detector.fingerprint(text)
+    assert detector.find("https://a.com/1", fp) is None
+    assert detector.find("https://b.com/1", fp) is None
+    detector.add("https://a.com/1", fp)
+    assert detector.find("https://b.com/1", fp) == "https://a.com/1"
+    # 同一个 URL 重新抓取时不是自己的重复
+    assert detector.find("https://a.com/1", fp) is None
+    assert detector.find("https://c.com/1", detector.fingerprint(article(2))) is None
+    assert detector.stats() == {"checked": 5, "duplicates": 1, "too_short": 0, "indexed": 1}
+
+
+def test_check_indexes_originals_only():
+    detector = NearDuplicateDetector(max_distance=3)
+    assert detector.check("https://a.com/1", article(1)) is None
+    assert detector.check("https://b.com/1", article(1)) == "https://a.com/1"
+    assert detector.stats()["indexed"] == 1
+
+
+def test_short_text_is_not_fingerprinted():
+    detector = NearDuplicateDetector(min_words=50)
+    assert detector.fingerprint("too short to deduplicate") is None
+    assert detector.check("https://a.com/1", "too short to deduplicate") is None
+    assert detector.stats()["too_short"] == 2
+
+
+def test_fingerprints_are_shared_through_the_collection():
+    collection = mongomock.MongoClient()["ai_qa"]["near_duplicates"]
+    first = NearDuplicateDetector(collection)
+    first.open()
+    first.add("https://a.com/1", first.fingerprint(article(1)))
+    first.close()
+    assert collection.count_documents({}) == 1
+
+    second = NearDuplicateDetector(collection)
+    assert second.check("https://b.com/1", article(1)) == "https://a.com/1"
+    assert second.check("https://a.com/1", article(1)) is None
+
+
+def test_action_is_validated():
+    with pytest.raises(ValueError):
+        NearDuplicateDetector(action="delete")
@@ -0,0 +1,84 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import mongomock
+
+from table_extractor import TableExtractor
+
+TABLE_TEXT = "Name Price Volume\nBTC 64000 1200\nETH 3100 800"
+
+
+class FakeChatClient:
+    """
+    Stands in for the OpenAI client: returns `{"data": [...]}` for every prompt, optionally after `release` is set.
+    """
+
+    def __init__(self, release=None, error=None):
+        self.release = release
+        self.error = error
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if self.release is not None:
+            self.release.wait(timeout=5)
+        if self.error is not None:
+            raise self.error
+        content = json.dumps({"data": [{"name": "BTC", "price": 64000}]})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def extract(extractor, text=TABLE_TEXT):
+    return extractor.submit(text).result(timeout=5)
+
+
+def test_memory_cache_without_a_collection():
+    client = FakeChatClient()
+    extractor = TableExtractor(client=client)
+    first = extract(extractor)
+    # 只有空白不同的文本使用同一个缓存项
+    second = extract(extractor, TABLE_TEXT.replace(" ", "  "))
+    extractor.close()
+    assert json.loads(first) == {"data": [{"name": "BTC", "price": 64000}]}
+    assert second == first
+    assert client.calls == 1
+    assert extractor.stats()["cache_hits"] == 1
+
+
+def test_collection_cache_is_shared_across_extractors():
+    collection = mongomock.MongoClient()["ai_qa"]["llm_cache"]
+    client = FakeChatClient()
+    first = TableExtractor(collection, client=client)
+    result = extract(first)
+    first.close()
+
+    second = TableExtractor(collection, client=client)
+    assert extract(second) == result
+    second.close()
+    assert client.calls == 1
+    assert collection.count_documents({}) == 1
+
+
+def test_concurrent_requests_for_the_same_text_share_one_call():
+    release = threading.Event()
+    client = FakeChatClient(release=release)
+    extractor = TableExtractor(client=client)
+    futures = [extractor.submit(TABLE_TEXT) for _ in range(3)]
+    release.set()
+    results = {future.result(timeout=5) for future in futures}
+    extractor.close()
+    assert len(results) == 1
+    assert client.calls == 1
+    assert extractor.stats()["deduplicated"] == 2
+
+
+def test_failed_extraction_returns_none_and_is_not_cached():
+    client = FakeChatClient(error=RuntimeError("rate limited"))
+    extractor = TableExtractor(client=client)
+    assert extract(extractor) is None
+    assert extract(extractor) is None
+    extractor.close()
+    assert client.calls == 2
+    assert extractor.stats()["errors"] == 2
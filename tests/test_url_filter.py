@@ -0,0 +1,121 @@
+import re
+import threading
+
+import pytest
+
+from url_filter import DEFAULT_LINK_EXCLUDES, UrlFilter, UrlRules
+
+RULES = ['ext:pdf', 'domain:example.org', 'glob:*/tag/*', 'glob:https://a.com/*', 'glob:*.html',
+         'glob:*/page/[0-9]*', r'regex:https://b\.com/\d+$']
+
+URLS = [
+    ("https://c.com/files/report.PDF", 'ext:pdf'),
+    ("https://c.com/report.pdf?download=1", 'ext:pdf'),
+    ("https://a.com/report.pdf", 'glob:https://a.com/*'),
+    ("https://a.com/report.pdf/view", 'glob:https://a.com/*'),
+    ("https://c.com/v1.2/report", None),
+    ("https://example.org/news", 'domain:example.org'),
+    ("https://news.Example.org:8080/", 'domain:example.org'),
+    ("https://example.org@c.com/", None),
+    ("https://notexample.org/", None),
+    ("https://c.com/tag/bitcoin", 'glob:*/tag/*'),
+    ("https://c.com/index.html", 'glob:*.html'),
+    ("https://c.com/index.html?x=1", None),
+    ("https://c.com/page/2", 'glob:*/page/[0-9]*'),
+    ("https://b.com/123", r'regex:https://b\.com/\d+$'),
+    ("https://b.com/123/comments", None),
+    ("https://c.com/2024/01/article", None),
+]
+
+
+@pytest.mark.parametrize("url, rule", URLS)
+def test_rule_matching_a_url(url, rule):
+    rules = UrlRules.parse(RULES)
+    assert rules.regex is not None
+    assert rules.match(url) == rule
+    assert rules.match_each(url) == rule
+    assert rules.matches(url) == (rule is not None)
+
+
+def test_backreferences_fall_back_to_matching_each_rule():
+    rules = UrlRules.parse(['ext:pdf', r'https://(\w+)\.com/\1'])
+    assert rules.regex is None
+    assert rules.match("https://a.com/a") == r'regex:https://(\w+)\.com/\1'
+    assert rules.match("https://a.com/b.pdf") == 'ext:pdf'
+    assert not rules.matches("https://a.com/b")
+
+
+def test_parse():
+    assert UrlRules.parse(None) is None
+    assert UrlRules.parse(DEFAULT_LINK_EXCLUDES) is DEFAULT_LINK_EXCLUDES
+    assert UrlRules.parse(r'https://a\.com/').patterns == (r'https://a\.com/',)
+    rules = UrlRules.parse(['ext:.PDF', 'domain:A.com', 'glob:*/tag/*', 'regex:x', 'y', 'ext:'])
+    assert rules.extensions == {'pdf'}
+    assert rules.domains == {'a.com'}
+    assert rules.globs == ('*/tag/*',)
+    assert rules.patterns == ('x', 'y', 'ext:')
+    with pytest.raises(re.error):
+        UrlRules.parse(['regex:('])
+
+
+def test_rules_can_be_combined():
+    rules = DEFAULT_LINK_EXCLUDES | UrlRules.parse(['ext:pdf', 'glob:*/tag/*'])
+    assert rules.match("https://a.com/logo.png") == 'ext:png'
+    assert rules.match("https://www.youtube.com/watch?v=1") == 'domain:youtube.com'
+    assert rules.match("https://a.com/file.pdf") == 'ext:pdf'
+    assert rules.match("https://a.com/tag/btc") == 'glob:*/tag/*'
+
+
+def test_filter_applies_exclude_rules_before_include_rules():
+    url_filter = UrlFilter(include=['domain:a.com'], exclude=['ext:pdf', 'glob:*/tag/*'])
+    assert url_filter.allows("https://www.a.com/2024/article")
+    assert url_filter.rejection("https://a.com/report.pdf") == 'ext:pdf'
+    assert url_filter.rejection("https://a.com/tag/btc") == 'glob:*/tag/*'
+    assert url_filter.rejection("https://b.com/2024/article") == 'include'
+    assert url_filter.rejection("https://b.com/report.pdf") == 'ext:pdf'
+    assert url_filter.stats() == {
+        "rejected": 4,
+        "rejected_by_rule": {'ext:pdf': 2, 'glob:*/tag/*': 1, 'include': 1},
+    }
+
+
+def test_filter_without_rules_allows_everything():
+    url_filter = UrlFilter()
+    assert url_filter.allows("https://a.com/report.pdf")
+    assert url_filter.stats()["rejected"] == 0
+
+
+def test_cheap_rules_are_checked_first():
+    url_filter = UrlFilter(exclude=[r'https://a\.com/', 'glob:*/files/*', 'ext:pdf'])
+    assert url_filter.rejection("https://a.com/files/report.pdf") == 'glob:*/files/*'
+    assert url_filter.rejection("https://a.com/report.pdf") == 'ext:pdf'
+    assert url_filter.rejection("https://a.com/files/report") == 'glob:*/files/*'
+    assert url_filter.rejection("https://a.com/report") == r'regex:https://a\.com/'
+
+
+def test_rejections_are_counted_across_threads():
+    url_filter = UrlFilter(exclude=['ext:pdf'])
+
+    def check():
+        for i in range(1000):
+            url_filter.allows(f"https://a.com/{i}.pdf")
+            url_filter.allows(f"https://a.com/{i}")
+
+    threads = [threading.Thread(target=check) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert url_filter.stats() == {"rejected": 4000, "rejected_by_rule": {'ext:pdf': 4000}}
+
+
+def test_literal_globs_of_each_kind():
+    rules = UrlRules.parse(['glob:*/tag/*', 'glob:https://a.com/*', 'glob:https://b.com/*', 'glob:*.html',
+                            'glob:https://c.com/', 'glob:*/amp'])
+    assert rules.regex is None and rules.cheap_regex is None
+    assert rules.match("https://c.com/tag/btc") == 'glob:*/tag/*'
+    assert rules.match("https://b.com/news") == 'glob:https://b.com/*'
+    assert rules.match("https://c.com/index.html") == 'glob:*.html'
+    assert rules.match("https://c.com/news/amp") == 'glob:*/amp'
+    assert rules.match("https://c.com/") == 'glob:https://c.com/'
+    assert rules.match("https://c.com/news") is None
@@ -0,0 +1,281 @@
+import fnmatch
+import re
+import threading
+
+RULE_PREFIXES = ('ext', 'domain', 'glob', 'regex')
+
+# 正则中的反向引用在合并成一个正则后会指向错误的分组
+BACKREFERENCE = re.compile(r'\\[1-9]|\(\?P=')
+
+# scheme://user@，扩展名和域名规则的正则的前缀
+SCHEME_USER = r'[a-zA-Z][a-zA-Z0-9+.-]*://(?:[^@/?#]*@)?'
+
+# scheme://user@host:port/path，比 urlsplit 快，只取 host 和 path
+HOST_PATH = re.compile(r'[a-zA-Z][a-zA-Z0-9+.-]*://(?:[^@/?#]*@)?(\[[^\]/]*\]|[^/?#:]*)(?::\d*)?([^?#]*)')
+
+
+def no_match(url):
+    return None
+
+
+def host_and_path(url):
+    """
+    Return the lower-cased host and the path of an absolute URL, ('', '') when it has no scheme.
+    """
+    match = HOST_PATH.match(url)
+    if match is None:
+        return '', ''
+    return match.group(1).lower(), match.group(2)
+
+
+class UrlRules:
+    """
+    URL rules checked cheapest first: literal globs like '*/tag/*' or 'https://a.com/*' with string operations, then
+    file extensions and domains as alternatives of one regex, then other globs and regexes as alternatives of a second
+    one, so a URL is checked with at most two regex matches whatever the number of rules. Regexes are matched from the
+    start of the URL like re.match, globs must match the whole URL. Regexes with backreferences cannot be combined and
+    are then checked one by one.
+    """
+
+    def __init__(self, extensions=(), domains=(), globs=(), patterns=()):
+        self.extensions = frozenset(extension.lower().lstrip('.') for extension in extensions or ())
+        self.domains = frozenset(domain.lower() for domain in domains or ())
+        self.globs = tuple(globs or ())
+        self.patterns = tuple(patterns or ())
+
+        # 只含字面量和首尾 '*' 的 glob 用 in、startswith、endswith 和字典查找匹配，比正则快
+        self.literal_globs = {kind: [] for kind in ('contains', 'prefix', 'suffix', 'exact')}  # kind -> (literal, rule)
+        self.rules = []
+        expressions = []
+        for glob in self.globs:
+            kind = self.literal_glob_kind(glob)
+            if kind is None:
+                self.rules.append(f"glob:{glob}")
+                expressions.append(fnmatch.translate(glob))
+            else:
+                self.literal_globs[kind].append((glob.strip('*'), f"glob:{glob}"))
+        self.prefixes = tuple(literal for literal, rule in self.literal_globs['prefix'])
+        self.suffixes = tuple(literal for literal, rule in self.literal_globs['suffix'])
+        self.exact_rules = {literal: rule for literal, rule in reversed(self.literal_globs['exact'])}
+        self.rules += [f"regex:{pattern}" for pattern in self.patterns]
+        expressions += list(self.patterns)
+        self.regexes = [re.compile(expression) for expression in expressions]  # 逐个编译，错误的正则在这里报错
+        self.cheap_regex = self.compile_cheap_rules()
+        self.regex = None
+        if expressions and not any(BACKREFERENCE.search(expression) for expression in expressions):
+            try:
+                self.regex = re.compile('|'.join(f"(?P<rule{i}>{expression})"
+                                                 for i, expression in enumerate(expressions)))
+            except re.error:
+                pass  # 例如重名的命名分组或不在开头的全局标志，逐个匹配
+        # literal_match 返回规则名；cheap_match 和 regex_match 直接调用编译后正则的 match，返回 Match 或 None，
+        # 匹配到时再用 cheap_rule/regex_rule 得到规则名
+        self.literal_match = self.match_literal if any(self.literal_globs.values()) else no_match
+        self.cheap_match = self.cheap_regex.match if self.cheap_regex is not None else no_match
+        if self.regex is not None:
+            self.regex_match = self.regex.match
+        else:
+            self.regex_match = self.match_each_regex if self.regexes else no_match
+
+    def compile_cheap_rules(self):
+        # 分组名 ext 和 domain 捕获匹配到的扩展名和域名，两个分支共用 scheme://user@ 前缀
+        # 回溯只发生在 '.' 处，IGNORECASE 只作用于扩展名和域名本身，否则这两个分支慢几倍
+        branches = []
+        if self.extensions:
+            extensions = '|'.join(re.escape(extension) for extension in sorted(self.extensions))
+            branches.append(rf"[^/?#]*/(?:[^?#.]*\.)+(?i:(?P<ext>{extensions}))(?=[?#]|\Z)")
+        if self.domains:
+            domains = '|'.join(re.escape(domain) for domain in sorted(self.domains))
+            branches.append(rf"(?:[^@/?#:.]*\.)*(?i:(?P<domain>{domains}))(?=[/?#:]|\Z)")
+        return re.compile(f"{SCHEME_USER}(?:{'|'.join(branches)})") if branches else None
+
+    @staticmethod
+    def literal_glob_kind(glob):
+        literal = glob.strip('*')
+        if not literal or any(char in literal for char in '*?['):
+            return None
+        if glob.startswith('*') and glob.endswith('*') and len(glob) > len(literal) + 1:
+            return 'contains'
+        if glob.endswith('*'):
+            return 'prefix'
+        if glob.startswith('*'):
+            return 'suffix'
+        return 'exact'
+
+    @classmethod
+    def parse(cls, rules):
+        """
+        Build rules from a regex string, or from a list of 'ext:pdf', 'domain:example.com', 'glob:*/tag/*' and
+        'regex:...' strings where unprefixed strings are regexes. UrlRules and None are returned as they are.
+        """
+        if rules is None or isinstance(rules, UrlRules):
+            return rules
+        if isinstance(rules, str):
+            return cls(patterns=[rules])
+        by_prefix = {prefix: [] for prefix in RULE_PREFIXES}
+        for rule in rules:
+            prefix, _, value = rule.partition(':')
+            if prefix in by_prefix and value:
+                by_prefix[prefix].append(value)
+            else:
+                by_prefix['regex'].append(rule)
+        return cls(extensions=by_prefix['ext'], domains=by_prefix['domain'], globs=by_prefix['glob'],
+                   patterns=by_prefix['regex'])
+
+    def __or__(self, other):
+        return UrlRules(extensions=self.extensions | other.extensions, domains=self.domains | other.domains,
+                        globs=self.globs + other.globs, patterns=self.patterns + other.patterns)
+
+    def match(self, url):
+        """
+        Return the rule matching the URL, e.g. 'ext:pdf' or 'glob:*/tag/*', or None.
+        """
+        rule = self.literal_match(url)
+        if rule is None:
+            rule = self.match_cheap(url)
+        return rule if rule is not None else self.match_regex(url)
+
+    def matches(self, url):
+        return bool(self.literal_match(url) or self.cheap_match(url) or self.regex_match(url))
+
+    def match_literal(self, url):
+        """
+        Return the literal glob rule matching the URL, or None.
+        """
+        for literal, rule in self.literal_globs['contains']:
+            if literal in url:
+                return rule
+        # startswith/endswith 一次检查所有前缀和后缀，匹配到时才找出是哪一条
+        if self.prefixes and url.startswith(self.prefixes):
+            return next(rule for literal, rule in self.literal_globs['prefix'] if url.startswith(literal))
+        if self.suffixes and url.endswith(self.suffixes):
+            return next(rule for literal, rule in self.literal_globs['suffix'] if url.endswith(literal))
+        return self.exact_rules.get(url)
+
+    def match_cheap(self, url):
+        """
+        Return the extension or domain rule matching the URL, or None.
+        """
+        match = self.cheap_match(url)
+        return self.cheap_rule(match) if match else None
+
+    def match_regex(self, url):
+        """
+        Return the glob or regex rule matching the URL, or None.
+        """
+        match = self.regex_match(url)
+        return self.regex_rule(match) if match else None
+
+    @staticmethod
+    def cheap_rule(match):
+        group = match.lastgroup
+        return f"{group}:{match.group(group).lower()}"
+
+    def regex_rule(self, match):
+        if self.regex is None:
+            return match  # match_each_regex 已返回规则名
+        return self.rules[int(match.lastgroup[len('rule'):])]
+
+    def match_each_regex(self, url):
+        for rule, regex in zip(self.rules, self.regexes):
+            if regex.match(url):
+                return rule
+        return None
+
+    def match_each(self, url):
+        """
+        match() without the compiled regexes: literal globs, then extensions and domains as set lookups, then the
+        other rules one by one.
+        """
+        rule = self.literal_match(url)
+        if rule is not None:
+            return rule
+        host, path = host_and_path(url) if self.extensions or self.domains else ('', '')
+        if self.extensions:
+            dot = path.rfind('.')
+            if dot > path.rfind('/'):
+                extension = path[dot + 1:].lower()
+                if extension in self.extensions:
+                    return f"ext:{extension}"
+        if self.domains:
+            # 依次检查 a.b.example.com, b.example.com, example.com
+            while host:
+                if host in self.domains:
+                    return f"domain:{host}"
+                host = host.partition('.')[2]
+        return self.match_each_regex(url)
+
+
+DEFAULT_LINK_EXCLUDES = UrlRules(
+    extensions=('png', 'jpg', 'jpeg', 'gif', 'webp', 'svg', 'ico', 'bmp', 'mp3', 'mp4', 'webm', 'avi', 'mov',
+                'css', 'js', 'woff', 'woff2', 'ttf', 'zip', 'gz', 'rar', 'exe', 'dmg'),
+    domains=('youtube.com', 'youtu.be'),
+)
+
+
+class UrlFilter:
+    """
+    Include and exclude UrlRules applied as one check, cheapest rules first: literal globs, then extensions and
+    domains, then regexes, each exclude before include. A URL passes when it matches no exclude rule and, if there are
+    include rules, at least one of them. A URL that passes costs only the string operations and regex matches, the
+    rejecting rule is only named for a rejected URL. Rejections are counted per rule in per-thread dicts,
+    without a lock, and summed by stats().
+    """
+
+    def __init__(self, include=None, exclude=None):
+        self.include = UrlRules.parse(include)
+        self.exclude = UrlRules.parse(exclude)
+
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.thread_rejections = []  # rule -> count dict of each thread that rejected a URL
+
+    def rejection(self, url):
+        """
+        Return the rule that rejects the URL, 'include' when it matches no include rule, or None when it passes.
+        """
+        exclude = self.exclude
+        include = self.include
+        if exclude is not None:
+            rule = exclude.literal_match(url)
+            if rule is not None:
+                return self.record(rule)
+        included = include is None or include.literal_match(url) is not None
+        if exclude is not None:
+            match = exclude.cheap_match(url)
+            if match:
+                return self.record(exclude.cheap_rule(match))
+        included = included or include.cheap_match(url)
+        if exclude is not None:
+            match = exclude.regex_match(url)
+            if match:
+                return self.record(exclude.regex_rule(match))
+        if included or include.regex_match(url):
+            return None
+        return self.record('include')
+
+    def allows(self, url):
+        return self.rejection(url) is None
+
+    def record(self, rule):
+        try:
+            rejections = self.local.rejections
+        except AttributeError:
+            rejections = self.local.rejections = {}
+            with self.lock:
+                self.thread_rejections.append(rejections)
+        rejections[rule] = rejections.get(rule, 0) + 1
+        return rule
+
+    def stats(self):
+        rejected_by_rule = {}
+        with self.lock:
+            # dict() 复制在 GIL 下是原子的，其他线程可以同时计数
+            snapshots = [dict(rejections) for rejections in self.thread_rejections]
+        for rejections in snapshots:
+            for rule, count in rejections.items():
+                rejected_by_rule[rule] = rejected_by_rule.get(rule, 0) + count
+        return {
+            "rejected": sum(rejected_by_rule.values()),
+            "rejected_by_rule": rejected_by_rule,
+        }
@@ -0,0 +1,82 @@
+import re
+import threading
+from datetime import date, datetime
+from urllib.parse import urlparse
+
+DATE_PATTERN = re.compile(r'(?:^|/)((?:19|20)\d{2})[/-](0?[1-9]|1[0-2])(?:[/-](0?[1-9]|[12]\d|3[01]))?(?=/|-|$)')
+LISTING_PATTERN = re.compile(r'/(tag|tags|category|categories|author|authors|page|search|login|signup|register|'
+                             r'about|contact|privacy|terms|feed|rss)(/|$)')
+EXTENSION_PATTERN = re.compile(r'\.(html?|php|aspx?)$')
+
+
+class UrlScorer:
+    """
+    Scores how likely a URL is to be an article, higher is better. Signals: path shape (date segments, long slugs,
+    .html pages, listing/utility paths), depth, anchor text, freshness of a date in the path, and the share of
+    fetched pages on the same domain that produced an article.
+    """
+
+    def __init__(self, depth_weight=0.5, yield_weight=2.0, freshness_days=365):
+        self.depth_weight = depth_weight
+        self.yield_weight = yield_weight
+        self.freshness_days = freshness_days
+        self.domain_fetches = {}
+        self.domain_articles = {}
+        self.lock = threading.Lock()
+
+    def score(self, url, depth, anchor_text=''):
+        parts = urlparse(url)
+        path = parts.path.lower()
+        score = 0.0
+
+        match = DATE_PATTERN.search(path)
+        if match:
+            score += 2.0 + self.freshness(match)
+
+        segments = [segment for segment in path.split('/') if segment]
+        last_segment = segments[-1] if segments else ''
+        slug_words = len([word for word in re.split(r'[-_]', EXTENSION_PATTERN.sub('', last_segment)) if word])
+        if slug_words >= 4:
+            score += 1.5
+        elif slug_words >= 2:
+            score += 0.5
+        if EXTENSION_PATTERN.search(last_segment):
+            score += 0.5
+        if LISTING_PATTERN.search(path):
+            score -= 2.0
+        if parts.query:
+            score -= 0.5
+
+        score -= self.depth_weight * max(depth - 1, 0)
+
+        anchor_words = len(anchor_text.split())
+        if 4 <= anchor_words <= 25:
+            score += 1.0
+        elif anchor_words == 0:
+            score -= 0.5
+
+        score += self.yield_weight * (self.domain_yield(parts.netloc) - 0.5)
+        return round(score, 3)
+
+    def freshness(self, match):
+        try:
+            published = date(int(match.group(1)), int(match.group(2)), int(match.group(3) or 1))
+        except ValueError:
+            return 0.0
+        age_days = (datetime.utcnow().date() - published).days
+        return max(0.0, 1.0 - max(age_days, 0) / self.freshness_days)
+
+    def domain_yield(self, domain):
+        # 拉普拉斯平滑，未抓取过的域名为 0.5
+        with self.lock:
+            return (self.domain_articles.get(domain, 0) + 1) / (self.domain_fetches.get(domain, 0) + 2)
+
+    def record_fetch(self, url):
+        domain = urlparse(url).netloc
+        with self.lock:
+            self.domain_fetches[domain] = self.domain_fetches.get(domain, 0) + 1
+
+    def record_article(self, url):
+        domain = urlparse(url).netloc
+        with self.lock:
+            self.domain_articles[domain] = self.domain_articles.get(domain, 0) + 1
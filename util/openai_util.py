@@ -1,24 +1,27 @@
 import json
 
-from factory import openai_client
+from factory import get_openai_client
 
+JSON_CHAT_MODEL = "gpt-3.5-turbo-1106"
 
-def chat_response_dict(content: str, role: str = "user") -> dict:
-    response = openai_client.chat.completions.create(
-        model="gpt-3.5-turbo-1106",
+
+def chat_response_dict(content: str, role: str = "user", timeout: float = None, client=None) -> dict:
+    response = (client or get_openai_client()).chat.completions.create(
+        model=JSON_CHAT_MODEL,
         messages=[
             {"role": role, "content": content},
         ],
         response_format={"type": "json_object"},
         seed=42,
         temperature=0,
+        timeout=timeout,
     )
     result: str = response.choices[0].message.content
     return json.loads(result)
 
 
 def chat_response_str(content: str, role: str = "user") -> str:
-    result = openai_client.chat.completions.create(
+    result = get_openai_client().chat.completions.create(
         model="gpt-3.5-turbo",
         messages=[
             {"role": role, "content": content},